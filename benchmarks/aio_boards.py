@@ -0,0 +1,54 @@
+"""
+File:                       aio_boards.py
+
+Purpose:                    Drives finite background scans on many simulated
+                            boards at once from a single asyncio event loop
+                            with mcculw.aio, without a thread per board.
+
+Demonstration:              Prints the wall time, the process CPU time and
+                            the number of samples received from all boards.
+
+Special Requirements:       Python 3.7 or later and NumPy. The simulated
+                            backend needs no hardware.
+"""
+import asyncio
+from time import perf_counter, process_time
+
+from mcculw import aio, sim
+from mcculw.enums import ULRange
+
+NUM_BOARDS = 32
+NUM_CHANS = 4
+RATE = 10000
+DURATION = 2.0
+
+
+async def acquire(board_num):
+    points = int(RATE * DURATION)
+    received = 0
+    async with await aio.a_in_scan(board_num, 0, NUM_CHANS - 1,
+                                   points * NUM_CHANS, RATE,
+                                   ULRange.BIP10VOLTS) as scan:
+        async for chunk in scan:
+            received += chunk.size
+    return received
+
+
+async def run_all():
+    return await asyncio.gather(*[acquire(board_num)
+                                  for board_num in range(NUM_BOARDS)])
+
+
+def run_benchmark():
+    sim.install([sim.SimulatedBoard() for _ in range(NUM_BOARDS)])
+    start = perf_counter()
+    cpu_start = process_time()
+    received = asyncio.run(run_all())
+    print('{} boards, {} samples in {:.2f} s (scan length {:.2f} s), '
+          'CPU {:.2f} s'.format(NUM_BOARDS, sum(received),
+                                perf_counter() - start, DURATION,
+                                process_time() - cpu_start))
+
+
+if __name__ == '__main__':
+    run_benchmark()
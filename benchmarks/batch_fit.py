@@ -0,0 +1,128 @@
+"""
+File:                       batch_fit.py
+
+Purpose:                    Compares fitting a nonlinear resonance model to
+                            a large batch of sweeps serially, with
+                            ProcessPoolExecutor.map over the records, which
+                            pickles every record to the workers, and with
+                            mcculw.batch.BatchRunner, which shares the batch
+                            with them.
+
+Demonstration:              Fits a damped-oscillator resonance curve by
+                            Levenberg-Marquardt to each of 400 synthetic
+                            amplitude-vs-frequency sweeps, prints the time
+                            taken each way and the progress reported, and
+                            checks that the results are identical and in
+                            order. Then times a cheap analysis of large
+                            captures, where moving the data dominates.
+
+Special Requirements:       Python 3.8 or later and NumPy. The speedup over
+                            the serial fit depends on the number of CPUs.
+"""
+import concurrent.futures
+import os
+from time import perf_counter
+
+import numpy
+
+from mcculw.batch import BatchRunner
+
+SWEEPS = 400
+POINTS = 2000
+FREQUENCIES = numpy.linspace(20000, 55000, POINTS)
+ITERATIONS = 20
+CAPTURES = 400
+CAPTURE_POINTS = 1 << 18
+
+
+def resonance(f, amplitude, f0, width):
+    return amplitude * width * f0 / numpy.sqrt(
+        (f0 * f0 - f * f) ** 2 + (width * f) ** 2)
+
+
+def fit_resonance(amplitudes):
+    # Levenberg-Marquardt on (amplitude, f0, width), from a guess read off
+    # the peak
+    peak = int(numpy.argmax(amplitudes))
+    params = numpy.array([amplitudes[peak], FREQUENCIES[peak], 2000.0])
+    damping = 1e-3
+    residual = amplitudes - resonance(FREQUENCIES, *params)
+    cost = residual.dot(residual)
+    for _ in range(ITERATIONS):
+        jacobian = numpy.empty((POINTS, 3))
+        for i in range(3):
+            step = params.copy()
+            step[i] += 1e-6 * max(abs(params[i]), 1.0)
+            jacobian[:, i] = (resonance(FREQUENCIES, *step)
+                              - resonance(FREQUENCIES, *params)) / (
+                                  step[i] - params[i])
+        normal = jacobian.T.dot(jacobian)
+        delta = numpy.linalg.solve(
+            normal + damping * numpy.diag(numpy.diag(normal)),
+            jacobian.T.dot(residual))
+        trial = params + delta
+        trial_residual = amplitudes - resonance(FREQUENCIES, *trial)
+        trial_cost = trial_residual.dot(trial_residual)
+        if trial_cost < cost:
+            params, residual, cost = trial, trial_residual, trial_cost
+            damping /= 10
+        else:
+            damping *= 10
+    return tuple(params)
+
+
+def peak_to_peak(capture):
+    return int(capture.max()) - int(capture.min())
+
+
+def make_sweeps():
+    rng = numpy.random.RandomState(0)
+    f0 = rng.uniform(30000, 45000, SWEEPS)
+    width = rng.uniform(1000, 4000, SWEEPS)
+    sweeps = resonance(FREQUENCIES, rng.uniform(1, 5, SWEEPS)[:, None],
+                       f0[:, None], width[:, None])
+    return sweeps + rng.normal(0, 0.01, sweeps.shape), f0
+
+
+def compare(func, records, workers):
+    start = perf_counter()
+    serial = [func(record) for record in records]
+    print('serial:              {:7.2f} s'.format(perf_counter() - start))
+
+    start = perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pickled = list(pool.map(func, records,
+                                chunksize=-(-len(records) // (workers * 4))))
+    print('ProcessPoolExecutor: {:7.2f} s'.format(perf_counter() - start))
+
+    reports = []
+    start = perf_counter()
+    with BatchRunner(workers) as runner:
+        shared = runner.map(func, records,
+                            progress=lambda done, total: reports.append(done))
+    print('BatchRunner:         {:7.2f} s, progress {}'.format(
+        perf_counter() - start, reports))
+
+    assert shared == serial == pickled
+    assert reports[-1] == len(records)
+    return shared
+
+
+def run_benchmark():
+    sweeps, f0 = make_sweeps()
+    workers = os.cpu_count() or 1
+    print('{} sweeps of {} points, {} worker(s)'.format(SWEEPS, POINTS,
+                                                       workers))
+    results = compare(fit_resonance, sweeps, workers)
+    print('largest f0 error: {:.2f} Hz'.format(
+        numpy.abs(numpy.array(results)[:, 1] - f0).max()))
+
+    captures = numpy.random.RandomState(1).randint(
+        0, 65536, (CAPTURES, CAPTURE_POINTS)).astype(numpy.uint16)
+    print('{} captures of {} samples, {} MB'.format(
+        CAPTURES, CAPTURE_POINTS, captures.nbytes >> 20))
+    compare(peak_to_peak, captures, workers)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,65 @@
+"""
+File:                       buffer_access.py
+
+Purpose:                    Compares reading the samples of a finished scan
+                            by indexing a ctypes pointer, as the examples do,
+                            with the NumPy view of an mcculw.buffer.ScanBuffer.
+
+Demonstration:              Prints the time each method takes to compute the
+                            mean of every channel, and checks that both
+                            methods see the same data.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import cast, POINTER, c_ushort
+from time import perf_counter
+
+from mcculw import ul, sim
+from mcculw.buffer import ScanBuffer
+from mcculw.enums import ScanOptions, ULRange
+
+POINTS = 100000
+NUM_CHANS = 4
+
+
+def ctypes_means(memhandle):
+    data_array = cast(memhandle, POINTER(c_ushort))
+    sums = [0] * NUM_CHANS
+    for i in range(POINTS * NUM_CHANS):
+        sums[i % NUM_CHANS] += data_array[i]
+    return [total / POINTS for total in sums]
+
+
+def numpy_means(scan_buffer):
+    return scan_buffer.array.mean(axis=0)
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install([sim.SimulatedBoard(realtime=False)])
+
+    with ScanBuffer.for_board(board_num, POINTS, NUM_CHANS) as scan_buffer:
+        ul.a_in_scan(board_num, 0, NUM_CHANS - 1, scan_buffer.count, 100000,
+                     ULRange.BIP10VOLTS, scan_buffer.memhandle,
+                     ScanOptions.FOREGROUND)
+
+        start = perf_counter()
+        expected = ctypes_means(scan_buffer.memhandle)
+        ctypes_time = perf_counter() - start
+
+        start = perf_counter()
+        means = numpy_means(scan_buffer)
+        numpy_time = perf_counter() - start
+
+        for expected_mean, mean in zip(expected, means):
+            assert abs(expected_mean - mean) < 1e-6
+        print('ctypes indexing: {:.4f} s'.format(ctypes_time))
+        print('NumPy view:      {:.4f} s ({:.0f}x)'.format(
+            numpy_time, ctypes_time / numpy_time))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,66 @@
+"""
+File:                       capabilities_cache.py
+
+Purpose:                    Compares gathering the capabilities of eight
+                            boards through DaqDeviceInfo with loading them
+                            from the cache of
+                            mcculw.device_info.DeviceCapabilities.
+
+Demonstration:              Prints the number of UL calls and the time taken
+                            by a cold start (gathering and writing the cache)
+                            and a warm start (reading the cache), and the
+                            time the calls would take at 1 ms each, a typical
+                            USB round trip. Checks that the cached snapshots
+                            equal freshly gathered ones.
+
+Special Requirements:       The simulated backend needs no hardware. The
+                            cache is written to a temporary directory.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+from mcculw import ul, sim
+from mcculw.device_info import DeviceCapabilities
+
+NUM_BOARDS = 8
+USB_CALL_TIME = 0.001
+
+
+def start_up(cache_path):
+    ul.reset_stats()
+    start = perf_counter()
+    capabilities = [DeviceCapabilities.for_board(board_num, cache_path)
+                    for board_num in range(NUM_BOARDS)]
+    elapsed = perf_counter() - start
+    calls = sum(stats.count for boards in ul.stats().values()
+                for stats in boards.values())
+    return capabilities, elapsed, calls
+
+
+def run_benchmark():
+    sim.install([sim.SimulatedBoard(unique_id='SIM{:05d}'.format(i))
+                 for i in range(NUM_BOARDS)])
+    directory = tempfile.mkdtemp()
+    ul.enable_instrumentation()
+    try:
+        cache_path = os.path.join(directory, 'capabilities.json')
+        for name in ('Cold start', 'Warm start'):
+            capabilities, elapsed, calls = start_up(cache_path)
+            print('{}: {:5d} UL calls, {:7.2f} ms (about {:7.1f} ms over '
+                  'USB)'.format(name, calls, elapsed * 1000,
+                                (elapsed + calls * USB_CALL_TIME) * 1000))
+        for board_num, cached in enumerate(capabilities):
+            assert cached == DeviceCapabilities.gather(board_num)
+            assert cached.unique_id == 'SIM{:05d}'.format(board_num)
+    finally:
+        ul.disable_instrumentation()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run_benchmark()
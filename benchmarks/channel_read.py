@@ -0,0 +1,87 @@
+"""
+File:                       channel_read.py
+
+Purpose:                    Compares the single point call rate of the
+                            mcculw.ul functions with the pre-bound handles
+                            in mcculw.channels.
+
+Demonstration:              Prints the calls per second achieved by each
+                            method for each kind of read or write, the best
+                            of several interleaved runs, first on the
+                            simulated backend and then on a backend whose
+                            functions return at once, which isolates the
+                            Python overhead the handles remove.
+
+Special Requirements:       None; neither backend needs hardware. The
+                            simulator does several microseconds of its own
+                            work on each call, which hides most of the
+                            difference; a real device sits in between.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter
+
+from mcculw import backend, ul, sim
+from mcculw.channels import (AnalogInputChannel, VoltageInputChannel,
+                             VoltageOutputChannel, DigitalPort,
+                             CounterChannel32)
+from mcculw.enums import DigitalPortType, ULRange
+
+CALLS = 50000
+RUNS = 5
+
+
+class NullCbw(object):
+    # Every cbXxx function succeeds without doing anything
+    def __getattr__(self, name):
+        return lambda *args: 0
+
+
+def _rate(func):
+    start = perf_counter()
+    for _ in range(CALLS):
+        func()
+    return CALLS / (perf_counter() - start)
+
+
+def run_cases():
+    board_num = 0
+    channel = 0
+    ai_range = ULRange.BIP10VOLTS
+    port = DigitalPortType.FIRSTPORTA
+    cases = [
+        ('a_in', lambda: ul.a_in(board_num, channel, ai_range),
+         AnalogInputChannel(board_num, channel, ai_range).read),
+        ('v_in', lambda: ul.v_in(board_num, channel, ai_range),
+         VoltageInputChannel(board_num, channel, ai_range).read),
+        ('v_out', lambda: ul.v_out(board_num, channel, ai_range, 1.5),
+         lambda write=VoltageOutputChannel(
+             board_num, channel, ai_range).write: write(1.5)),
+        ('d_in', lambda: ul.d_in(board_num, port),
+         DigitalPort(board_num, port).read),
+        ('c_in_32', lambda: ul.c_in_32(board_num, 0),
+         CounterChannel32(board_num, 0).read),
+    ]
+    for name, module_call, handle_call in cases:
+        module_rate = handle_rate = 0
+        # Interleaved, so that a slow patch of the machine hits both
+        for _ in range(RUNS):
+            module_rate = max(module_rate, _rate(module_call))
+            handle_rate = max(handle_rate, _rate(handle_call))
+        print('{:8} ul: {:10.0f} calls/s  handle: {:10.0f} calls/s  '
+              '({:.2f}x)'.format(name, module_rate, handle_rate,
+                                 handle_rate / module_rate))
+
+
+def run_benchmark():
+    print('Simulated backend')
+    sim.install()
+    run_cases()
+    print('Backend returning at once')
+    backend.set_backend(NullCbw())
+    run_cases()
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,104 @@
+"""
+File:                       compressed_recording.py
+
+Purpose:                    Measures the delta + zlib/lzma compression stage
+                            of mcculw.recorder.Recorder on a continuous
+                            1 MS/s scan of slowly varying signals from the
+                            simulated backend.
+
+Demonstration:              Prints the compression ratio and encode
+                            throughput for each compressor, with and without
+                            delta encoding, checks that the recording keeps
+                            up with the scan and that it reads back unchanged
+                            through mcculw.recorder.Recording.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+                            Files are written to a temporary directory.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import lzma
+import math
+import os
+import shutil
+import tempfile
+import zlib
+from time import perf_counter
+
+import numpy
+
+from mcculw import sim
+from mcculw.enums import ULRange
+from mcculw.recorder import Recorder, Recording
+from mcculw.stream import AnalogInputStream
+from mcculw.ul import ULError
+
+NUM_CHANS = 4
+RATE = 250000
+DURATION = 5.0
+PERIOD = 1.0
+
+
+def sensor_signal(chan, t):
+    # A slow drift with a few counts of deterministic noise
+    return (2.0 * math.sin(2 * math.pi * t / PERIOD + chan)
+            + 0.002 * math.sin(7919.0 * t * (chan + 1)))
+
+
+def record_scan(path, compression, level):
+    sim.install([sim.SimulatedBoard(
+        fifo_size=RATE * NUM_CHANS // 10, ai_signal=sensor_signal,
+        ai_signal_period=PERIOD, max_table_frames=int(RATE * PERIOD))])
+    chunk_points = RATE // 20
+    chunks = []
+    with AnalogInputStream(0, 0, NUM_CHANS - 1, RATE, ULRange.BIP10VOLTS,
+                           chunk_points) as stream:
+        with Recorder.for_stream(stream, path, file_format='indexed',
+                                 compression=compression,
+                                 compression_level=level) as recorder:
+            start = perf_counter()
+            while perf_counter() - start < DURATION:
+                chunk = stream.read()
+                recorder.write(chunk)
+                chunks.append(chunk)
+            elapsed = perf_counter() - start
+    return recorder, elapsed, numpy.concatenate(chunks)
+
+
+def ratio_without_delta(data, compression, level):
+    raw = data.tobytes()
+    if compression == 'zlib':
+        return len(raw) / len(zlib.compress(raw, level))
+    return len(raw) / len(lzma.compress(raw, preset=level))
+
+
+def run_benchmark():
+    directory = tempfile.mkdtemp()
+    try:
+        for compression, level in (('zlib', 1), ('zlib', 6), ('lzma', 0)):
+            path = os.path.join(directory, 'scan_{}_{}.bin'.format(
+                compression, level))
+            try:
+                recorder, elapsed, data = record_scan(path, compression,
+                                                      level)
+            except ULError as e:
+                print('{} {}: scan stopped: {}'.format(compression, level, e))
+                continue
+            recording = Recording(path)
+            assert numpy.array_equal(
+                recording.window(0, recording.duration), data)
+            print('{:4} level {}: ratio {:5.2f} (without delta {:5.2f}), '
+                  'encode {:6.1f} MB/s per thread, {:.2f} MS/s recorded, '
+                  '{} extra blocks'.format(
+                      compression, level, recorder.compression_ratio,
+                      ratio_without_delta(data[:1 << 18], compression, level),
+                      recorder.encode_throughput / 1e6,
+                      recorder.points_written * NUM_CHANS / elapsed / 1e6,
+                      recorder.extra_blocks))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,86 @@
+"""
+File:                       device_inventory.py
+
+Purpose:                    Compares looking up a device with
+                            mcculw.ul.get_daq_device_inventory() against
+                            mcculw.inventory.DeviceInventory, with a
+                            simulated discovery that takes as long as a scan
+                            of network interfaces.
+
+Demonstration:              Prints the time taken to find a device and
+                            create it, directly and through the inventory,
+                            then unplugs and plugs back a simulated device
+                            and prints the change notifications and how long
+                            they took to arrive.
+
+Special Requirements:       The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import threading
+from time import perf_counter
+
+from mcculw import ul, sim
+from mcculw.enums import InterfaceType
+from mcculw.inventory import DeviceInventory
+
+NUM_DEVICES = 4
+DISCOVERY_TIME = 1.5
+REFRESH_INTERVAL = 0.5
+
+
+def run_benchmark():
+    devices = [sim.SimulatedBoard(unique_id='SIM{:05d}'.format(i))
+               for i in range(NUM_DEVICES)]
+    cbw = sim.install(devices, installed=False, discovery_time=DISCOVERY_TIME)
+    unique_id = devices[-1].unique_id
+
+    start = perf_counter()
+    found = next(device for device in
+                 ul.get_daq_device_inventory(InterfaceType.ANY)
+                 if device.unique_id == unique_id)
+    ul.create_daq_device(0, found)
+    print('get_daq_device_inventory + create: {:8.2f} ms'.format(
+        (perf_counter() - start) * 1000))
+    ul.release_daq_device(0)
+
+    changes = []
+    changed = threading.Event()
+
+    def on_change(added, removed):
+        changes.append((perf_counter(), [d.unique_id for d in added],
+                        [d.unique_id for d in removed]))
+        changed.set()
+
+    with DeviceInventory(refresh_interval=REFRESH_INTERVAL) as inventory:
+        inventory.add_listener(on_change)
+        # Startup: the first discovery is still running
+        assert inventory.find(unique_id, DISCOVERY_TIME * 2) is not None
+        changed.clear()
+
+        start = perf_counter()
+        inventory.create_daq_device(1, unique_id)
+        print('DeviceInventory find + create:     {:8.2f} ms'.format(
+            (perf_counter() - start) * 1000))
+        ul.release_daq_device(1)
+
+        for action in ('unplugged', 'plugged in'):
+            if action == 'unplugged':
+                unplugged = cbw.devices.pop()
+            else:
+                cbw.devices.append(unplugged)
+            start = perf_counter()
+            changed.wait(REFRESH_INTERVAL + 2 * DISCOVERY_TIME + 1)
+            changed.clear()
+            when, added, removed = changes[-1]
+            print('{} {}: notified after {:.2f} s, added {}, removed {}'
+                  .format(unplugged.unique_id, action, when - start, added,
+                          removed))
+        assert inventory.find(unique_id) is not None
+        assert len(inventory.find_product(devices[0].product_id)) == \
+            NUM_DEVICES
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,65 @@
+"""
+File:                       eng_units.py
+
+Purpose:                    Compares converting a buffer of A/D counts to
+                            volts with one mcculw.ul.to_eng_units() call per
+                            sample against mcculw.conversion.counts_to_volts().
+
+Demonstration:              Checks that the float32 and float64 results of
+                            counts_to_volts() are identical to those of
+                            to_eng_units() and to_eng_units_32(), then prints
+                            the time each method takes.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter
+
+import numpy
+
+from mcculw import ul, sim
+from mcculw.conversion import counts_to_volts
+from mcculw.device_info import AiInfo
+from mcculw.enums import ULRange
+
+NUM_SAMPLES = 100000
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install()
+    resolution = AiInfo(board_num).resolution
+    counts = numpy.random.randint(0, 1 << resolution, NUM_SAMPLES).astype(
+        numpy.uint16)
+
+    for ul_range in (ULRange.BIP10VOLTS, ULRange.BIP5VOLTS,
+                     ULRange.BIP1VOLTS):
+        start = perf_counter()
+        expected = numpy.array(
+            [ul.to_eng_units(board_num, ul_range, int(count))
+             for count in counts], numpy.float32)
+        loop_time = perf_counter() - start
+
+        out = numpy.empty(counts.shape, numpy.float32)
+        start = perf_counter()
+        counts_to_volts(counts, ul_range, resolution, out=out)
+        vector_time = perf_counter() - start
+        assert numpy.array_equal(out, expected), ul_range
+
+        expected_32 = numpy.array(
+            [ul.to_eng_units_32(board_num, ul_range, int(count))
+             for count in counts[:1000]])
+        assert numpy.array_equal(
+            counts_to_volts(counts[:1000], ul_range, resolution),
+            expected_32), ul_range
+
+        print('{}: to_eng_units {:.3f} s, counts_to_volts {:.5f} s '
+              '({:.0f}x), results identical'.format(
+                  ul_range.name, loop_time, vector_time,
+                  loop_time / vector_time))
+
+
+if __name__ == '__main__':
+    run_benchmark()
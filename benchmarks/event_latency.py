@@ -0,0 +1,96 @@
+"""
+File:                       event_latency.py
+
+Purpose:                    Measures how long after a chunk of a continuous
+                            scan is complete the reader gets it, for three
+                            ways of waiting: the fixed sleep(0.1) status
+                            polling used by the examples, the adaptive
+                            polling of mcculw.stream.AnalogInputStream, and
+                            its ON_DATA_AVAILABLE event mode.
+
+Demonstration:              Prints the median and maximum latency of each
+                            method, and the process CPU time it used. The
+                            latency is measured from the time the simulated
+                            board completed the chunk, on its clock.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware;
+                            its event thread runs every millisecond, which
+                            bounds the latency of the event mode.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter, process_time, sleep
+
+import numpy
+
+from mcculw import ul, sim
+from mcculw.enums import FunctionType, ULRange
+from mcculw.stream import AnalogInputStream
+
+RATE = 10000
+NUM_CHANS = 2
+CHUNK_POINTS = 1500
+NUM_CHUNKS = 20
+
+
+def scan_start(board):
+    # The time the simulated scan started, on the board's clock, from which
+    # it transfers a frame every 1 / rate seconds
+    return board.scans[FunctionType.AIFUNCTION].start_time
+
+
+def fixed_polling_latencies(board):
+    # The get_status loop of the examples, reading through the same stream
+    # buffer so only the waiting differs
+    board_num = board.board_num
+    latencies = []
+    with AnalogInputStream(board_num, 0, NUM_CHANS - 1, RATE,
+                           ULRange.BIP10VOLTS, CHUNK_POINTS) as stream:
+        start = scan_start(board)
+        chunk_count = CHUNK_POINTS * NUM_CHANS
+        for chunk in range(1, NUM_CHUNKS + 1):
+            while True:
+                _, cur_count, _ = ul.get_status(board_num,
+                                                FunctionType.AIFUNCTION)
+                if cur_count >= chunk * chunk_count:
+                    break
+                sleep(0.1)
+            latencies.append(perf_counter() - start
+                             - chunk * CHUNK_POINTS / stream.rate)
+            stream.read()
+    return latencies
+
+
+def stream_latencies(board, use_events):
+    latencies = []
+    with AnalogInputStream(board.board_num, 0, NUM_CHANS - 1, RATE,
+                           ULRange.BIP10VOLTS, CHUNK_POINTS,
+                           use_events=use_events) as stream:
+        start = scan_start(board)
+        for chunk in range(1, NUM_CHUNKS + 1):
+            stream.read()
+            latencies.append(perf_counter() - start
+                             - chunk * CHUNK_POINTS / stream.rate)
+    return latencies
+
+
+def run_benchmark():
+    board = sim.SimulatedBoard(clock=perf_counter)
+    sim.install([board])
+
+    methods = [
+        ('sleep(0.1) polling', lambda: fixed_polling_latencies(board)),
+        ('adaptive polling', lambda: stream_latencies(board, False)),
+        ('ON_DATA_AVAILABLE', lambda: stream_latencies(board, True)),
+    ]
+    for name, method in methods:
+        cpu_start = process_time()
+        latencies = numpy.array(method()) * 1000
+        cpu_time = process_time() - cpu_start
+        print('{:20} median {:7.2f} ms  max {:7.2f} ms  CPU {:.3f} s'.format(
+            name, numpy.median(latencies), latencies.max(), cpu_time))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,110 @@
+"""
+File:                       frequency_sweep.py
+
+Purpose:                    Compares the acquisition loop of the qSweep
+                            examples with mcculw.sweep.FrequencySweep over
+                            the same list of frequencies.
+
+Demonstration:              On the simulated backend, sweeps 1 kHz to 5 kHz
+                            in 100 Hz steps, 5 cycles of 9 points each, and
+                            analyzes every step. The qSweep loop converts
+                            the sine point by point with from_eng_units,
+                            polls the output scan every 100 ms and analyzes
+                            after the sweep; FrequencySweep writes the
+                            waveform once and analyzes each step while the
+                            next one runs. Prints the wall-clock time of
+                            each and checks that the output buffer holds
+                            whole cycles.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter, sleep
+
+import numpy
+
+from mcculw import sim, ul
+from mcculw.buffer import ScanBuffer
+from mcculw.conversion import counts_to_volts
+from mcculw.enums import FunctionType, ScanOptions, Status, ULRange
+from mcculw.sweep import FrequencySweep
+
+FREQUENCIES = list(range(1000, 5001, 100))
+CYCLES = 5
+POINTS_PER_CYCLE = 9
+AMPLITUDE = 5.0
+AO_RANGE = AI_RANGE = ULRange.BIP10VOLTS
+# The time a real analysis (a fit of the step) takes, in seconds
+ANALYSIS_TIME = 0.005
+
+
+def analyze(data):
+    # Stands in for the fit of the qSweep examples: the amplitude of the
+    # step, plus the time a fit would take
+    volts = counts_to_volts(data[:, 0], AI_RANGE, 16)
+    sleep(ANALYSIS_TIME)
+    return (volts.max() - volts.min()) / 2
+
+
+def qsweep_loop():
+    points = CYCLES * POINTS_PER_CYCLE
+    out_buffer = ScanBuffer(points, 1, 16)
+    in_buffer = ScanBuffer(points, 1, 16)
+    try:
+        x = numpy.linspace(0, 2 * numpy.pi, POINTS_PER_CYCLE + 1)
+        cycle = [ul.from_eng_units(0, AO_RANGE, v)
+                 for v in numpy.sin(x) * AMPLITUDE][:-1]
+        out_buffer.array[:, 0] = cycle * CYCLES
+        in_data = []
+        for freq in FREQUENCIES:
+            rate = freq * POINTS_PER_CYCLE
+            ul.a_out_scan(0, 0, 0, points, rate, AO_RANGE,
+                          out_buffer.memhandle, ScanOptions.BACKGROUND)
+            ul.a_in_scan(0, 0, 0, points, rate, AI_RANGE,
+                         in_buffer.memhandle, ScanOptions.BACKGROUND)
+            in_status = Status.RUNNING
+            while in_status != Status.IDLE:
+                in_status, _, _ = ul.get_status(0, FunctionType.AIFUNCTION)
+            in_data.append(in_buffer.array.copy())
+            out_status = Status.RUNNING
+            while out_status != Status.IDLE:
+                sleep(0.1)
+                out_status, _, _ = ul.get_status(0, FunctionType.AOFUNCTION)
+        return [analyze(data) for data in in_data]
+    finally:
+        out_buffer.close()
+        in_buffer.close()
+
+
+def run_benchmark():
+    board = sim.SimulatedBoard(ai_signal_period=0.01)
+    sim.install([board])
+
+    start = perf_counter()
+    expected = qsweep_loop()
+    loop_time = perf_counter() - start
+
+    with FrequencySweep(0, FREQUENCIES, AO_RANGE, AI_RANGE,
+                        amplitude=AMPLITUDE, cycles=CYCLES,
+                        points_per_cycle=POINTS_PER_CYCLE) as sweep:
+        results = sweep.run(lambda step: analyze(step.data))
+        waveform = counts_to_volts(sweep._ao_buffer.array[:, 0], AO_RANGE, 16)
+    assert len(results) == len(expected)
+    # Whole cycles: every cycle of the buffer is the same, and the first
+    # sample does not repeat at the end of a cycle
+    cycles = waveform.reshape(CYCLES, POINTS_PER_CYCLE)
+    assert (cycles == cycles[0]).all()
+    assert cycles[0, 0] != cycles[0, -1]
+
+    acquisition = sum(CYCLES / f for f in FREQUENCIES)
+    print('{} steps, {:.1f} ms of acquisition, {:.0f} ms of analysis'
+          .format(len(FREQUENCIES), acquisition * 1000,
+                  len(FREQUENCIES) * ANALYSIS_TIME * 1000))
+    print('qSweep loop:    {:8.1f} ms'.format(loop_time * 1000))
+    print('FrequencySweep: {:8.1f} ms'.format(sweep.elapsed * 1000))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,77 @@
+"""
+File:                       import_time.py
+
+Purpose:                    Measures how long a fresh Python process takes to
+                            import mcculw.ul with lazy function binding,
+                            compared to loading the backend and binding every
+                            cbXxx function up front as the library did before.
+
+Demonstration:              Prints the median time of each approach over a
+                            number of fresh interpreter runs.
+
+Results:                    Lazy binding does not make the import measurably
+                            faster. With the simulated backend
+                            (MCCULW_BACKEND=mcculw.sim:SimulatedCbw) the
+                            medians were 57.99 ms lazy and 56.32 ms eager:
+                            binding every function costs less than the
+                            run-to-run noise, which is dominated by the
+                            import of mcculw.ul itself. What lazy binding
+                            buys is that mcculw.ul imports, and a backend can
+                            be selected, without a loadable UL DLL.
+
+Special Requirements:       The eager measurement needs a loadable backend:
+                            the UL DLL on Windows, or a stand-in selected with
+                            the MCCULW_BACKEND environment variable.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import os
+import subprocess
+import sys
+
+RUNS = 20
+
+_TIMED_IMPORT = '''
+import time
+start = time.perf_counter()
+import mcculw.ul
+{extra}
+print(time.perf_counter() - start)
+'''
+
+_LAZY = ''
+_EAGER = 'from mcculw import backend; backend.bind_all()'
+
+
+def time_import(extra, runs=RUNS):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [repo_root] + [p for p in [env.get('PYTHONPATH')] if p])
+    code = _TIMED_IMPORT.format(extra=extra)
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], env=env, stderr=subprocess.DEVNULL)
+        timings.append(float(output.decode('utf-8').strip()))
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def run_benchmark():
+    lazy = time_import(_LAZY)
+    print('Lazy binding:  {:8.2f} ms'.format(lazy * 1000))
+    try:
+        eager = time_import(_EAGER)
+    except subprocess.CalledProcessError:
+        print('Eager binding: backend could not be loaded (set '
+              'MCCULW_BACKEND to measure against a stand-in backend)')
+        return
+    print('Eager binding: {:8.2f} ms'.format(eager * 1000))
+    # Usually within the noise of the measurement, either way
+    print('Eager minus lazy: {:+.2f} ms'.format((eager - lazy) * 1000))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,55 @@
+"""
+File:                       multi_board.py
+
+Purpose:                    Acquires from 8 simulated boards at once with
+                            mcculw.multiboard.MultiBoardAcquisition, each
+                            scanning 4 channels at 100 kS/s per channel.
+
+Demonstration:              Prints the aggregate rate of merged samples
+                            consumed and whether any board overran.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter
+
+from mcculw import sim
+from mcculw.enums import TrigType, ULRange
+from mcculw.multiboard import MultiBoardAcquisition
+from mcculw.ul import ULError
+
+NUM_BOARDS = 8
+NUM_CHANS = 4
+RATE = 100000
+CHUNK_POINTS = RATE // 10
+DURATION = 5.0
+
+
+def run_benchmark():
+    sim.install([sim.SimulatedBoard(fifo_size=RATE * NUM_CHANS // 10)
+                 for _ in range(NUM_BOARDS)])
+    boards = [(board_num, 0, NUM_CHANS - 1, ULRange.BIP10VOLTS)
+              for board_num in range(NUM_BOARDS)]
+
+    consumed = 0
+    try:
+        with MultiBoardAcquisition(
+                boards, RATE, CHUNK_POINTS,
+                trigger=(TrigType.TRIG_POS_EDGE, 0, 0)) as acquisition:
+            start = perf_counter()
+            for merged in acquisition:
+                consumed += sum(chunk.size for chunk in merged.data.values())
+                if perf_counter() - start >= DURATION:
+                    break
+            elapsed = perf_counter() - start
+        print('Consumed {:.2f} MS/s from {} boards ({} samples in {:.2f} s)'
+              .format(consumed / elapsed / 1e6, NUM_BOARDS, consumed,
+                      elapsed))
+    except ULError as e:
+        print('Acquisition stopped:', e)
+
+
+if __name__ == '__main__':
+    run_benchmark()
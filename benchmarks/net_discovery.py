@@ -0,0 +1,74 @@
+"""
+File:                       net_discovery.py
+
+Purpose:                    Compares looking up 40 networked boards one at a
+                            time with mcculw.ul.get_net_device_descriptor()
+                            against mcculw.inventory.resolve_net_devices(),
+                            when some of the hosts are unreachable.
+
+Demonstration:              Prints the time taken by each method, checks that
+                            both found the same devices and that the
+                            unreachable hosts map to NETDEVNOTFOUND errors,
+                            and that the devices found were created with
+                            consecutive board numbers.
+
+Special Requirements:       The simulated backend needs no hardware. Lookups
+                            of unknown hosts block for their timeout, as on
+                            a real network.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter
+
+from mcculw import ul, sim
+from mcculw.enums import ErrorCode, InterfaceType
+from mcculw.inventory import DEFAULT_NET_PORT, resolve_net_devices
+from mcculw.ul import ULError
+
+NUM_HOSTS = 40
+NUM_UNREACHABLE = 8
+TIMEOUT = 500
+FIRST_BOARD_NUM = 10
+
+
+def run_benchmark():
+    hosts = ['192.168.1.{}'.format(100 + i) for i in range(NUM_HOSTS)]
+    net_devices = dict(
+        (host, sim.SimulatedBoard(
+            product_name='E-1608', interface_type=InterfaceType.ETHERNET,
+            unique_id='00:80:2F:00:00:{:02X}'.format(i)))
+        for i, host in enumerate(hosts[NUM_UNREACHABLE:]))
+    sim.install([], net_devices=net_devices)
+
+    start = perf_counter()
+    sequential = {}
+    for host in hosts:
+        try:
+            sequential[host] = ul.get_net_device_descriptor(
+                host, DEFAULT_NET_PORT, TIMEOUT)
+        except ULError as e:
+            sequential[host] = e
+    print('One at a time:       {:7.2f} s'.format(perf_counter() - start))
+
+    start = perf_counter()
+    results = resolve_net_devices(hosts, timeout=TIMEOUT,
+                                  first_board_num=FIRST_BOARD_NUM)
+    print('resolve_net_devices: {:7.2f} s'.format(perf_counter() - start))
+
+    assert list(results) == hosts
+    board_num = FIRST_BOARD_NUM
+    for host, device in results.items():
+        if host in net_devices:
+            assert device.unique_id == sequential[host].unique_id
+            assert ul.get_board_number(device) == board_num
+            board_num += 1
+        else:
+            assert device.errorcode == ErrorCode.NETDEVNOTFOUND
+            assert sequential[host].errorcode == ErrorCode.NETDEVNOTFOUND
+    print('{} devices created as boards {} to {}'.format(
+        board_num - FIRST_BOARD_NUM, FIRST_BOARD_NUM, board_num - 1))
+
+
+if __name__ == '__main__':
+    run_benchmark()
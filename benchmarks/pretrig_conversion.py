@@ -0,0 +1,94 @@
+"""
+File:                       pretrig_conversion.py
+
+Purpose:                    Compares putting the raw data of
+                            mcculw.ul.a_pretrig() in order with
+                            mcculw.ul.a_convert_pretrig_data(), once per
+                            capture, against
+                            mcculw.conversion.convert_pretrig_data() on a
+                            whole batch of captures.
+
+Demonstration:              Checks on simulated 12-bit and 16-bit boards that
+                            the data and channel tags of both methods are
+                            identical, and that the data matches a capture
+                            made with the CONVERTDATA option, then prints the
+                            time each method takes.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import POINTER, c_ushort, cast
+from time import perf_counter
+
+import numpy
+
+from mcculw import ul, sim
+from mcculw.conversion import convert_pretrig_data
+from mcculw.enums import ScanOptions, ULRange
+
+LOW_CHAN = 0
+HIGH_CHAN = 3
+PRETRIG_COUNT = 1000
+TOTAL_COUNT = 10000
+RATE = 10000
+NUM_CAPTURES = 200
+
+
+def capture(board_num, memhandle, options):
+    result = ul.a_pretrig(board_num, LOW_CHAN, HIGH_CHAN, PRETRIG_COUNT,
+                          TOTAL_COUNT, RATE, ULRange.BIP10VOLTS, memhandle,
+                          options)
+    data = numpy.ctypeslib.as_array(
+        (c_ushort * result.actual_total_count).from_address(memhandle))
+    return result, data.copy()
+
+
+def run_benchmark():
+    board_num = 0
+    for resolution in (12, 16):
+        sim.install([sim.SimulatedBoard(ai_resolution=resolution,
+                                        realtime=False)])
+        memhandle = ul.win_buf_alloc(TOTAL_COUNT + 512)
+        try:
+            result, expected = capture(board_num, memhandle,
+                                       ScanOptions.CONVERTDATA)
+            pretrig = result.actual_pretrig_count
+            total = result.actual_total_count
+            raw = numpy.stack([capture(board_num, memhandle, 0)[1]
+                               for _ in range(NUM_CAPTURES)])
+        finally:
+            ul.win_buf_free(memhandle)
+
+        start = perf_counter()
+        dll_data = raw.copy()
+        dll_tags = numpy.zeros_like(raw)
+        for data, tags in zip(dll_data, dll_tags):
+            ul.a_convert_pretrig_data(
+                board_num, pretrig, total,
+                cast(data.ctypes.data, POINTER(c_ushort)),
+                cast(tags.ctypes.data, POINTER(c_ushort)))
+        dll_time = perf_counter() - start
+
+        start = perf_counter()
+        data, tags = convert_pretrig_data(raw.copy(), pretrig, total,
+                                          resolution)
+        vector_time = perf_counter() - start
+
+        assert numpy.array_equal(data, dll_data)
+        assert (data == expected).all()
+        if resolution == 12:
+            assert numpy.array_equal(tags, dll_tags)
+            assert (tags == numpy.arange(total) % (HIGH_CHAN + 1)).all()
+        else:
+            assert tags is None
+        print('{}-bit, {} captures of {} samples: '
+              'a_convert_pretrig_data {:8.2f} ms, '
+              'convert_pretrig_data {:6.2f} ms'.format(
+                  resolution, NUM_CAPTURES, total, dll_time * 1000,
+                  vector_time * 1000))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,102 @@
+"""
+File:                       recorder_throughput.py
+
+Purpose:                    Measures the write throughput of
+                            mcculw.recorder.Recorder, compares it with the
+                            per-value CSV writes of a_in_scan_file.py, and
+                            records a continuous 1 MS/s scan from the
+                            simulated backend.
+
+Demonstration:              Prints MB/s and MS/s for each case, checks that
+                            the .npy file reads back unchanged, and reports
+                            whether the scan overran.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+                            Files are written to a temporary directory.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy
+
+from mcculw import sim
+from mcculw.enums import ULRange
+from mcculw.recorder import Recorder
+from mcculw.stream import AnalogInputStream
+from mcculw.ul import ULError
+
+NUM_CHANS = 4
+CHUNK_POINTS = 25000
+NUM_CHUNKS = 400
+CSV_POINTS = 100000
+RATE = 250000
+DURATION = 5.0
+
+
+def csv_rate(path, chunk):
+    start = perf_counter()
+    with open(path, 'w') as f:
+        for row in chunk[:CSV_POINTS // NUM_CHANS]:
+            for value in row:
+                f.write(str(value) + ',')
+            f.write(u'\n')
+    return CSV_POINTS / (perf_counter() - start)
+
+
+def recorder_rate(path, chunk):
+    start = perf_counter()
+    with Recorder(path, range(NUM_CHANS), ULRange.BIP10VOLTS, RATE,
+                  chunk.dtype, 16) as recorder:
+        for _ in range(NUM_CHUNKS):
+            recorder.write(chunk)
+    elapsed = perf_counter() - start
+    assert numpy.array_equal(numpy.load(path, mmap_mode='r')[-len(chunk):],
+                             chunk)
+    return recorder.bytes_written / elapsed, recorder.write_throughput
+
+
+def record_scan(path):
+    sim.install([sim.SimulatedBoard(fifo_size=RATE * NUM_CHANS // 10)])
+    chunk_points = RATE // 20
+    with AnalogInputStream(0, 0, NUM_CHANS - 1, RATE, ULRange.BIP10VOLTS,
+                           chunk_points) as stream:
+        chunk = numpy.empty((chunk_points, NUM_CHANS), stream.buffer.dtype)
+        with Recorder.for_stream(stream, path) as recorder:
+            start = perf_counter()
+            while perf_counter() - start < DURATION:
+                recorder.write(stream.read(out=chunk))
+            elapsed = perf_counter() - start
+    return recorder.points_written * NUM_CHANS / elapsed, recorder
+
+
+def run_benchmark():
+    directory = tempfile.mkdtemp()
+    try:
+        chunk = numpy.random.randint(0, 1 << 16, (CHUNK_POINTS, NUM_CHANS)
+                                     ).astype(numpy.uint16)
+        rate = csv_rate(os.path.join(directory, 'scan_data.csv'), chunk)
+        print('CSV writes:      {:8.2f} MS/s'.format(rate / 1e6))
+
+        rate, write_rate = recorder_rate(
+            os.path.join(directory, 'scan_data.npy'), chunk)
+        print('Recorder:        {:8.2f} MS/s ({:.0f} MB/s, writer thread '
+              '{:.0f} MB/s)'.format(rate / chunk.itemsize / 1e6, rate / 1e6,
+                                    write_rate / 1e6))
+
+        try:
+            rate, recorder = record_scan(os.path.join(directory, 'scan.npy'))
+            print('1 MS/s scan:     {:8.2f} MS/s recorded, {} extra blocks'
+                  .format(rate / 1e6, recorder.extra_blocks))
+        except ULError as e:
+            print('Scan stopped:', e)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,122 @@
+"""
+File:                       recording_window.py
+
+Purpose:                    Measures random access into a long recording made
+                            by mcculw.recorder.Recorder in the 'indexed'
+                            format, compared with loading the whole file.
+
+Demonstration:              Records a synthetic two-minute, four-channel
+                            capture, then prints the time taken to read
+                            two-second windows at random positions through
+                            mcculw.recorder.Recording, checks the windows
+                            against the data written, and checks that a
+                            recording that was never closed can be read up to
+                            its last block.
+
+Special Requirements:       NumPy. No hardware or backend is needed. Files
+                            are written to a temporary directory.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import os
+import random
+import shutil
+import tempfile
+from time import perf_counter, sleep
+
+import numpy
+
+from mcculw.enums import ULRange
+from mcculw.recorder import Recorder, Recording
+
+NUM_CHANS = 4
+RATE = 100000
+DURATION = 120
+CHUNK_POINTS = 10000
+BLOCK_POINTS = 4 * CHUNK_POINTS
+WINDOW = 2.0
+NUM_WINDOWS = 50
+
+
+def expected(first, last):
+    # The synthetic data: each sample holds its point index plus its column
+    points = numpy.arange(first, last, dtype=numpy.uint64)[:, None]
+    return ((points * NUM_CHANS + numpy.arange(NUM_CHANS)) % 65536).astype(
+        numpy.uint16)
+
+
+def record(path, chunks, close=True):
+    recorder = Recorder(path, range(NUM_CHANS), ULRange.BIP10VOLTS, RATE,
+                        numpy.uint16, 16, file_format='indexed',
+                        block_points=BLOCK_POINTS)
+    for index in range(chunks):
+        first = index * CHUNK_POINTS
+        recorder.write(expected(first, first + CHUNK_POINTS))
+    if close:
+        recorder.close()
+    else:
+        # Let the writer catch up with the full blocks, as if the process
+        # had then been killed
+        full_points = chunks * CHUNK_POINTS // BLOCK_POINTS * BLOCK_POINTS
+        while recorder.points_written < full_points:
+            sleep(0.01)
+    return recorder
+
+
+def run_benchmark():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'capture.bin')
+        start = perf_counter()
+        record(path, DURATION * RATE // CHUNK_POINTS)
+        print('Recorded {} MB in {:.2f} s'.format(
+            os.path.getsize(path) // 10 ** 6, perf_counter() - start))
+
+        start = perf_counter()
+        whole = numpy.fromfile(path, numpy.uint16).reshape(-1, NUM_CHANS)
+        full_time = perf_counter() - start
+        print('Loading the whole file:        {:8.2f} ms'.format(
+            full_time * 1000))
+        del whole
+
+        recording = Recording(path)
+        assert recording.points == DURATION * RATE
+        assert len(recording.index) == DURATION * RATE // BLOCK_POINTS
+        rng = random.Random(0)
+        elapsed = 0.0
+        for _ in range(NUM_WINDOWS):
+            t0 = rng.uniform(0, DURATION - WINDOW)
+            start = perf_counter()
+            window = recording.window(t0, t0 + WINDOW, [0, 2])
+            total = int(window.sum(dtype=numpy.uint64))
+            elapsed += perf_counter() - start
+            first = int(numpy.ceil(t0 * RATE))
+            data = expected(first, first + int(WINDOW * RATE))[:, [0, 2]]
+            assert numpy.array_equal(window, data)
+            assert total == int(data.sum(dtype=numpy.uint64))
+            assert not window.flags.owndata
+        print('Reading a {:.0f} s window:       {:8.2f} ms'.format(
+            WINDOW, elapsed / NUM_WINDOWS * 1000))
+
+        times = [recording.host_time(point) for point in
+                 range(0, recording.points, recording.points // 10)]
+        assert times == sorted(times)
+
+        # A recording whose Recorder was not closed
+        partial_path = os.path.join(directory, 'partial.bin')
+        recorder = record(partial_path, 25, close=False)
+        partial = Recording(partial_path)
+        print('Unclosed recording: {} of {} points readable'.format(
+            partial.points, 25 * CHUNK_POINTS))
+        assert partial.points % BLOCK_POINTS == 0
+        assert numpy.array_equal(partial.window(0, partial.duration),
+                                 expected(0, partial.points))
+        recorder.close()
+        del recording, partial, window
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,86 @@
+"""
+File:                       scan_plan.py
+
+Purpose:                    Compares the buffer sizing of a_in_scan_file.py
+                            with mcculw.plan.ScanPlan.for_rate() when the
+                            reader of a continuous scan stalls for a while,
+                            as it does when the disk or the GUI is busy.
+
+Demonstration:              For several rates on the simulated backend,
+                            prints the buffer size, memory footprint and
+                            overrun margin of each sizing, and whether a
+                            scan read with a 100 ms stall after every second
+                            overran. Also prints a plan for a simulated
+                            USB-1208FS, whose buffer must hold whole
+                            31-sample packets.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter, sleep
+
+from mcculw import sim
+from mcculw.enums import ErrorCode, ULRange
+from mcculw.plan import ScanPlan
+from mcculw.ul import ULError
+
+NUM_CHANS = 4
+RATES = (10000, 100000, 250000)
+DURATION = 3.0
+STALL = 0.1
+LATENCY = 0.05
+HEADROOM = 4
+
+
+def example_plan(rate):
+    # a_in_scan_file.py: a buffer of buffer_size_seconds, read a tenth at a
+    # time
+    buffer_size_seconds = 0.1
+    points_per_channel = max(int(rate * buffer_size_seconds), 10)
+    return ScanPlan(0, NUM_CHANS, rate, points_per_channel // 10, 10)
+
+
+def run_with_stalls(plan):
+    # Returns True if the scan overran
+    with plan.stream(0, ULRange.BIP10VOLTS) as stream:
+        start = last_stall = perf_counter()
+        try:
+            for _ in stream:
+                now = perf_counter()
+                if now - start > DURATION:
+                    return False
+                if now - last_stall > 1.0:
+                    sleep(STALL)
+                    last_stall = perf_counter()
+        except ULError as e:
+            if e.errorcode != ErrorCode.OVERRUN:
+                raise
+            return True
+    return False
+
+
+def run_benchmark():
+    sim.install()
+    for rate in RATES:
+        for name, plan in (
+                ('example', example_plan(rate)),
+                ('for_rate', ScanPlan.for_rate(0, NUM_CHANS, rate, LATENCY,
+                                               HEADROOM))):
+            overran = run_with_stalls(plan)
+            print('{:7d} Hz {:8}: {:7d} samples, {:8d} bytes, margin '
+                  '{:6.1f} ms, chunk {:5.1f} ms: {}'.format(
+                      rate, name, plan.count, plan.memory_bytes,
+                      plan.overrun_margin * 1000, plan.chunk_period * 1000,
+                      'OVERRUN' if overran else 'ok'))
+
+    sim.install([sim.SimulatedBoard(product_name='USB-1208FS',
+                                    product_id=130)])
+    plan = ScanPlan.for_rate(0, 3, 1000, LATENCY, HEADROOM)
+    assert plan.count % 31 == 0
+    print(plan)
+
+
+if __name__ == '__main__':
+    run_benchmark()
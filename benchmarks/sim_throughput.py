@@ -0,0 +1,71 @@
+"""
+File:                       sim_throughput.py
+
+Purpose:                    Runs a CONTINUOUS background scan on the simulated
+                            backend at 1 MS/s and drains the circular buffer
+                            with mcculw.ul.get_status() and
+                            mcculw.ul.win_buf_to_array(), the way an
+                            acquisition pipeline would.
+
+Demonstration:              Prints the sustained sample rate that was consumed
+                            and whether the scan overran.
+
+Special Requirements:       None; the simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import c_ushort
+from time import perf_counter, sleep
+
+from mcculw import ul, sim
+from mcculw.enums import FunctionType, ScanOptions, ULRange
+from mcculw.ul import ULError
+
+RATE = 250000
+NUM_CHANS = 4
+DURATION = 5.0
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install([sim.SimulatedBoard(fifo_size=RATE * NUM_CHANS // 10)])
+
+    buffer_count = RATE * NUM_CHANS // 2
+    chunk = buffer_count // 10
+    memhandle = ul.win_buf_alloc(buffer_count)
+    chunk_array = (c_ushort * chunk)()
+    consumed = 0
+    index = 0
+    try:
+        ul.a_in_scan(board_num, 0, NUM_CHANS - 1, buffer_count, RATE,
+                     ULRange.BIP10VOLTS, memhandle,
+                     ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS)
+        start = perf_counter()
+        while perf_counter() - start < DURATION:
+            _, cur_count, _ = ul.get_status(board_num,
+                                            FunctionType.AIFUNCTION)
+            if cur_count - consumed > buffer_count:
+                print('The pipeline fell behind the buffer')
+                break
+            if cur_count - consumed < chunk:
+                sleep(0.001)
+                continue
+            first = min(chunk, buffer_count - index)
+            ul.win_buf_to_array(memhandle, chunk_array, index, first)
+            if first < chunk:
+                ul.win_buf_to_array(memhandle, chunk_array, 0, chunk - first)
+            consumed += chunk
+            index = (index + chunk) % buffer_count
+        elapsed = perf_counter() - start
+        ul.stop_background(board_num, FunctionType.AIFUNCTION)
+        print('Consumed {:.2f} MS/s ({} samples in {:.2f} s)'.format(
+            consumed / elapsed / 1e6, consumed, elapsed))
+    except ULError as e:
+        print('Scan stopped:', e)
+    finally:
+        ul.win_buf_free(memhandle)
+
+
+if __name__ == '__main__':
+    run_benchmark()
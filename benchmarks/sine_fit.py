@@ -0,0 +1,115 @@
+"""
+File:                       sine_fit.py
+
+Purpose:                    Compares fitting the steps of a frequency sweep
+                            one at a time, as the qSweep examples do, with
+                            mcculw.analysis.fit_sine() on all of them at
+                            once.
+
+Demonstration:              Runs a sweep on the simulated backend with a
+                            10 kHz sine on the input, so that each step
+                            holds a different, fractional number of its
+                            cycles, fits it both ways and prints the time
+                            taken and the largest amplitude difference. The
+                            per-step fit is the scipy.optimize.curve_fit
+                            call of qSweep.py when SciPy is installed, and
+                            numpy.linalg.lstsq otherwise. Also times
+                            fit_sine on 10000 synthetic records and checks
+                            its error estimates against the actual scatter.
+
+Special Requirements:       NumPy; SciPy for the curve_fit comparison. The
+                            simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import math
+from time import perf_counter
+
+import numpy
+
+from mcculw import sim
+from mcculw.analysis import fit_sine
+from mcculw.conversion import counts_to_volts
+from mcculw.enums import ULRange
+from mcculw.sweep import FrequencySweep
+
+try:
+    from scipy.optimize import curve_fit
+except ImportError:
+    curve_fit = None
+
+FREQUENCIES = list(range(20000, 55001, 700))
+CYCLES = 5
+POINTS_PER_CYCLE = 9
+SIGNAL_FREQUENCY = 10000
+AMPLITUDE = 3.0
+PHASE = 0.7
+AI_RANGE = ULRange.BIP10VOLTS
+RECORDS = 10000
+NOISE = 0.01
+
+
+def per_step_fit(volts, cycles):
+    phi = numpy.arange(volts.size) * (2 * math.pi * cycles / volts.size)
+    if curve_fit is not None:
+        def model(x, offset, ampl, phase):
+            return offset + ampl * numpy.sin(x + phase)
+        params, _ = curve_fit(model, phi, volts, p0=[0, 1, 0],
+                              max_nfev=1500)
+        return abs(params[1])
+    design = numpy.column_stack([numpy.sin(phi), numpy.cos(phi),
+                                 numpy.ones_like(phi)])
+    (a, b, _), _, _, _ = numpy.linalg.lstsq(design, volts, rcond=None)
+    return math.hypot(a, b)
+
+
+def run_benchmark():
+    def signal(chan, t):
+        return AMPLITUDE * math.sin(2 * math.pi * SIGNAL_FREQUENCY * t + PHASE)
+    board = sim.SimulatedBoard(ai_signal=signal, ai_signal_period=0.01)
+    sim.install([board])
+    with FrequencySweep(0, FREQUENCIES, ULRange.BIP10VOLTS, AI_RANGE,
+                        cycles=CYCLES,
+                        points_per_cycle=POINTS_PER_CYCLE) as sweep:
+        counts = numpy.stack([data[:, 0] for data in sweep.run()])
+    volts = counts_to_volts(counts, AI_RANGE, 16)
+    # The cycles of the input in each step's record
+    cycles = (SIGNAL_FREQUENCY * CYCLES
+              / numpy.array(FREQUENCIES, dtype=float))
+
+    start = perf_counter()
+    serial = [per_step_fit(record, record_cycles)
+              for record, record_cycles in zip(volts, cycles)]
+    serial_time = perf_counter() - start
+    start = perf_counter()
+    fit = fit_sine(volts, cycles)
+    vector_time = perf_counter() - start
+    print('{} steps: per-step {} {:8.2f} ms, fit_sine {:6.2f} ms, largest '
+          'amplitude difference {:.2e} V; error from the input {:.2e} V, '
+          '{:.2e} rad'.format(
+              len(FREQUENCIES),
+              'curve_fit' if curve_fit is not None else 'lstsq',
+              serial_time * 1000, vector_time * 1000,
+              numpy.abs(fit.amplitude - serial).max(),
+              numpy.abs(fit.amplitude - AMPLITUDE).max(),
+              numpy.abs(fit.phase - PHASE).max()))
+
+    rng = numpy.random.RandomState(0)
+    points = CYCLES * POINTS_PER_CYCLE
+    amplitude = rng.uniform(0.5, 5, RECORDS)
+    phase = rng.uniform(-math.pi, math.pi, RECORDS)
+    phi = numpy.arange(points) * (2 * math.pi / POINTS_PER_CYCLE)
+    records = (amplitude[:, None] * numpy.sin(phi + phase[:, None])
+               + rng.normal(0, NOISE, (RECORDS, points)))
+    start = perf_counter()
+    fit = fit_sine(records, CYCLES)
+    elapsed = perf_counter() - start
+    print('{} records: fit_sine {:.1f} ms; amplitude error estimated '
+          '{:.2e} V, actual {:.2e} V'.format(
+              RECORDS, elapsed * 1000, fit.amplitude_error.mean(),
+              (fit.amplitude - amplitude).std()))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,52 @@
+"""
+File:                       stream_throughput.py
+
+Purpose:                    Reads a 1 MS/s continuous scan on the simulated
+                            backend through mcculw.stream.AnalogInputStream,
+                            reusing one output array for every chunk.
+
+Demonstration:              Prints the sustained sample rate that was consumed
+                            and whether the scan overran.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from time import perf_counter
+
+import numpy
+
+from mcculw import sim
+from mcculw.enums import ULRange
+from mcculw.stream import AnalogInputStream
+from mcculw.ul import ULError
+
+RATE = 250000
+NUM_CHANS = 4
+CHUNK_POINTS = RATE // 20
+DURATION = 5.0
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install([sim.SimulatedBoard(fifo_size=RATE * NUM_CHANS // 10)])
+
+    stream = AnalogInputStream(board_num, 0, NUM_CHANS - 1, RATE,
+                               ULRange.BIP10VOLTS, CHUNK_POINTS)
+    chunk = numpy.empty((CHUNK_POINTS, NUM_CHANS), stream.buffer.dtype)
+    try:
+        with stream:
+            start = perf_counter()
+            while perf_counter() - start < DURATION:
+                stream.read(out=chunk)
+            elapsed = perf_counter() - start
+        print('Consumed {:.2f} MS/s ({} samples in {:.2f} s)'.format(
+            stream.samples_read / elapsed / 1e6, stream.samples_read,
+            elapsed))
+    except ULError as e:
+        print('Scan stopped:', e)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,96 @@
+"""
+File:                       waveform_cache.py
+
+Purpose:                    Compares building the output sine of a sweep
+                            step the way examples/console/qSweep.py does,
+                            with numpy.linspace, one from_eng_units() call
+                            per point and the sineOutput[1::] extension,
+                            against mcculw.waveform.write_waveform(), built
+                            once and then copied from its cache.
+
+Demonstration:              Prints the time per waveform of each method for
+                            a sweep that returns to the same few amplitudes,
+                            the cache statistics, and whether each buffer
+                            stays periodic when it loops: the example's
+                            46 points end on the 0 they start with, so a
+                            CONTINUOUS scan outputs it twice in a row.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import cast, POINTER, c_ushort
+from time import perf_counter
+
+import numpy
+
+from mcculw import ul, sim
+from mcculw import waveform
+from mcculw.enums import ULRange
+
+AO_RANGE = ULRange.BIP10VOLTS
+WAVE_POINTS = 10
+TOTAL_POINTS = 46
+CYCLES = 5
+AMPLITUDES = [1.0, 2.0, 5.0, 10.0] * 25
+
+
+def example_sine(board_num, amplitude, memhandle):
+    # qSweep.py: sine() and the buffer filling of qSweep()
+    x_data = numpy.linspace(0, 2 * numpy.pi, WAVE_POINTS)
+    sine_output = [ul.from_eng_units(board_num, AO_RANGE, v)
+                   for v in (numpy.sin(x_data) * amplitude).tolist()]
+    sine_output.extend(sine_output[1::] * int(TOTAL_POINTS
+                                               / len(sine_output)))
+    output_array = cast(memhandle, POINTER(c_ushort))
+    for i in range(len(sine_output)):
+        output_array[i] = sine_output[i]
+    return len(sine_output)
+
+
+def loops_seamlessly(counts, period):
+    # True if the buffer, repeated, is periodic with the cycle length
+    looped = numpy.tile(counts, 2)
+    return bool((looped[period:] == looped[:-period]).all())
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install()
+    memhandle = ul.win_buf_alloc(TOTAL_POINTS)
+    try:
+        start = perf_counter()
+        for amplitude in AMPLITUDES:
+            points = example_sine(board_num, amplitude, memhandle)
+        example_time = (perf_counter() - start) / len(AMPLITUDES)
+        example = numpy.ctypeslib.as_array(
+            (c_ushort * points).from_address(memhandle)).copy()
+
+        # The same cycles, without the repeated point
+        points = CYCLES * (WAVE_POINTS - 1)
+        waveform.clear_cache()
+        start = perf_counter()
+        for amplitude in AMPLITUDES:
+            waveform.write_waveform(memhandle, 'sine', points, CYCLES,
+                                    amplitude, AO_RANGE, 16)
+        cached_time = (perf_counter() - start) / len(AMPLITUDES)
+        cached = numpy.ctypeslib.as_array(
+            (c_ushort * points).from_address(memhandle)).copy()
+    finally:
+        ul.win_buf_free(memhandle)
+
+    print('qSweep sine():  {:7.1f} us per waveform'.format(
+        example_time * 1e6))
+    print('write_waveform: {:7.1f} us per waveform, {}'.format(
+        cached_time * 1e6, waveform.cache_info()))
+    # Whole cycles: every cycle is the same
+    assert (cached.reshape(CYCLES, -1) == cached[:WAVE_POINTS - 1]).all()
+    period = WAVE_POINTS - 1
+    print('loops seamlessly: qSweep ({} points) {}, write_waveform ({} '
+          'points) {}'.format(example.size, loops_seamlessly(example, period),
+                              cached.size, loops_seamlessly(cached, period)))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,67 @@
+"""
+File:                       waveform_encoding.py
+
+Purpose:                    Compares building an output waveform the way
+                            examples/console/qSweep.py does, with one
+                            mcculw.ul.from_eng_units() call and one ctypes
+                            element store per point, against
+                            mcculw.conversion.volts_to_counts() writing
+                            straight into the output buffer.
+
+Demonstration:              Checks that both methods write the same counts,
+                            then prints the time each method takes.
+
+Special Requirements:       NumPy. The simulated backend needs no hardware.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import cast, POINTER, c_ushort
+from time import perf_counter
+
+import numpy
+
+from mcculw import ul, sim
+from mcculw.conversion import volts_to_counts
+from mcculw.device_info import DaqDeviceInfo
+from mcculw.enums import ULRange
+
+NUM_POINTS = 20000
+
+
+def run_benchmark():
+    board_num = 0
+    sim.install()
+    resolution = DaqDeviceInfo(board_num).get_ao_info().resolution
+    ao_range = ULRange.BIP10VOLTS
+    # Overdriven slightly, so clipping is exercised too
+    volts = 10.5 * numpy.sin(numpy.linspace(0, 2 * numpy.pi, NUM_POINTS))
+
+    loop_handle = ul.win_buf_alloc(NUM_POINTS)
+    vector_handle = ul.win_buf_alloc(NUM_POINTS)
+    try:
+        start = perf_counter()
+        output_array = cast(loop_handle, POINTER(c_ushort))
+        for i, value in enumerate(volts):
+            output_array[i] = ul.from_eng_units(board_num, ao_range,
+                                                float(value))
+        loop_time = perf_counter() - start
+
+        start = perf_counter()
+        volts_to_counts(volts, ao_range, resolution, out=vector_handle)
+        vector_time = perf_counter() - start
+
+        expected = numpy.ctypeslib.as_array(output_array, (NUM_POINTS,))
+        written = numpy.ctypeslib.as_array(
+            cast(vector_handle, POINTER(c_ushort)), (NUM_POINTS,))
+        assert numpy.array_equal(expected, written)
+        print('from_eng_units loop: {:.3f} s'.format(loop_time))
+        print('volts_to_counts:     {:.5f} s ({:.0f}x), counts identical'
+              .format(vector_time, loop_time / vector_time))
+    finally:
+        ul.win_buf_free(loop_handle)
+        ul.win_buf_free(vector_handle)
+
+
+if __name__ == '__main__':
+    run_benchmark()
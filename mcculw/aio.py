@@ -0,0 +1,397 @@
+# -*- coding: UTF-8 -*-
+
+"""
+asyncio versions of the background scan functions.
+
+Each function starts its scan in BACKGROUND mode and returns a
+:class:`BackgroundScan`, which can be awaited for completion with
+:meth:`BackgroundScan.done` or iterated with ``async for`` to receive the
+data in chunks as it is acquired::
+
+    async with await aio.a_in_scan(board_num, 0, 3, 40000, 10000,
+                                   ULRange.BIP10VOLTS) as scan:
+        async for chunk in scan:
+            process(chunk)
+
+Waiting is done with :func:`asyncio.sleep` between
+:func:`mcculw.ul.get_status` calls, at an interval adapted to the time left
+until the data being waited for is due, so a single event loop can drive
+scans on many boards without a thread per board.
+
+Requires Python 3.6 or later, and NumPy.
+"""
+import asyncio
+
+from mcculw import ul
+from mcculw.buffer import SampleCounter, ScanBuffer
+from mcculw.enums import ErrorCode, FunctionType, ScanOptions, Status
+from mcculw.ul import ULError
+
+# Bounds of the time waited between two get_status calls, in seconds
+_MIN_POLL_INTERVAL = 0.0005
+_MAX_POLL_INTERVAL = 0.05
+
+# The default chunk length of async iteration, in seconds of acquisition
+_DEFAULT_CHUNK_TIME = 0.1
+
+_INPUT_FUNCTIONS = (FunctionType.AIFUNCTION, FunctionType.DIFUNCTION,
+                    FunctionType.CTRFUNCTION, FunctionType.DAQIFUNCTION)
+
+
+class BackgroundScan(object):
+    """A running background scan, as returned by the functions of this
+    module.
+
+    Attributes
+    ----------
+    board_num : int
+        The board the scan runs on
+    function_type : FunctionType
+        The function type passed to :func:`.get_status` for the scan
+    buffer : ScanBuffer or None
+        The buffer of the scan. None for output scans started with a
+        memhandle.
+    rate : int
+        The actual sample rate per channel
+    count : int
+        The total number of samples of the scan, over all channels. For a
+        continuous scan, the size of its circular buffer.
+    channels : int
+        The number of channels in the scan
+    continuous : bool
+        True if the scan was started with the CONTINUOUS option
+    """
+
+    def __init__(self, board_num, function_type, buffer, rate, count,
+                 channels, options, chunk_points=None, owns_buffer=False):
+        self.board_num = board_num
+        self.function_type = function_type
+        self.buffer = buffer
+        self.rate = rate
+        self.count = count
+        self.channels = channels
+        self.continuous = bool(options & ScanOptions.CONTINUOUS)
+        if chunk_points is None:
+            chunk_points = max(1, int(rate * _DEFAULT_CHUNK_TIME))
+        if self.continuous:
+            # A chunk cannot be more than half of the circular buffer
+            chunk_points = min(chunk_points, count // channels // 2)
+        self.chunk_points = max(1, chunk_points)
+        self._stopped = False
+        self._owns_buffer = owns_buffer
+        # The number of samples transferred, from get_status counts, which
+        # roll over
+        self._counter = SampleCounter()
+
+    @property
+    def is_input(self):  # -> boolean
+        return self.function_type in _INPUT_FUNCTIONS
+
+    def status(self):
+        """Returns the current status of the scan, like :func:`.get_status`.
+
+        Returns
+        -------
+        Status, int, int
+            The status of the operation, the number of samples transferred,
+            and the index in the buffer of the last transfer
+        """
+        return ul.get_status(self.board_num, self.function_type)
+
+    def stop(self):
+        """Stops the scan with :func:`.stop_background`. Has no effect if the
+        scan was already stopped."""
+        if not self._stopped:
+            self._stopped = True
+            ul.stop_background(self.board_num, self.function_type)
+
+    def close(self):
+        """Stops the scan and frees its buffer if the buffer was allocated
+        by this module."""
+        try:
+            self.stop()
+        finally:
+            if self._owns_buffer:
+                self.buffer.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _count(self):
+        # Returns the status and the total number of samples transferred
+        try:
+            status, cur_count, _ = self.status()
+        except ULError:
+            self.stop()
+            raise
+        return status, self._counter.update(cur_count)
+
+    async def _wait(self, target=None):
+        # Waits until target samples have been transferred, or until the
+        # scan is no longer running. Returns the status and sample count.
+        sample_rate = self.rate * self.channels
+        while True:
+            status, cur_count = self._count()
+            if status != Status.RUNNING or (target is not None
+                                            and cur_count >= target):
+                return status, cur_count
+            if target is None and self.continuous:
+                interval = _MAX_POLL_INTERVAL
+            else:
+                remaining = (self.count if target is None else target)
+                interval = (remaining - cur_count) / sample_rate
+            await asyncio.sleep(min(max(interval, _MIN_POLL_INTERVAL),
+                                    _MAX_POLL_INTERVAL))
+
+    async def done(self):
+        """Waits for the scan to finish, then calls
+        :func:`.stop_background`. A continuous scan finishes only when it is
+        stopped with :meth:`stop` or fails.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The (points, channels) view of the buffer, or None if the scan
+            has no :class:`.ScanBuffer`
+
+        Raises
+        ------
+        ULError
+            If the scan failed
+        """
+        try:
+            await self._wait()
+        finally:
+            self.stop()
+        return None if self.buffer is None else self.buffer.array
+
+    def _check_overrun(self, cur_count, consumed):
+        if self.continuous and cur_count - consumed > self.count:
+            self.stop()
+            raise ULError(ErrorCode.OVERRUN)
+
+    async def chunks(self):
+        """Yields the data of an input scan in (chunk_points, channels)
+        arrays, in order, as it is acquired. The last chunk of a scan that is
+        not continuous may be shorter. The arrays are copies, so they stay
+        valid when the buffer is reused.
+
+        Raises
+        ------
+        ULError
+            If the scan failed, or with error code OVERRUN if a continuous
+            scan overwrote data before it was read
+        """
+        if not self.is_input or self.buffer is None:
+            raise TypeError('only input scans with a ScanBuffer can be '
+                            'iterated')
+        chunk_count = self.chunk_points * self.channels
+        consumed = 0
+        try:
+            while True:
+                end = consumed + chunk_count
+                if not self.continuous:
+                    end = min(end, self.count)
+                    if end == consumed:
+                        return
+                status, cur_count = await self._wait(end)
+                if cur_count < end:
+                    # Stopped early: hand out the complete frames acquired
+                    end = cur_count - cur_count % self.channels
+                    if end <= consumed:
+                        return
+                self._check_overrun(cur_count, consumed)
+                chunk = self.buffer.copy(consumed, end - consumed)
+                self._check_overrun(self._count()[1], consumed)
+                consumed = end
+                yield chunk.reshape((-1, self.channels))
+        finally:
+            if not self.continuous:
+                self.stop()
+
+    def __aiter__(self):
+        return self.chunks()
+
+
+def _memhandle(buffer):
+    # Scan functions take a ScanBuffer, or a memhandle for output scans
+    return getattr(buffer, 'memhandle', buffer)
+
+
+def _check_buffer(buffer, count, options):
+    if buffer.count < count:
+        raise ValueError('buffer holds fewer than {} samples'.format(count))
+    if options & ScanOptions.CONTINUOUS and buffer.count != count:
+        raise ValueError('the buffer of a continuous scan must hold '
+                         'exactly {} samples'.format(count))
+
+
+async def a_in_scan(board_num, low_chan, high_chan, num_points, rate,
+                    ul_range, buffer=None, options=0, chunk_points=None):
+    """Starts :func:`.a_in_scan` in the background.
+
+    Parameters
+    ----------
+    board_num, low_chan, high_chan, num_points, rate, ul_range
+        As for :func:`.a_in_scan`.
+    buffer : ScanBuffer, optional
+        The buffer to scan into. By default one is allocated with
+        :meth:`.ScanBuffer.for_board`.
+    options : ScanOptions, optional
+        As for :func:`.a_in_scan`. BACKGROUND is always set.
+    chunk_points : int, optional
+        The number of samples per channel in each chunk of async iteration.
+        Defaults to 0.1 s of data.
+
+    Returns
+    -------
+    BackgroundScan
+        The running scan
+    """
+    channels = high_chan - low_chan + 1
+    options |= ScanOptions.BACKGROUND
+    owns_buffer = buffer is None
+    if owns_buffer:
+        buffer = ScanBuffer.for_board(board_num, -(-num_points // channels),
+                                      channels, options)
+    _check_buffer(buffer, num_points, options)
+    rate = ul.a_in_scan(board_num, low_chan, high_chan, num_points, rate,
+                        ul_range, buffer.memhandle, options)
+    return BackgroundScan(board_num, FunctionType.AIFUNCTION, buffer, rate,
+                          num_points, channels, options, chunk_points,
+                          owns_buffer)
+
+
+async def a_out_scan(board_num, low_chan, high_chan, num_points, rate,
+                     ul_range, buffer, options=0):
+    """Starts :func:`.a_out_scan` in the background.
+
+    Parameters
+    ----------
+    board_num, low_chan, high_chan, num_points, rate, ul_range
+        As for :func:`.a_out_scan`.
+    buffer : ScanBuffer or int
+        The buffer holding the output data, or its memhandle.
+    options : ScanOptions, optional
+        As for :func:`.a_out_scan`. BACKGROUND is always set.
+
+    Returns
+    -------
+    BackgroundScan
+        The running scan
+    """
+    channels = high_chan - low_chan + 1
+    options |= ScanOptions.BACKGROUND
+    rate = ul.a_out_scan(board_num, low_chan, high_chan, num_points, rate,
+                         ul_range, _memhandle(buffer), options)
+    return BackgroundScan(
+        board_num, FunctionType.AOFUNCTION,
+        buffer if isinstance(buffer, ScanBuffer) else None, rate,
+        num_points, channels, options)
+
+
+async def daq_in_scan(board_num, chan_list, chan_type_list, gain_list,
+                      chan_count, rate, pretrig_count, total_count,
+                      buffer=None, options=0, chunk_points=None):
+    """Starts :func:`.daq_in_scan` in the background.
+
+    Parameters
+    ----------
+    board_num, chan_list, chan_type_list, gain_list, chan_count, rate,
+    pretrig_count, total_count
+        As for :func:`.daq_in_scan`.
+    buffer : ScanBuffer, optional
+        The buffer to scan into. By default a 16-bit buffer is allocated.
+    options : ScanOptions, optional
+        As for :func:`.daq_in_scan`. BACKGROUND is always set.
+    chunk_points : int, optional
+        The number of samples per channel in each chunk of async iteration.
+        Defaults to 0.1 s of data.
+
+    Returns
+    -------
+    BackgroundScan
+        The running scan
+    """
+    options |= ScanOptions.BACKGROUND
+    owns_buffer = buffer is None
+    if owns_buffer:
+        buffer = ScanBuffer(-(-total_count // chan_count), chan_count,
+                            options=options)
+    _check_buffer(buffer, total_count, options)
+    result = ul.daq_in_scan(board_num, chan_list, chan_type_list, gain_list,
+                            chan_count, rate, pretrig_count, total_count,
+                            buffer.memhandle, options)
+    return BackgroundScan(board_num, FunctionType.DAQIFUNCTION, buffer,
+                          result.rate, result.total_count, chan_count,
+                          options, chunk_points, owns_buffer)
+
+
+async def c_in_scan(board_num, first_ctr, last_ctr, count, rate, buffer=None,
+                    options=0, chunk_points=None):
+    """Starts :func:`.c_in_scan` in the background.
+
+    Parameters
+    ----------
+    board_num, first_ctr, last_ctr, count, rate
+        As for :func:`.c_in_scan`.
+    buffer : ScanBuffer, optional
+        The buffer to scan into. By default a 32-bit buffer is allocated, or
+        a 64-bit one if options includes CTR64BIT.
+    options : ScanOptions, optional
+        As for :func:`.c_in_scan`. BACKGROUND is always set.
+    chunk_points : int, optional
+        The number of samples per counter in each chunk of async iteration.
+        Defaults to 0.1 s of data.
+
+    Returns
+    -------
+    BackgroundScan
+        The running scan
+    """
+    channels = last_ctr - first_ctr + 1
+    options |= ScanOptions.BACKGROUND
+    owns_buffer = buffer is None
+    if owns_buffer:
+        resolution = 64 if options & ScanOptions.CTR64BIT else 32
+        buffer = ScanBuffer(-(-count // channels), channels, resolution)
+    _check_buffer(buffer, count, options)
+    rate = ul.c_in_scan(board_num, first_ctr, last_ctr, count, rate,
+                        buffer.memhandle, options)
+    return BackgroundScan(board_num, FunctionType.CTRFUNCTION, buffer, rate,
+                          count, channels, options, chunk_points, owns_buffer)
+
+
+async def d_in_scan(board_num, port_type, count, rate, buffer=None,
+                    options=0, chunk_points=None):
+    """Starts :func:`.d_in_scan` in the background.
+
+    Parameters
+    ----------
+    board_num, port_type, count, rate
+        As for :func:`.d_in_scan`.
+    buffer : ScanBuffer, optional
+        The buffer to scan into. By default a 16-bit buffer is allocated.
+    options : ScanOptions, optional
+        As for :func:`.d_in_scan`. BACKGROUND is always set.
+    chunk_points : int, optional
+        The number of samples in each chunk of async iteration. Defaults to
+        0.1 s of data.
+
+    Returns
+    -------
+    BackgroundScan
+        The running scan
+    """
+    options |= ScanOptions.BACKGROUND
+    owns_buffer = buffer is None
+    if owns_buffer:
+        buffer = ScanBuffer(count)
+    _check_buffer(buffer, count, options)
+    rate = ul.d_in_scan(board_num, port_type, count, rate, buffer.memhandle,
+                        options)
+    return BackgroundScan(board_num, FunctionType.DIFUNCTION, buffer, rate,
+                          count, 1, options, chunk_points, owns_buffer)
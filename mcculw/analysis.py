@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Analysis of sine responses acquired at a known frequency, such as the steps
+of a :class:`mcculw.sweep.FrequencySweep`.
+
+When the frequency is known, the amplitude, phase and offset of a sine are
+linear in the sine and cosine components of the signal, so
+:func:`fit_sine` solves them in closed form by linear least squares, for all
+the records of a sweep at once, instead of fitting each with an iterative
+nonlinear solver. Over a whole number of cycles this is the same as I/Q
+demodulation.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import collections
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+# The parameters of the sines offset + amplitude * sin(phi + phase) fitted by
+# fit_sine, their standard errors and the RMS of the residuals
+SineFit = collections.namedtuple(
+    'SineFit', 'amplitude phase offset amplitude_error phase_error '
+    'offset_error rms_residual')
+
+
+def _design(cycles, points):
+    # The columns of the model, sin(phi), cos(phi) and 1, with phi advancing
+    # by 2*pi*cycles over the record: shape (..., points, 3)
+    phi = numpy.multiply.outer(cycles * (2 * numpy.pi / points),
+                               numpy.arange(points))
+    return numpy.stack([numpy.sin(phi), numpy.cos(phi),
+                        numpy.ones_like(phi)], axis=-1)
+
+
+def fit_sine(data, cycles, axis=-1):
+    """Fits a sine of known frequency to each record of a batch.
+
+    Solves offset + a * sin(phi) + b * cos(phi), with phi = 2 * pi * cycles
+    * n / points at sample n, by linear least squares for every record in a
+    single vectorized pass, and derives the amplitude sqrt(a**2 + b**2) and
+    phase atan2(b, a). The standard errors come from the residual variance of
+    each record. The phase is relative to the first sample of the record.
+
+    Parameters
+    ----------
+    data : numpy.ndarray or sequence of array
+        The records, in any units, for example the volts of the steps of a
+        sweep stacked into a (steps, points) array. Counts may be fitted
+        directly: the amplitude is then in counts.
+    cycles : float or numpy.ndarray
+        The number of cycles of the sine in each record, not necessarily a
+        whole number, either the same for all records or an array that
+        broadcasts against the other axes of data.
+    axis : int, optional
+        The axis of data along which the samples of a record lie.
+
+    Returns
+    -------
+    SineFit
+        The fitted parameters, their standard errors and the RMS residual,
+        arrays with the shape of data without axis. The phase is in radians,
+        in (-pi, pi].
+    """
+    data = numpy.moveaxis(numpy.asarray(data, dtype=numpy.float64), axis, -1)
+    points = data.shape[-1]
+    if points < 4:
+        raise ValueError('a record must have at least 4 samples')
+    cycles = numpy.asarray(cycles, dtype=numpy.float64)
+
+    if cycles.ndim == 0:
+        # One model for all records: solve it once and apply it as a matrix
+        # product
+        design = _design(cycles, points)
+        inverse = numpy.linalg.inv(design.T.dot(design))
+        coefficients = data.dot(design.dot(inverse))
+        fitted = coefficients.dot(design.T)
+    else:
+        cycles = numpy.broadcast_to(cycles, data.shape[:-1])
+        design = _design(cycles, points)
+        normal = numpy.einsum('...pi,...pj->...ij', design, design)
+        inverse = numpy.linalg.inv(normal)
+        coefficients = numpy.einsum('...ij,...pj,...p->...i', inverse,
+                                    design, data)
+        fitted = numpy.einsum('...pi,...i->...p', design, coefficients)
+
+    residual_ss = ((data - fitted) ** 2).sum(axis=-1)
+    variance = residual_ss / (points - 3)
+    var_a = variance * inverse[..., 0, 0]
+    var_b = variance * inverse[..., 1, 1]
+    cov_ab = variance * inverse[..., 0, 1]
+    var_offset = variance * inverse[..., 2, 2]
+
+    a = coefficients[..., 0]
+    b = coefficients[..., 1]
+    amplitude = numpy.hypot(a, b)
+    phase = numpy.arctan2(b, a)
+    # First-order propagation of the covariance of (a, b)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        amplitude_var = (a * a * var_a + b * b * var_b
+                         + 2 * a * b * cov_ab) / amplitude ** 2
+        phase_var = (b * b * var_a + a * a * var_b
+                     - 2 * a * b * cov_ab) / amplitude ** 4
+    return SineFit(amplitude, phase, coefficients[..., 2],
+                   numpy.sqrt(numpy.maximum(amplitude_var, 0)),
+                   numpy.sqrt(numpy.maximum(phase_var, 0)),
+                   numpy.sqrt(var_offset),
+                   numpy.sqrt(residual_ss / points))
@@ -0,0 +1,306 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Selects the library that implements the UL cbXxx functions and binds each of
+those functions the first time it is called.
+
+By default the Universal Library DLL (cbw32.dll or cbw64.dll, depending on the
+Python architecture in use) is loaded on first use. A different backend can be
+selected with :func:`.set_backend` or through the MCCULW_BACKEND environment
+variable, which accepts either a path to a library or the import path of a
+Python object that provides the cbXxx functions (``package.module`` or
+``package.module:attribute``; classes are instantiated with no arguments).
+"""
+from __future__ import absolute_import, division, print_function
+import ctypes
+import importlib
+import os
+import struct
+import threading
+from ctypes import CDLL, c_int
+from ctypes.util import find_library
+from builtins import *  # @UnusedWildImport
+
+try:
+    # Native str and unicode on Python 2, where the builtins str above only
+    # matches unicode and so rejects paths from os.environ
+    from past.builtins import basestring  # @UnresolvedImport
+except ImportError:
+    basestring = str
+
+BACKEND_ENV_VAR = 'MCCULW_BACKEND'
+
+_LIBRARY_EXTENSIONS = ('.dll', '.so', '.dylib')
+
+
+def default_library_name():
+    """Returns the file name of the UL DLL that matches the Python
+    architecture in use.
+
+    Returns
+    -------
+    string
+        'cbw32.dll' for 32-bit Python, otherwise 'cbw64.dll'
+    """
+    is_32bit = struct.calcsize("P") == 4
+    return 'cbw32.dll' if is_32bit else 'cbw64.dll'
+
+
+def load_library(path=None):
+    """Loads a library that exports the UL cbXxx functions.
+
+    Parameters
+    ----------
+    path : string, optional
+        The path to the library. If omitted, the UL DLL for the Python
+        architecture in use is located with :func:`ctypes.util.find_library`.
+
+    Returns
+    -------
+    ctypes.CDLL
+        The loaded library (a :class:`ctypes.WinDLL` on Windows)
+    """
+    if path is None:
+        dll_file_name = default_library_name()
+        path = find_library(dll_file_name)
+        if path is None:
+            path = dll_file_name
+    # The UL DLL uses the stdcall calling convention, which only exists on
+    # Windows. Other platforms can only load stand-in libraries.
+    loader = getattr(ctypes, 'WinDLL', CDLL)
+    return loader(path)
+
+
+def import_backend(import_path):
+    """Imports a Python object that provides the UL cbXxx functions.
+
+    Parameters
+    ----------
+    import_path : string
+        The import path of the object, either ``package.module`` or
+        ``package.module:attribute``. If the object is a class, it is
+        instantiated with no arguments.
+
+    Returns
+    -------
+    object
+        The backend object
+    """
+    module_name, _, attribute = import_path.partition(':')
+    backend = importlib.import_module(module_name)
+    if attribute:
+        for name in attribute.split('.'):
+            backend = getattr(backend, name)
+    return resolve_backend(backend)
+
+
+def resolve_backend(backend=None):
+    """Converts a backend specification into a backend object.
+
+    Parameters
+    ----------
+    backend : string or object, optional
+        A library path, an import path (see :func:`.import_backend`), an
+        object that provides the cbXxx functions or a class that is
+        instantiated with no arguments to create one. If omitted, the
+        MCCULW_BACKEND environment variable is used and, if that is not set,
+        the UL DLL is loaded.
+
+    Returns
+    -------
+    object
+        The backend object
+    """
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENV_VAR) or None
+        if backend is None:
+            return load_library()
+    if isinstance(backend, basestring):
+        if _is_library_path(backend):
+            return load_library(backend)
+        return import_backend(backend)
+    if isinstance(backend, type):
+        backend = backend()
+    return backend
+
+
+def _is_library_path(spec):
+    if os.path.splitext(spec)[1].lower() in _LIBRARY_EXTENSIONS:
+        return True
+    if os.sep in spec or (os.altsep and os.altsep in spec):
+        return True
+    return os.path.isfile(spec)
+
+
+class _Prototype(object):
+    """Holds the ctypes signature declared for a cbXxx function until the
+    function is bound, and binds it when it is first called."""
+    __slots__ = ('name', 'argtypes', 'restype', '_library')
+
+    def __init__(self, library, name):
+        self.name = name
+        self.argtypes = None
+        self.restype = c_int
+        self._library = library
+
+    def __call__(self, *args):
+        return self._library.bind(self.name)(*args)
+
+
+class LazyLibrary(object):
+    """Stands in for the loaded UL library, deferring both the library load
+    and the lookup of each function until the function is first called.
+
+    Attribute access returns a prototype on which argtypes and restype can be
+    declared exactly as on a :class:`ctypes.CDLL` function. Calling a
+    prototype binds the function from the backend, applies the declared
+    signature (for ctypes libraries only) and caches the bound function on the
+    instance, so later attribute lookups return it directly.
+
+    Parameters
+    ----------
+    backend : string or object, optional
+        The backend specification passed to :func:`.resolve_backend` on first
+        use.
+    """
+
+    def __init__(self, backend=None):
+        self._lock = threading.RLock()
+        self._backend_spec = backend
+        self._backend = None
+        self._prototypes = {}
+        self._wrapper = None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        prototype = self._prototypes.get(name)
+        if prototype is None:
+            prototype = self._prototypes.setdefault(
+                name, _Prototype(self, name))
+        return prototype
+
+    @property
+    def backend(self):
+        """The backend object, loaded on first access."""
+        with self._lock:
+            if self._backend is None:
+                self._backend = resolve_backend(self._backend_spec)
+            return self._backend
+
+    @property
+    def is_loaded(self):
+        return self._backend is not None
+
+    def set_backend(self, backend=None):
+        """Selects the backend used for all subsequent calls. Functions that
+        were already bound are rebound from the new backend on their next
+        call.
+
+        Parameters
+        ----------
+        backend : string or object, optional
+            The backend specification (see :func:`.resolve_backend`). If
+            omitted, the default backend is restored.
+        """
+        with self._lock:
+            self._unbind_all()
+            self._backend_spec = backend
+            self._backend = None
+            if backend is not None and not isinstance(backend, basestring):
+                self._backend = resolve_backend(backend)
+
+    def set_wrapper(self, wrapper=None):
+        """Installs a function that wraps every cbXxx function as it is bound,
+        for example to instrument calls. Functions that were already bound
+        are rebound, with or without the wrapper, on their next call, so
+        removing the wrapper restores direct calls with no overhead.
+
+        Parameters
+        ----------
+        wrapper : callable, optional
+            Called as wrapper(name, func) with the name and bound function;
+            returns the callable to use in its place. None removes the
+            wrapper.
+        """
+        with self._lock:
+            self._unbind_all()
+            self._wrapper = wrapper
+
+    def bind(self, name):
+        """Binds a single function from the backend.
+
+        Parameters
+        ----------
+        name : string
+            The name of the function, such as 'cbAIn'
+
+        Returns
+        -------
+        callable
+            The bound function
+        """
+        with self._lock:
+            func = self.__dict__.get(name)
+            if func is None:
+                func = self._resolve(name)
+                self.__dict__[name] = func
+            return func
+
+    def bind_all(self):
+        """Binds every function that has a declared prototype. This loads the
+        backend immediately and reports missing functions up front, instead
+        of on their first call."""
+        with self._lock:
+            for name in list(self._prototypes):
+                self.bind(name)
+
+    def _resolve(self, name):
+        backend = self.backend
+        func = getattr(backend, name)
+        prototype = self._prototypes.get(name)
+        if prototype is not None and isinstance(backend, CDLL):
+            if prototype.argtypes is not None:
+                func.argtypes = prototype.argtypes
+            func.restype = prototype.restype
+        if self._wrapper is not None:
+            func = self._wrapper(name, func)
+        return func
+
+    def _unbind_all(self):
+        for name in self._prototypes:
+            self.__dict__.pop(name, None)
+
+
+cbw = LazyLibrary()
+
+
+def set_backend(backend=None):
+    """Selects the backend used by :mod:`mcculw.ul`.
+
+    Parameters
+    ----------
+    backend : string or object, optional
+        A library path, an import path such as
+        ``'mcculw_stand_in.module:Backend'``, or an object that provides the
+        cbXxx functions. If omitted, the default backend (MCCULW_BACKEND, or
+        the UL DLL) is restored.
+    """
+    cbw.set_backend(backend)
+
+
+def get_backend():
+    """Returns the backend used by :mod:`mcculw.ul`, loading it if necessary.
+
+    Returns
+    -------
+    object
+        The backend object
+    """
+    return cbw.backend
+
+
+def bind_all():
+    """Loads the backend and binds every cbXxx function declared by
+    :mod:`mcculw.ul`. See :meth:`LazyLibrary.bind_all`."""
+    cbw.bind_all()
@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Analysis of large batches of records, such as the captures of a long test
+or the amplitude lists of many sweeps, on a pool of processes.
+
+:class:`BatchRunner` calls a function on every record of an array in worker
+processes. The array is copied once into a shared memory block that the
+workers map, rather than pickled to them record by record, and only the
+results travel back. Use it for fits that cannot be vectorized, such as
+nonlinear models; :func:`mcculw.analysis.fit_sine` fits sines of known
+frequency to a whole batch at once in this process.
+
+The function called on the records must be defined at module level, so that
+the workers can import it.
+
+Requires Python 3.8 or later, and NumPy.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy
+
+
+def _run_chunk(name, shape, dtype, start, stop, func, args):
+    # The block is mapped for the duration of the chunk only: a mapping kept
+    # by an idle worker would pin its memory after the parent unlinks it.
+    # The workers share the resource tracker of the process that created
+    # the block, so attaching does not make them unlink it.
+    block = shared_memory.SharedMemory(name)
+    # Unlike numpy.ndarray(buffer=...), frombuffer holds the buffer while
+    # views of it exist, so that closing the block under a kept view fails
+    # rather than unmapping it
+    records = numpy.frombuffer(block.buf, dtype,
+                               int(numpy.prod(shape))).reshape(shape)
+    records.flags.writeable = False
+    try:
+        results = [func(records[i], *args) for i in range(start, stop)]
+    except BaseException:
+        del records
+        try:
+            block.close()
+        except BufferError:
+            # The traceback still references the record being processed.
+            # The mapping is freed with it, once the exception has been
+            # sent to the parent.
+            pass
+        raise
+    del records
+    try:
+        block.close()
+    except BufferError:
+        raise BufferError(
+            '{!r} kept a view of a record beyond its call; copy the record '
+            'to keep it'.format(func)) from None
+    return results
+
+
+class BatchRunner(object):
+    """A pool of worker processes that map functions over the records of
+    arrays.
+
+    The pool is started once and reused by every :meth:`map` call until
+    :meth:`close`, or the end of a ``with`` block.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        The number of worker processes. By default, the number of CPUs.
+    chunk_size : int, optional
+        The number of records sent to a worker at a time. By default, the
+        records are split into about four chunks per worker, so that
+        progress is reported regularly and the load stays balanced.
+    mp_context : multiprocessing context, optional
+        The context the workers are started with, as for
+        :class:`concurrent.futures.ProcessPoolExecutor`. By default,
+        forkserver where it is available and spawn elsewhere. Workers forked
+        from this process while a :meth:`map` runs would keep its shared
+        memory mapped for as long as they live.
+    """
+
+    def __init__(self, max_workers=None, chunk_size=None, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        if mp_context is None:
+            mp_context = multiprocessing.get_context(
+                'forkserver' if 'forkserver'
+                in multiprocessing.get_all_start_methods() else 'spawn')
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.max_workers, mp_context)
+
+    def map(self, func, data, args=(), progress=None):
+        """Calls func(record, *args) on every record of data in the worker
+        processes.
+
+        Parameters
+        ----------
+        func : callable
+            The function to call, defined at module level. The record it
+            receives is a read-only view of shared memory, only valid for
+            the duration of the call: copy it to keep it. Its result must be
+            picklable.
+        data : numpy.ndarray
+            The records, along the first axis, for example a (captures,
+            points) array or a (sweeps, steps) array of amplitudes. It must
+            not have object dtype.
+        args : tuple, optional
+            Further arguments passed to func, pickled once per chunk.
+        progress : callable, optional
+            Called as progress(done, total) in this process each time a
+            chunk completes, with the number of records done so far and the
+            number of records.
+
+        Returns
+        -------
+        list
+            The results, in the order of the records
+
+        Raises
+        ------
+        Exception
+            The first exception raised by func. The chunks not yet started
+            are cancelled.
+        BufferError
+            If func kept a view of a record after returning.
+        """
+        data = numpy.asarray(data)
+        if data.dtype.hasobject:
+            raise ValueError('data must not have object dtype')
+        if data.ndim == 0:
+            raise ValueError('data must have at least one dimension')
+        total = len(data)
+        if total == 0:
+            return []
+        chunk_size = self.chunk_size or max(
+            1, -(-total // (self.max_workers * 4)))
+
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(data.nbytes, 1))
+        try:
+            shared = numpy.ndarray(data.shape, data.dtype, buffer=block.buf)
+            shared[...] = data
+            del shared
+
+            starts = {}
+            for start in range(0, total, chunk_size):
+                future = self._pool.submit(
+                    _run_chunk, block.name, data.shape, data.dtype, start,
+                    min(start + chunk_size, total), func, args)
+                starts[future] = start
+            results = [None] * total
+            done = 0
+            try:
+                for future in concurrent.futures.as_completed(starts):
+                    chunk = future.result()
+                    start = starts[future]
+                    results[start:start + len(chunk)] = chunk
+                    done += len(chunk)
+                    if progress is not None:
+                        progress(done, total)
+            except BaseException:
+                for future in starts:
+                    future.cancel()
+                raise
+            return results
+        finally:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        """Shuts the worker processes down."""
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def map_records(func, data, args=(), max_workers=None, chunk_size=None,
+                progress=None):
+    """Calls func(record, *args) on every record of data with a
+    :class:`BatchRunner` started for the call.
+
+    See :meth:`BatchRunner.map`. Create a :class:`BatchRunner` instead to
+    analyze several batches without starting the workers each time.
+    """
+    with BatchRunner(max_workers, chunk_size) as runner:
+        return runner.map(func, data, args, progress)
@@ -0,0 +1,231 @@
+# -*- coding: UTF-8 -*-
+
+"""
+A scan buffer that owns its memory handle and exposes the samples as a NumPy
+array without copying them.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import weakref
+from ctypes import c_double, c_uint16, c_uint32, c_uint64
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+from mcculw import ul
+from mcculw.enums import BoardInfo, ErrorCode, InfoType, ScanOptions
+
+
+def _free(memhandle):
+    # Called by the finalizer, which must not raise
+    try:
+        ul.win_buf_free(memhandle)
+    except ul.ULError:
+        pass
+
+
+class ScanBuffer(object):
+    """A buffer for the scan functions, allocated with the allocator that
+    matches the data the scan produces.
+
+    * :func:`.scaled_win_buf_alloc` (float64 samples) when options includes
+      SCALEDATA
+    * :func:`.win_buf_alloc` (uint16 samples) for resolutions up to 16 bits
+    * :func:`.win_buf_alloc_32` (uint32 samples) for resolutions up to 32
+      bits
+    * :func:`.win_buf_alloc_64` (uint64 samples) otherwise
+
+    The buffer is freed by :meth:`close`, on leaving a ``with`` block, or when
+    the ScanBuffer and every array obtained from it have been garbage
+    collected. Arrays obtained from the buffer must not be used after
+    :meth:`close`.
+
+    Parameters
+    ----------
+    points : int
+        The number of samples per channel.
+    channels : int, optional
+        The number of channels in the scan.
+    resolution : int, optional
+        The resolution of the device, in bits. Ignored when options
+        includes SCALEDATA.
+    options : ScanOptions, optional
+        The options that will be passed to the scan function.
+
+    Attributes
+    ----------
+    memhandle : int
+        The memory handle to pass to the scan function
+    count : int
+        The total number of samples, points * channels, to pass as the
+        num_points (or count) argument of the scan function
+    dtype : numpy.dtype
+        The type of the samples
+    """
+
+    def __init__(self, points, channels=1, resolution=16, options=0):
+        if points < 1 or channels < 1:
+            raise ValueError('points and channels must be at least 1')
+        self.points = points
+        self.channels = channels
+        self.count = points * channels
+        if options & ScanOptions.SCALEDATA:
+            alloc, ctype = ul.scaled_win_buf_alloc, c_double
+        elif resolution <= 16:
+            alloc, ctype = ul.win_buf_alloc, c_uint16
+        elif resolution <= 32:
+            alloc, ctype = ul.win_buf_alloc_32, c_uint32
+        else:
+            alloc, ctype = ul.win_buf_alloc_64, c_uint64
+        self.dtype = numpy.dtype(ctype)
+        self.memhandle = alloc(self.count)
+        if not self.memhandle:
+            raise ul.ULError(ErrorCode.NOMEMORY)
+
+        # The finalizer is attached to the ctypes array, which stays alive
+        # as long as this ScanBuffer or any array viewing its memory does
+        c_array = (ctype * self.count).from_address(self.memhandle)
+        self._finalizer = weakref.finalize(c_array, _free, self.memhandle)
+        self._array = numpy.ctypeslib.as_array(c_array).reshape(
+            (points, channels))
+
+    @classmethod
+    def for_board(cls, board_num, points, channels=1, options=0):
+        """Creates a ScanBuffer for an A/D scan of the board, reading the
+        A/D resolution from the board configuration.
+
+        Parameters
+        ----------
+        board_num : int
+            The number associated with the board when it was installed with
+            InstaCal or created with :func:`.create_daq_device`.
+        points : int
+            The number of samples per channel.
+        channels : int, optional
+            The number of channels in the scan.
+        options : ScanOptions, optional
+            The options that will be passed to the scan function.
+        """
+        resolution = 16
+        if not options & ScanOptions.SCALEDATA:
+            resolution = ul.get_config(InfoType.BOARDINFO, board_num, 0,
+                                       BoardInfo.ADRES)
+        return cls(points, channels, resolution, options)
+
+    @property
+    def array(self):  # -> numpy.ndarray
+        """A (points, channels) array sharing the buffer's memory."""
+        if self.closed:
+            raise ValueError('ScanBuffer is closed')
+        return self._array
+
+    def channel(self, index):  # -> numpy.ndarray
+        """The samples of one channel, sharing the buffer's memory.
+
+        Parameters
+        ----------
+        index : int
+            The position of the channel in the scan, 0 for the first
+            channel scanned.
+        """
+        return self.array[:, index]
+
+    def copy(self, first, count, out=None):
+        """Copies samples out of the buffer, treating it as circular.
+
+        Parameters
+        ----------
+        first : int
+            The index of the first sample, counting the samples of all
+            channels. Indices past the end of the buffer wrap around, so
+            the total number of samples acquired by a continuous scan may be
+            used.
+        count : int
+            The number of samples to copy, at most the size of the buffer.
+        out : numpy.ndarray, optional
+            A one-dimensional array of count samples that receives the copy.
+
+        Returns
+        -------
+        numpy.ndarray
+            out, or a new one-dimensional array
+        """
+        if not 0 <= count <= self.count:
+            raise ValueError('count must be between 0 and the buffer size')
+        if out is None:
+            out = numpy.empty(count, self.dtype)
+        samples = self.array.reshape(-1)
+        first %= self.count
+        last = first + count
+        if last <= self.count:
+            out[:] = samples[first:last]
+        else:
+            split = self.count - first
+            out[:split] = samples[first:]
+            out[split:] = samples[:last - self.count]
+        return out
+
+    @property
+    def closed(self):  # -> boolean
+        return not self._finalizer.alive
+
+    def close(self):
+        """Frees the buffer. Calling close more than once has no effect."""
+        # Detach first: dropping the array would otherwise run the finalizer
+        if self._finalizer.detach() is not None:
+            self._array = None
+            ul.win_buf_free(self.memhandle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.points
+
+
+class SampleCounter(object):
+    """The total number of samples a background scan has transferred, kept
+    from the counts that :func:`.get_status` and ON_DATA_AVAILABLE events
+    report.
+
+    The UL reports the count as a signed 32-bit integer, which rolls over
+    after 2**31 samples, about 36 minutes of a 1 MS/s scan. The counter adds
+    up the differences between successive counts modulo 2**32 instead, so
+    that it keeps counting as long as it is updated at least once every
+    2**31 samples. A count older than the last one, such as that of an event
+    handled after a later get_status call, leaves it unchanged.
+
+    Attributes
+    ----------
+    total : int
+        The number of samples transferred, over all channels, as of the
+        last update
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._last = 0
+
+    def reset(self):
+        """Restarts the count at 0, for a new scan."""
+        self.total = 0
+        self._last = 0
+
+    def update(self, cur_count):  # -> int
+        """Adds the samples transferred since the previous update and
+        returns the total.
+
+        Parameters
+        ----------
+        cur_count : int
+            The count reported by the UL for the scan.
+        """
+        step = (cur_count - self._last) & 0xFFFFFFFF
+        if step < 0x80000000:
+            self.total += step
+            self._last = cur_count
+        return self.total
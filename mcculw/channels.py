@@ -0,0 +1,393 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Channel handles for single point I/O with less per-call overhead than the
+:mod:`mcculw.ul` functions.
+
+Each handle binds its UL function, board number, channel and range once,
+and reuses the same ctypes value for every call. A read is a single call
+into the UL plus an error check, instead of the argument marshalling and
+output allocation done by the equivalent :mod:`mcculw.ul` function. Writes
+have no output to allocate, so they gain little; their handles exist for
+symmetry. How much of the call time the saving is depends on the time the
+UL itself takes.
+
+Handles bind their UL function when they are created, so a handle created
+before :func:`mcculw.ul.enable_instrumentation` (or before the backend is
+changed) keeps using the function it was created with.
+"""
+from __future__ import absolute_import, division, print_function
+import functools
+from ctypes import (byref, c_double, c_float, c_uint, c_ulong, c_ulonglong,
+                    c_ushort)
+from builtins import *  # @UnusedWildImport
+
+from mcculw import backend
+# Importing mcculw.ul declares the argtypes of the functions bound here
+from mcculw.ul import ULError
+
+
+def _bind(name):
+    return backend.cbw.bind(name)
+
+
+class _InputHandle(object):
+    # self._call is the UL function with every argument, including the
+    # reference to self._value, already bound
+    __slots__ = ('_value', '_call')
+
+    def read(self):
+        """Reads the channel.
+
+        Returns
+        -------
+        int or float
+            The value read
+        """
+        errcode = self._call()
+        if errcode:
+            raise ULError(errcode)
+        return self._value.value
+
+    def _bind_call(self, name, value_type, args, options=None):
+        self._value = value_type()
+        args = args + (byref(self._value),)
+        if options is not None:
+            args += (int(options),)
+        self._call = functools.partial(_bind(name), *args)
+
+
+class AnalogInputChannel(_InputHandle):
+    """A handle for reading an A/D channel as a 16-bit count, equivalent to
+    :func:`mcculw.ul.a_in`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The A/D input channel number.
+    ul_range : ULRange
+        The A/D range code.
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range')
+
+    def __init__(self, board_num, channel, ul_range):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        self._bind_call('cbAIn', c_ushort,
+                        (int(board_num), int(channel), int(ul_range)))
+
+
+class AnalogInputChannel32(_InputHandle):
+    """A handle for reading an A/D channel as a 32-bit count, equivalent to
+    :func:`mcculw.ul.a_in_32`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The A/D input channel number.
+    ul_range : ULRange
+        The A/D range code.
+    options : int, optional
+        Reserved for future use
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range')
+
+    def __init__(self, board_num, channel, ul_range, options=0):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        self._bind_call('cbAIn32', c_ulong,
+                        (int(board_num), int(channel), int(ul_range)),
+                        options)
+
+
+class VoltageInputChannel(_InputHandle):
+    """A handle for reading an A/D channel in engineering units, equivalent
+    to :func:`mcculw.ul.v_in`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The A/D input channel number.
+    ul_range : ULRange
+        The A/D range code.
+    options : VInOptions, optional
+        Flags that control various options.
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range')
+
+    def __init__(self, board_num, channel, ul_range, options=0):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        self._bind_call('cbVIn', c_float,
+                        (int(board_num), int(channel), int(ul_range)),
+                        options)
+
+
+class VoltageInputChannel32(_InputHandle):
+    """A handle for reading an A/D channel in engineering units at double
+    precision, equivalent to :func:`mcculw.ul.v_in_32`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The A/D input channel number.
+    ul_range : ULRange
+        The A/D range code.
+    options : VInOptions, optional
+        Flags that control various options.
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range')
+
+    def __init__(self, board_num, channel, ul_range, options=0):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        self._bind_call('cbVIn32', c_double,
+                        (int(board_num), int(channel), int(ul_range)),
+                        options)
+
+
+class AnalogOutputChannel(object):
+    """A handle for writing counts to a D/A channel, equivalent to
+    :func:`mcculw.ul.a_out`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The D/A channel number.
+    ul_range : ULRange
+        The D/A range code.
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range', '_call')
+
+    def __init__(self, board_num, channel, ul_range):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        self._call = functools.partial(
+            _bind('cbAOut'), int(board_num), int(channel), int(ul_range))
+
+    def write(self, data_value):
+        """Writes a count to the channel.
+
+        Parameters
+        ----------
+        data_value : int
+            The value to set the D/A to
+        """
+        errcode = self._call(data_value)
+        if errcode:
+            raise ULError(errcode)
+
+
+class VoltageOutputChannel(object):
+    """A handle for writing engineering units to a D/A channel, equivalent
+    to :func:`mcculw.ul.v_out`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channel : int
+        The D/A channel number.
+    ul_range : ULRange
+        The D/A range code.
+    options : int, optional
+        Flags that control various options.
+    """
+    __slots__ = ('board_num', 'channel', 'ul_range', '_value', '_call')
+
+    def __init__(self, board_num, channel, ul_range, options=0):
+        self.board_num = board_num
+        self.channel = channel
+        self.ul_range = ul_range
+        # The value is passed by value, so the preallocated c_float is bound
+        # like the other arguments and updated before each call
+        self._value = c_float()
+        self._call = functools.partial(
+            _bind('cbVOut'), int(board_num), int(channel), int(ul_range),
+            self._value, int(options))
+
+    def write(self, data_value):
+        """Writes a value in engineering units to the channel.
+
+        Parameters
+        ----------
+        data_value : float
+            The value to set the D/A to
+        """
+        self._value.value = data_value
+        errcode = self._call()
+        if errcode:
+            raise ULError(errcode)
+
+
+class DigitalPort(_InputHandle):
+    """A handle for reading and writing a digital port, equivalent to
+    :func:`mcculw.ul.d_in` and :func:`mcculw.ul.d_out`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    port_type : DigitalPortType
+        The digital port type.
+    """
+    __slots__ = ('board_num', 'port_type', '_out_call')
+    _in_function = 'cbDIn'
+    _out_function = 'cbDOut'
+    _value_type = c_ushort
+
+    def __init__(self, board_num, port_type):
+        self.board_num = board_num
+        self.port_type = port_type
+        self._bind_call(self._in_function, self._value_type,
+                        (int(board_num), int(port_type)))
+        self._out_call = functools.partial(
+            _bind(self._out_function), int(board_num), int(port_type))
+
+    def write(self, data_value):
+        """Writes a value to the port.
+
+        Parameters
+        ----------
+        data_value : int
+            The value written to the port
+        """
+        errcode = self._out_call(data_value)
+        if errcode:
+            raise ULError(errcode)
+
+
+class DigitalPort32(DigitalPort):
+    """A handle for reading and writing a digital port of up to 32 bits,
+    equivalent to :func:`mcculw.ul.d_in_32` and :func:`mcculw.ul.d_out_32`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    port_type : DigitalPortType
+        The digital port type.
+    """
+    __slots__ = ()
+    _in_function = 'cbDIn32'
+    _out_function = 'cbDOut32'
+    _value_type = c_uint
+
+
+class DigitalBit(_InputHandle):
+    """A handle for reading and writing a single digital bit, equivalent to
+    :func:`mcculw.ul.d_bit_in` and :func:`mcculw.ul.d_bit_out`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    port_type : DigitalPortType
+        The port (AUXPORT or FIRSTPORTA) to which the bit belongs.
+    bit_num : int
+        The bit number, counted from the first bit of port_type.
+    """
+    __slots__ = ('board_num', 'port_type', 'bit_num', '_out_call')
+
+    def __init__(self, board_num, port_type, bit_num):
+        self.board_num = board_num
+        self.port_type = port_type
+        self.bit_num = bit_num
+        self._bind_call('cbDBitIn', c_ushort,
+                        (int(board_num), int(port_type), int(bit_num)))
+        self._out_call = functools.partial(
+            _bind('cbDBitOut'), int(board_num), int(port_type), int(bit_num))
+
+    def write(self, bit_value):
+        """Sets or clears the bit.
+
+        Parameters
+        ----------
+        bit_value : int
+            The value written to the bit: 0 or 1
+        """
+        errcode = self._out_call(bit_value)
+        if errcode:
+            raise ULError(errcode)
+
+
+class CounterChannel(_InputHandle):
+    """A handle for reading a counter as a 16-bit value, equivalent to
+    :func:`mcculw.ul.c_in`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    counter_num : int
+        The counter to read.
+    """
+    __slots__ = ('board_num', 'counter_num')
+    _function = 'cbCIn'
+    _value_type = c_ushort
+
+    def __init__(self, board_num, counter_num):
+        self.board_num = board_num
+        self.counter_num = counter_num
+        self._bind_call(self._function, self._value_type,
+                        (int(board_num), int(counter_num)))
+
+
+class CounterChannel32(CounterChannel):
+    """A handle for reading a counter as a 32-bit value, equivalent to
+    :func:`mcculw.ul.c_in_32`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    counter_num : int
+        The counter to read.
+    """
+    __slots__ = ()
+    _function = 'cbCIn32'
+    _value_type = c_ulong
+
+
+class CounterChannel64(CounterChannel):
+    """A handle for reading a counter as a 64-bit value, equivalent to
+    :func:`mcculw.ul.c_in_64`.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    counter_num : int
+        The counter to read.
+    """
+    __slots__ = ()
+    _function = 'cbCIn64'
+    _value_type = c_ulonglong
+
@@ -0,0 +1,226 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Vectorized conversions between A/D or D/A counts and engineering units, for
+converting whole scan buffers instead of calling :func:`mcculw.ul.to_eng_units`
+or :func:`mcculw.ul.from_eng_units` once per sample, and of the raw data of
+:func:`mcculw.ul.a_pretrig` without :func:`mcculw.ul.a_convert_pretrig_data`.
+
+The resolution of a board's A/D and D/A is available from
+:attr:`mcculw.device_info.AiInfo.resolution` and
+:attr:`mcculw.device_info.AoInfo.resolution`.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+from ctypes import c_uint16, c_uint32
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+
+def counts_to_volts(counts, ul_range, resolution, out=None):
+    """Converts counts to engineering units, like :func:`.to_eng_units` and
+    :func:`.to_eng_units_32` do for a single value.
+
+    The conversion is done at double precision and rounded to the type of
+    out, so float32 results equal those of :func:`.to_eng_units` and
+    float64 results equal those of :func:`.to_eng_units_32`.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray or sequence of int
+        The counts to convert, for example the view of a
+        :class:`mcculw.buffer.ScanBuffer`
+    ul_range : ULRange
+        The range the counts were acquired with
+    resolution : int
+        The resolution of the converter, in bits
+    out : numpy.ndarray, optional
+        A float32 or float64 array with the shape of counts that receives
+        the result. It may not be counts itself.
+
+    Returns
+    -------
+    numpy.ndarray
+        out, or a new float64 array if out was not given
+    """
+    counts = numpy.asarray(counts)
+    if out is None:
+        out = numpy.empty(counts.shape, numpy.float64)
+    elif out.shape != counts.shape:
+        raise ValueError('out must have the shape of counts')
+
+    span = ul_range.range_max - ul_range.range_min
+    full_scale = float(1 << resolution)
+    if out.dtype == numpy.float64:
+        result = out
+    else:
+        result = numpy.empty(counts.shape, numpy.float64)
+    numpy.multiply(counts, span, out=result)
+    numpy.divide(result, full_scale, out=result)
+    numpy.add(result, ul_range.range_min, out=result)
+    if result is not out:
+        out[...] = result
+    return out
+
+
+def _count_type(resolution):
+    return c_uint16 if resolution <= 16 else c_uint32
+
+
+def _as_array(buffer, size, resolution):
+    # Returns an array, a ScanBuffer or a memhandle as a NumPy array. A
+    # memhandle is viewed as size values.
+    if isinstance(buffer, numpy.ndarray):
+        return buffer
+    if hasattr(buffer, 'array'):
+        # A mcculw.buffer.ScanBuffer
+        return buffer.array
+    # A memhandle from win_buf_alloc or win_buf_alloc_32
+    if not buffer:
+        raise ValueError('{!r} is not a valid memhandle'.format(buffer))
+    return numpy.ctypeslib.as_array(
+        (_count_type(resolution) * size).from_address(int(buffer)))
+
+
+def count_array(out, size, resolution):
+    """Returns an output buffer for counts as a NumPy array, so that
+    counts can be written into it without going through a list.
+
+    Parameters
+    ----------
+    out : numpy.ndarray, ScanBuffer or int
+        An integer array, a :class:`mcculw.buffer.ScanBuffer`, or a
+        memhandle returned by :func:`.win_buf_alloc` (or
+        :func:`.win_buf_alloc_32` for resolutions above 16 bits), which is
+        viewed from its first element.
+    size : int
+        The number of values out must hold.
+    resolution : int
+        The resolution of the converter, in bits, which selects the type of
+        the values of a memhandle.
+
+    Returns
+    -------
+    numpy.ndarray
+        out, the array of the ScanBuffer, or a view of the memhandle
+    """
+    target = _as_array(out, size, resolution)
+    if target.size != size:
+        raise ValueError('out must hold exactly {} values'.format(size))
+    return target
+
+
+def volts_to_counts(volts, ul_range, resolution, out=None):
+    """Converts engineering units to counts, like :func:`.from_eng_units`
+    does for a single value, and optionally writes them straight into an
+    output scan buffer.
+
+    Values are rounded to the nearest count and clipped to the span of the
+    converter.
+
+    Parameters
+    ----------
+    volts : numpy.ndarray or sequence of float
+        The values to convert
+    ul_range : ULRange
+        The D/A range the counts are for
+    resolution : int
+        The resolution of the converter, in bits
+    out : numpy.ndarray, ScanBuffer or int, optional
+        Receives the counts. It may be an integer array, a
+        :class:`mcculw.buffer.ScanBuffer`, or a memhandle returned by
+        :func:`.win_buf_alloc` (or :func:`.win_buf_alloc_32` for
+        resolutions above 16 bits). It must hold as many values as volts;
+        volts is reshaped to its shape. A memhandle is written from its
+        first element.
+
+    Returns
+    -------
+    numpy.ndarray
+        The array the counts were written to: out, a view of the memhandle,
+        or a new uint16 (uint32 above 16 bits) array if out was not given
+    """
+    volts = numpy.asarray(volts, numpy.float64)
+    if out is None:
+        out = numpy.empty(volts.shape, _count_type(resolution))
+    else:
+        out = count_array(out, volts.size, resolution)
+
+    full_scale = 1 << resolution
+    span = ul_range.range_max - ul_range.range_min
+    counts = numpy.subtract(volts, ul_range.range_min)
+    numpy.multiply(counts, float(full_scale), out=counts)
+    numpy.divide(counts, span, out=counts)
+    numpy.add(counts, 0.5, out=counts)
+    numpy.floor(counts, out=counts)
+    numpy.clip(counts, 0, full_scale - 1, out=counts)
+    numpy.copyto(out, counts.reshape(out.shape), casting='unsafe')
+    return out
+
+
+def convert_pretrig_data(data, pretrig_count, total_count=None, resolution=12,
+                         chan_tags=True):
+    """Puts the raw data collected by :func:`.a_pretrig` in order and, for
+    12-bit boards, splits the A/D values from the channel tags, like
+    :func:`.a_convert_pretrig_data` does, in place.
+
+    The samples are rotated so that the data starts with the first
+    pretrigger sample and ends with the last post-trigger sample. Each
+    12-bit sample is then shifted down to its A/D value, its low 4 bits
+    being the channel tag.
+
+    Parameters
+    ----------
+    data : numpy.ndarray, ScanBuffer or int
+        The uint16 raw data: an array, a :class:`mcculw.buffer.ScanBuffer`,
+        or the memhandle passed to :func:`.a_pretrig`. A two-dimensional
+        array holds one capture per row, all with the same counts, which
+        are converted together.
+    pretrig_count : int
+        The actual_pretrig_count returned by :func:`.a_pretrig`.
+    total_count : int, optional
+        The actual_total_count returned by :func:`.a_pretrig`. Only the
+        first total_count samples (of each row) are converted. Required for
+        a memhandle; by default, all of the samples of an array.
+    resolution : int, optional
+        The resolution of the A/D, in bits. Only 12-bit data holds channel
+        tags; other data is only put in order.
+    chan_tags : bool, optional
+        If False, the channel tags are discarded rather than returned.
+
+    Returns
+    -------
+    data : numpy.ndarray
+        The converted samples, a view of the data
+    chan_tags : numpy.ndarray
+        The channel tag of each sample, or None for resolutions other than
+        12 bits or if chan_tags is False
+    """
+    if total_count is None:
+        if not isinstance(data, numpy.ndarray):
+            raise ValueError('total_count is required for a memhandle or '
+                             'ScanBuffer')
+        total_count = data.shape[-1]
+    samples = _as_array(data, total_count, 16)
+    if not isinstance(data, numpy.ndarray):
+        samples = samples.reshape(-1)
+    elif samples.ndim > 2:
+        raise ValueError('data must have one or two dimensions')
+    if samples.dtype != numpy.uint16:
+        raise ValueError('data must hold uint16 samples')
+    if not 0 <= pretrig_count < total_count <= samples.shape[-1]:
+        raise ValueError('pretrig_count and total_count do not fit the data')
+    samples = samples[..., :total_count]
+
+    # The raw data holds the post-trigger samples before the pretrigger ones
+    ordered = numpy.roll(samples, pretrig_count, axis=-1)
+    tags = None
+    if resolution == 12:
+        if chan_tags:
+            tags = numpy.bitwise_and(ordered, 0xF)
+        numpy.right_shift(ordered, 4, out=samples)
+    else:
+        samples[...] = ordered
+    return samples, tags
@@ -5,6 +5,7 @@ from .ctr_info import CtrInfo
 from .daqi_info import DaqiInfo
 from .daqo_info import DaqoInfo
 from .dio_info import DioInfo
+from .capabilities import DeviceCapabilities
 
 __all__ = ['DaqDeviceInfo', 'AiInfo', 'AoInfo', 'CtrInfo', 'DaqiInfo',
-           'DaqoInfo', 'DioInfo']
+           'DaqoInfo', 'DioInfo', 'DeviceCapabilities']
@@ -0,0 +1,252 @@
+from __future__ import absolute_import, division, print_function
+import collections
+import enum
+import json
+import os
+import tempfile
+from builtins import *  # @UnusedWildImport
+
+from mcculw import enums, ul
+from mcculw.ul import ULError
+from mcculw.enums import BoardInfo, ErrorCode, InfoType
+from .ai_info import AiInfo
+from .ao_info import AoInfo
+from .ctr_info import CtrInfo, CtrChanInfo
+from .daq_device_info import DaqDeviceInfo, ExpInfo
+from .daqi_info import DaqiInfo
+from .daqo_info import DaqoInfo
+from .dio_info import DioInfo, PortInfo
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.mcculw',
+                                  'capabilities.json')
+
+# Incremented when the layout of the cache file changes
+_CACHE_VERSION = 1
+
+_IN_USE_ERRORS = (ErrorCode.NETDEVINUSE, ErrorCode.NETDEVINUSEBYANOTHERPROC)
+
+try:
+    _replace = os.replace
+except AttributeError:
+    # Python 2, whose os.rename does not replace an existing file on Windows
+    def _replace(src, dst):
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def _properties(cls):
+    # The public properties of an info class, in the order they are defined.
+    # The board number is left out: it is not a property of the device.
+    return [name for name, value in vars(cls).items()
+            if isinstance(value, property) and not name.startswith('_')
+            and name != 'board_num']
+
+
+AiCapabilities = collections.namedtuple('AiCapabilities', _properties(AiInfo))
+AoCapabilities = collections.namedtuple('AoCapabilities', _properties(AoInfo))
+CtrCapabilities = collections.namedtuple('CtrCapabilities',
+                                         _properties(CtrInfo))
+CtrChanCapabilities = collections.namedtuple('CtrChanCapabilities',
+                                             _properties(CtrChanInfo))
+DaqiCapabilities = collections.namedtuple('DaqiCapabilities',
+                                          _properties(DaqiInfo))
+DaqoCapabilities = collections.namedtuple('DaqoCapabilities',
+                                          _properties(DaqoInfo))
+DioCapabilities = collections.namedtuple('DioCapabilities',
+                                         _properties(DioInfo))
+PortCapabilities = collections.namedtuple('PortCapabilities',
+                                          _properties(PortInfo))
+ExpCapabilities = collections.namedtuple('ExpCapabilities',
+                                         _properties(ExpInfo))
+
+# The snapshot type of each info class
+_SECTIONS = collections.OrderedDict([
+    (AiInfo, AiCapabilities), (AoInfo, AoCapabilities),
+    (CtrInfo, CtrCapabilities), (CtrChanInfo, CtrChanCapabilities),
+    (DaqiInfo, DaqiCapabilities), (DaqoInfo, DaqoCapabilities),
+    (DioInfo, DioCapabilities), (PortInfo, PortCapabilities),
+    (ExpInfo, ExpCapabilities),
+])
+_SECTIONS_BY_NAME = dict((section.__name__, section)
+                         for section in _SECTIONS.values())
+
+
+def _read(info, name):
+    # Reads a property, recording None if the device does not support it
+    try:
+        return _freeze(getattr(info, name))
+    except ULError as e:
+        if e.errorcode in _IN_USE_ERRORS:
+            raise
+        return None
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    section = _SECTIONS.get(type(value))
+    if section is not None:
+        return section(*(_read(value, name) for name in section._fields))
+    return value
+
+
+def _encode(value):
+    # Converts a snapshot value to JSON types
+    if isinstance(value, enum.Enum):
+        return {'enum': type(value).__name__, 'value': int(value)}
+    if type(value).__name__ in _SECTIONS_BY_NAME:
+        return {'section': type(value).__name__,
+                'fields': dict((name, _encode(item))
+                               for name, item in value._asdict().items())}
+    if isinstance(value, tuple):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return tuple(_decode(item) for item in value)
+    if isinstance(value, dict):
+        if 'enum' in value:
+            return getattr(enums, value['enum'])(value['value'])
+        return _SECTIONS_BY_NAME[value['section']](
+            **dict((name, _decode(item))
+                   for name, item in value['fields'].items()))
+    return value
+
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != _CACHE_VERSION:
+        return {}
+    return cache.get('devices', {})
+
+
+def _save_cache(path, devices):
+    # Written to a temporary file and renamed, so that a process reading the
+    # cache never sees a partial file
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': _CACHE_VERSION, 'devices': devices}, f,
+                      indent=1, sort_keys=True)
+        _replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+_DEVICE_FIELDS = (['product_id'] + _properties(DaqDeviceInfo)
+                  + ['ai', 'ao', 'ctr', 'daqi', 'daqo', 'dio'])
+
+
+class DeviceCapabilities(
+        collections.namedtuple('DeviceCapabilities', _DEVICE_FIELDS)):
+    """An immutable snapshot of everything :class:`DaqDeviceInfo` and its
+    AiInfo, AoInfo, CtrInfo, DaqiInfo, DaqoInfo and DioInfo report for a
+    device.
+
+    The fields have the names of the properties of :class:`DaqDeviceInfo`,
+    plus product_id (the BoardInfo.BOARDTYPE value), and the ai, ao, ctr,
+    daqi, daqo and dio sections, whose fields have the names of the
+    properties of the corresponding info classes. Lists are stored as tuples,
+    and properties the device does not support as None.
+
+    Gathering the snapshot queries the device the way the info classes do,
+    probing ranges and event types, which can take seconds.
+    :meth:`for_board` avoids that by keeping snapshots in a cache file keyed
+    by product ID and unique ID. The cache reflects the configuration of the
+    device when it was gathered: refresh it after changing the device's
+    configuration in InstaCal.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def gather(cls, board_num):
+        """Queries the device for all of its capabilities.
+
+        Parameters
+        ----------
+        board_num : int
+            The board number associated with the device when created with
+            :func:`.create_daq_device` or configured with Instacal.
+        """
+        device_info = DaqDeviceInfo(board_num)
+        values = {
+            'product_id': ul.get_config(InfoType.BOARDINFO, board_num, 0,
+                                        BoardInfo.BOARDTYPE),
+            'ai': _freeze(device_info.get_ai_info()),
+            'ao': _freeze(device_info.get_ao_info()),
+            'ctr': _freeze(device_info.get_ctr_info()),
+            'daqi': _freeze(device_info.get_daqi_info()),
+            'daqo': _freeze(device_info.get_daqo_info()),
+            'dio': _freeze(device_info.get_dio_info()),
+        }
+        for name in _properties(DaqDeviceInfo):
+            values[name] = _read(device_info, name)
+        return cls(**values)
+
+    @classmethod
+    def for_board(cls, board_num, cache_path=DEFAULT_CACHE_PATH,
+                  refresh=False):
+        """Returns the capabilities of the device from the cache file,
+        gathering them and adding them to the cache if they are not there.
+
+        Devices without a unique ID are gathered every time.
+
+        Parameters
+        ----------
+        board_num : int
+            The board number associated with the device when created with
+            :func:`.create_daq_device` or configured with Instacal.
+        cache_path : str, optional
+            The cache file. None disables the cache.
+        refresh : bool, optional
+            If True, the capabilities are gathered again and the cache
+            updated.
+        """
+        product_id = ul.get_config(InfoType.BOARDINFO, board_num, 0,
+                                   BoardInfo.BOARDTYPE)
+        if product_id == 0:
+            raise ULError(ErrorCode.BADBOARD)
+        try:
+            unique_id = ul.get_config_string(InfoType.BOARDINFO, board_num, 0,
+                                             BoardInfo.DEVUNIQUEID, 32)
+        except ULError as e:
+            if e.errorcode in _IN_USE_ERRORS:
+                raise
+            unique_id = None
+        if cache_path is None or not unique_id:
+            return cls.gather(board_num)
+
+        key = '{}/{}'.format(product_id, unique_id)
+        devices = _load_cache(cache_path)
+        if not refresh and key in devices:
+            try:
+                return cls.from_dict(devices[key])
+            except (AttributeError, KeyError, TypeError, ValueError):
+                # Written by a version with other properties
+                pass
+        capabilities = cls.gather(board_num)
+        devices[key] = capabilities.to_dict()
+        _save_cache(cache_path, devices)
+        return capabilities
+
+    def to_dict(self):  # -> dict
+        """Returns the snapshot as a dict of JSON types."""
+        return dict((name, _encode(value))
+                    for name, value in self._asdict().items())
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a snapshot from the result of :meth:`to_dict`."""
+        return cls(**dict((name, _decode(value))
+                          for name, value in data.items()))
@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Optional per-call latency statistics for the cbXxx functions called by
+:mod:`mcculw.ul`.
+
+Instrumentation is off by default. When it is off, :mod:`mcculw.ul` calls the
+backend functions directly and pays no overhead. When it is on, every call is
+timed and counted per cbXxx function and per board number. Use
+:func:`mcculw.ul.enable_instrumentation` and :func:`mcculw.ul.stats`, or set
+the MCCULW_INSTRUMENT environment variable to 1 to enable it at import.
+"""
+from __future__ import absolute_import, division, print_function
+import bisect
+import collections
+import threading
+import time
+from builtins import *  # @UnusedWildImport
+
+INSTRUMENT_ENV_VAR = 'MCCULW_INSTRUMENT'
+
+# Upper bounds, in seconds, of the latency histogram buckets. A final bucket
+# collects everything slower than the last bound.
+HISTOGRAM_BOUNDS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4,
+                    1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 1e-1, 2e-1, 5e-1,
+                    1.0)
+
+# Functions whose board number is not the first argument. None means the
+# function does not take a board number.
+_BOARD_ARG_INDEX = {
+    'cbGetConfig': 1,
+    'cbGetConfigString': 1,
+    'cbSetConfig': 1,
+    'cbSetConfigString': 1,
+    'cbGetErrMsg': None,
+    'cbGetDaqDeviceInventory': None,
+    'cbGetNetDeviceDescriptor': None,
+    'cbGetBoardNumber': None,
+    'cbIgnoreInstaCal': None,
+    'cbLoadConfig': None,
+    'cbSaveConfig': None,
+    'cbWinBufAlloc': None,
+    'cbWinBufAlloc32': None,
+    'cbWinBufAlloc64': None,
+    'cbScaledWinBufAlloc': None,
+    'cbWinBufFree': None,
+    'cbWinBufToArray': None,
+    'cbWinBufToArray32': None,
+    'cbWinBufToArray64': None,
+    'cbScaledWinBufToArray': None,
+    'cbWinArrayToBuf': None,
+    'cbWinArrayToBuf32': None,
+    'cbScaledWinArrayToBuf': None,
+}
+
+CallStats = collections.namedtuple(
+    'CallStats', 'count total_time min_time max_time histogram')
+
+
+class _Accumulator(object):
+    __slots__ = ('count', 'total_time', 'min_time', 'max_time', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.min_time = float('inf')
+        self.max_time = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed < self.min_time:
+            self.min_time = elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, elapsed)] += 1
+
+    def snapshot(self):
+        return CallStats(self.count, self.total_time, self.min_time,
+                         self.max_time, tuple(self.histogram))
+
+
+class CallRecorder(object):
+    """Times calls to wrapped cbXxx functions and accumulates the results per
+    function name and board number."""
+
+    def __init__(self, clock=None):
+        if clock is None:
+            # Looked up here rather than as the default value, as Python 2
+            # has no perf_counter and this module is imported by ul
+            clock = getattr(time, 'perf_counter', time.time)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def wrap(self, name, func):
+        """Returns a wrapper that records each call to func under name. This
+        is the wrapper installed with :meth:`.LazyLibrary.set_wrapper`."""
+        board_index = _BOARD_ARG_INDEX.get(name, 0)
+        clock = self._clock
+        record = self.record
+
+        def instrumented(*args):
+            start = clock()
+            try:
+                return func(*args)
+            finally:
+                elapsed = clock() - start
+                board_num = None
+                if board_index is not None and len(args) > board_index:
+                    board_num = args[board_index]
+                record(name, board_num, elapsed)
+        instrumented.__name__ = name
+        return instrumented
+
+    def record(self, name, board_num, elapsed):
+        if board_num is not None:
+            board_num = int(board_num)
+        with self._lock:
+            accumulator = self._stats.get((name, board_num))
+            if accumulator is None:
+                accumulator = self._stats[(name, board_num)] = _Accumulator()
+            accumulator.add(elapsed)
+
+    def snapshot(self, reset=False):
+        """Returns the statistics recorded so far.
+
+        Parameters
+        ----------
+        reset : bool, optional
+            If True, the statistics are cleared after they are read.
+
+        Returns
+        -------
+        dict
+            Maps each cbXxx function name to a dict that maps board numbers
+            (None for functions that do not take one) to a CallStats tuple of
+            count, total_time, min_time, max_time (in seconds) and histogram
+            (call counts per HISTOGRAM_BOUNDS bucket).
+        """
+        with self._lock:
+            result = {}
+            for (name, board_num), accumulator in self._stats.items():
+                result.setdefault(name, {})[board_num] = accumulator.snapshot()
+            if reset:
+                self._stats.clear()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,341 @@
+# -*- coding: UTF-8 -*-
+
+"""
+A cache of the detected DAQ devices, refreshed on a background thread.
+
+:func:`mcculw.ul.get_daq_device_inventory` scans every interface
+synchronously, which takes seconds when network interfaces are present.
+:class:`DeviceInventory` runs the discovery on its own thread and keeps the
+descriptors it found, so that code looking up a device, for example to
+create it again after it was unplugged, gets an answer from memory.
+
+Ethernet devices on other subnets are not discovered, and
+:func:`mcculw.ul.get_net_device_descriptor` looks them up one at a time,
+each unreachable host blocking for the full timeout.
+:func:`resolve_net_devices` looks up a list of hosts concurrently; on
+Python 2 it requires the futures package.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import collections
+import threading
+import time
+
+from mcculw import ul
+from mcculw.enums import ErrorCode, InterfaceType
+from mcculw.ul import ULError
+
+DEFAULT_REFRESH_INTERVAL = 5.0
+
+# The port Ethernet DAQ devices listen on for discovery
+DEFAULT_NET_PORT = 54211
+
+
+def _same_device(a, b):
+    return (a.product_id == b.product_id
+            and a.interface_type == b.interface_type
+            and a.dev_string == b.dev_string)
+
+
+class DeviceInventory(object):
+    """Discovers DAQ devices periodically and indexes their descriptors by
+    unique ID and product ID.
+
+    The discovery runs on a background thread between :meth:`start` and
+    :meth:`stop`, or for the duration of a ``with`` block. :meth:`refresh`
+    runs one synchronously.
+
+    Parameters
+    ----------
+    interface_type : InterfaceType, optional
+        The interfaces to scan.
+    refresh_interval : float, optional
+        The time between two discoveries, in seconds.
+    number_of_devices : int, optional
+        The maximum number of devices a discovery returns.
+
+    Attributes
+    ----------
+    last_refresh : float
+        The time.time() at which the last discovery completed, or None
+    last_error : Exception
+        The error raised by the last discovery, or by a listener it called,
+        or None if it succeeded. The devices found before are kept when a
+        discovery fails.
+    """
+
+    def __init__(self, interface_type=InterfaceType.ANY,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 number_of_devices=100):
+        self.interface_type = interface_type
+        self.refresh_interval = refresh_interval
+        self.number_of_devices = number_of_devices
+        self.last_refresh = None
+        self.last_error = None
+
+        # Descriptors by unique ID
+        self._devices = {}
+        self._listeners = []
+        # Notified after every discovery
+        self._changed = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the background thread. The first discovery begins
+        immediately."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='mcculw-inventory')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread, waiting for a discovery in progress
+        to complete. The devices found remain available."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                # Recorded in last_error; keep the cache going
+                pass
+            if self._stopping.wait(self.refresh_interval):
+                return
+
+    def add_listener(self, listener):
+        """Registers a function called after every discovery that found a
+        change, with the lists of descriptors added and removed as
+        arguments. A device whose descriptor changed appears in both. It is
+        called on the thread that ran the discovery.
+
+        Parameters
+        ----------
+        listener : callable
+            The function to call.
+        """
+        with self._changed:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregisters a function registered with :meth:`add_listener`."""
+        with self._changed:
+            self._listeners.remove(listener)
+
+    def refresh(self):
+        """Runs a discovery now, updates the cache and notifies the
+        listeners.
+
+        Returns
+        -------
+        (list of DaqDeviceDescriptor, list of DaqDeviceDescriptor)
+            The descriptors added and removed
+
+        Raises
+        ------
+        ULError
+            If the discovery failed. The cache is left unchanged.
+        """
+        # One discovery at a time: a caller refreshing while the background
+        # thread does waits for it rather than scanning again in parallel
+        with self._refresh_lock:
+            try:
+                found = ul.get_daq_device_inventory(self.interface_type,
+                                                    self.number_of_devices)
+            except ULError as e:
+                self.last_error = e
+                raise
+            found = dict((device.unique_id, device) for device in found)
+            with self._changed:
+                added = []
+                removed = []
+                for unique_id, device in found.items():
+                    old = self._devices.get(unique_id)
+                    if old is None:
+                        added.append(device)
+                    elif _same_device(old, device):
+                        # Keep the descriptor callers may already hold
+                        found[unique_id] = old
+                    else:
+                        removed.append(old)
+                        added.append(device)
+                removed.extend(device for unique_id, device
+                               in self._devices.items()
+                               if unique_id not in found)
+                self._devices = found
+                self.last_refresh = time.time()
+                self.last_error = None
+                listeners = list(self._listeners)
+                self._changed.notify_all()
+            error = None
+            if added or removed:
+                for listener in listeners:
+                    try:
+                        listener(added, removed)
+                    except Exception as e:
+                        # Let the other listeners hear about the change
+                        error = self.last_error = e
+            if error is not None:
+                raise error
+            return added, removed
+
+    @property
+    def devices(self):  # -> list[DaqDeviceDescriptor]
+        """The descriptors found by the last discovery."""
+        with self._changed:
+            return list(self._devices.values())
+
+    def find(self, unique_id, timeout=0.0):
+        """Returns the descriptor of the device with the given unique ID.
+
+        Parameters
+        ----------
+        unique_id : str
+            The serial number or MAC address of the device.
+        timeout : float, optional
+            The time to wait, in seconds, for a discovery to find the device
+            if it is not in the cache. By default, the cache is only looked
+            up.
+
+        Returns
+        -------
+        DaqDeviceDescriptor or None
+            The descriptor, or None if the device was not found
+        """
+        # Python 2 has no monotonic
+        clock = getattr(time, 'monotonic', time.time)
+        deadline = clock() + timeout
+        with self._changed:
+            while True:
+                device = self._devices.get(unique_id)
+                remaining = deadline - clock()
+                if device is not None or remaining <= 0:
+                    return device
+                self._changed.wait(remaining)
+
+    def find_product(self, product_id):  # -> list[DaqDeviceDescriptor]
+        """Returns the descriptors of the devices with the given product ID.
+
+        Parameters
+        ----------
+        product_id : int
+            The product ID, as in :attr:`.DaqDeviceDescriptor.product_id`.
+        """
+        with self._changed:
+            return [device for device in self._devices.values()
+                    if device.product_id == product_id]
+
+    def create_daq_device(self, board_num, unique_id, timeout=0.0):
+        """Looks the device up with :meth:`find` and creates it with
+        :func:`.create_daq_device`.
+
+        Parameters
+        ----------
+        board_num : int
+            The number to associate with the device.
+        unique_id : str
+            The serial number or MAC address of the device.
+        timeout : float, optional
+            See :meth:`find`.
+
+        Returns
+        -------
+        DaqDeviceDescriptor
+            The descriptor of the device created
+
+        Raises
+        ------
+        ULError
+            With error code BADBOARD if the device is not in the inventory.
+        """
+        device = self.find(unique_id, timeout)
+        if device is None:
+            raise ULError(ErrorCode.BADBOARD)
+        ul.create_daq_device(board_num, device)
+        return device
+
+
+def _resolve(host, port, timeout):
+    try:
+        return ul.get_net_device_descriptor(host, port, timeout)
+    except ULError as e:
+        return e
+
+
+def resolve_net_devices(hosts, port=DEFAULT_NET_PORT, timeout=1000,
+                        max_workers=16, first_board_num=None):
+    """Looks up the Ethernet DAQ devices at several hosts concurrently with
+    :func:`.get_net_device_descriptor`, and optionally creates them.
+
+    Parameters
+    ----------
+    hosts : list of str or (str, int)
+        The host names or IP addresses, each optionally with its own port.
+    port : int, optional
+        The port of the hosts given without one.
+    timeout : int or dict, optional
+        The timeout of each lookup, in milliseconds, or a dict of timeouts
+        by host with the key None for the others.
+    max_workers : int, optional
+        The maximum number of lookups in progress at once.
+    first_board_num : int, optional
+        If given, every device found is created with
+        :func:`.create_daq_device`, in the order of hosts, with consecutive
+        board numbers from first_board_num. Use :func:`.get_board_number`
+        to get the number of a device.
+
+    Returns
+    -------
+    collections.OrderedDict
+        Maps each entry of hosts, in order, to the DaqDeviceDescriptor of
+        its device, or to the ULError raised by the lookup or the creation
+    """
+    # Imported here so that DeviceInventory works on Python 2 without the
+    # futures package
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not isinstance(timeout, dict):
+        timeout = {None: timeout}
+    results = collections.OrderedDict.fromkeys(hosts)
+    if not results:
+        return results
+    with ThreadPoolExecutor(min(max_workers, len(results))) as pool:
+        futures = []
+        for entry in results:
+            host, host_port = entry, port
+            if isinstance(entry, tuple):
+                host, host_port = entry
+            host_timeout = timeout.get(entry, timeout.get(host,
+                                                          timeout.get(None)))
+            futures.append(pool.submit(_resolve, host, host_port,
+                                       host_timeout))
+        for entry, future in zip(results, futures):
+            results[entry] = future.result()
+
+    if first_board_num is not None:
+        board_num = first_board_num
+        for entry, device in results.items():
+            if isinstance(device, ULError):
+                continue
+            try:
+                ul.create_daq_device(board_num, device)
+                board_num += 1
+            except ULError as e:
+                results[entry] = e
+    return results
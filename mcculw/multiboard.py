@@ -0,0 +1,308 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Synchronized continuous acquisition from several boards.
+
+:class:`MultiBoardAcquisition` runs one
+:class:`mcculw.stream.AnalogInputStream` per board, reads each of them on its
+own worker thread, and merges the chunks into a single stream in which each
+item holds the same span of samples from every board.
+
+The scans can be armed on a shared external trigger, with
+:func:`mcculw.ul.set_trigger` and the EXTTRIGGER scan option, so that every
+board starts sampling on the same edge. Without a trigger the boards start
+one after the other, a few milliseconds apart; the start times are recorded
+in :attr:`MultiBoardAcquisition.start_times`.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import collections
+import threading
+import time
+from builtins import *  # @UnusedWildImport
+
+try:
+    import queue
+except ImportError:
+    # Python 2 without the future package
+    import Queue as queue  # @UnresolvedImport
+
+from mcculw import ul
+from mcculw.enums import ErrorCode, ScanOptions
+from mcculw.stream import AnalogInputStream
+from mcculw.ul import ULError
+
+BoardScan = collections.namedtuple(
+    'BoardScan', 'board_num low_chan high_chan ul_range')
+
+Trigger = collections.namedtuple(
+    'Trigger', 'trig_type low_threshold high_threshold')
+
+MergedChunk = collections.namedtuple('MergedChunk', 'index first_point data')
+
+# Put on a worker's queue when its stream has ended
+_END = object()
+
+# The longest time read blocks on a queue before checking that its worker
+# is still running and that the timeout has not expired, in seconds
+_POLL_INTERVAL = 0.1
+
+
+class MultiBoardAcquisition(object):
+    """Acquires continuously from several boards at the same rate and yields
+    time-aligned chunks.
+
+    Iterating the acquisition yields MergedChunk tuples of index (the chunk
+    number), first_point (the index of the chunk's first sample per channel
+    since the scans started) and data (a dict of (chunk_points, channels)
+    arrays by board number).
+
+    Parameters
+    ----------
+    boards : list of BoardScan or tuple
+        The board number, first and last A/D channel and A/D range of each
+        board.
+    rate : int
+        The sample rate per channel, in Hz, of every board.
+    chunk_points : int
+        The number of samples per channel in each chunk.
+    buffer_chunks : int, optional
+        The size of each board's circular buffer, in chunks.
+    options : ScanOptions, optional
+        Additional scan options for every board.
+    trigger : Trigger or tuple, optional
+        If given, :func:`.set_trigger` is called on every board with the
+        trig_type, low_threshold and high_threshold, and the scans are
+        started with EXTTRIGGER.
+    max_pending : int, optional
+        The number of chunks per board that may wait to be merged. A worker
+        stops reading its board while its queue is full, so a consumer that
+        falls behind for longer makes the scans overrun rather than using
+        unbounded memory.
+    timeout : float, optional
+        The time, in seconds, :meth:`read` may wait for a chunk beyond its
+        duration before the acquisition fails with INPUTTIMEOUT. By default,
+        it waits as long as the workers run, for example for a trigger.
+
+    Attributes
+    ----------
+    rates : dict
+        The actual rate of each board, by board number
+    start_times : dict
+        The time.perf_counter() value (time.time() on Python 2) just after
+        each scan was started, by board number
+    sample_counts : dict
+        The number of samples per channel handed out for each board, by
+        board number
+    """
+
+    def __init__(self, boards, rate, chunk_points, buffer_chunks=8,
+                 options=0, trigger=None, max_pending=16, timeout=None):
+        self.boards = [BoardScan(*board) for board in boards]
+        board_nums = [board.board_num for board in self.boards]
+        if not board_nums or len(set(board_nums)) != len(board_nums):
+            raise ValueError('boards must list distinct boards')
+        self.rate = rate
+        self.chunk_points = chunk_points
+        self.timeout = timeout
+        self.trigger = None if trigger is None else Trigger(*trigger)
+        if self.trigger is not None:
+            options |= ScanOptions.EXTTRIGGER
+        self.rates = {}
+        self.start_times = {}
+        self.sample_counts = dict.fromkeys(board_nums, 0)
+
+        self._streams = collections.OrderedDict()
+        try:
+            for board in self.boards:
+                self._streams[board.board_num] = AnalogInputStream(
+                    board.board_num, board.low_chan, board.high_chan, rate,
+                    board.ul_range, chunk_points, buffer_chunks, options)
+        except Exception:
+            self._close_streams()
+            raise
+        self._queues = dict((board_num, queue.Queue(max_pending))
+                            for board_num in board_nums)
+        # The worker threads, and the exceptions that ended them, by board
+        # number
+        self._workers = {}
+        self._errors = {}
+        self._stopping = threading.Event()
+        self._index = 0
+        # Python 2 has no perf_counter
+        self._clock = getattr(time, 'perf_counter', time.time)
+        # The end marker or exception that ended the acquisition
+        self._outcome = None
+
+    def start(self):
+        """Arms the trigger if there is one, starts the scans, and starts a
+        worker thread per board.
+
+        Raises
+        ------
+        ValueError
+            If the boards do not all run at the same actual rate, so that
+            their chunks would not span the same time. The scans are
+            stopped.
+        """
+        if self._workers:
+            return
+        self._stopping.clear()
+        self._outcome = None
+        self._errors.clear()
+        self._index = 0
+        for board_num, chunk_queue in self._queues.items():
+            self.sample_counts[board_num] = 0
+            while not chunk_queue.empty():
+                chunk_queue.get_nowait()
+        try:
+            for board_num, stream in self._streams.items():
+                if self.trigger is not None:
+                    ul.set_trigger(board_num, *self.trigger)
+                stream.start()
+                self.start_times[board_num] = self._clock()
+                self.rates[board_num] = stream.rate
+            if len(set(self.rates.values())) > 1:
+                raise ValueError('the boards run at different rates, {}, '
+                                 'so their chunks cannot be aligned'.format(
+                                     self.rates))
+        except Exception:
+            self._stop_streams()
+            raise
+        for board_num, stream in self._streams.items():
+            worker = threading.Thread(
+                target=self._run_worker,
+                args=(board_num, stream, self._queues[board_num]),
+                name='mcculw-multiboard-{}'.format(board_num))
+            worker.daemon = True
+            worker.start()
+            self._workers[board_num] = worker
+
+    def _offer(self, chunk_queue, item):
+        # Waits for room in the queue unless the acquisition is stopping.
+        # Returns False if the item was dropped.
+        while not self._stopping.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run_worker(self, board_num, stream, chunk_queue):
+        try:
+            for chunk in stream:
+                if not self._offer(chunk_queue, chunk):
+                    return
+            self._offer(chunk_queue, _END)
+        except Exception as e:
+            self._errors[board_num] = e
+            self._offer(chunk_queue, e)
+
+    def _next_item(self, board_num, deadline):
+        # Returns the next item of a board's queue, the exception that ended
+        # its worker if the worker could not queue it, or an INPUTTIMEOUT
+        # error once the deadline has passed
+        chunk_queue = self._queues[board_num]
+        worker = self._workers[board_num]
+        while True:
+            try:
+                return chunk_queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+            if not worker.is_alive():
+                try:
+                    return chunk_queue.get_nowait()
+                except queue.Empty:
+                    return self._errors.get(board_num, _END)
+            if deadline is not None and self._clock() > deadline:
+                return ULError(ErrorCode.INPUTTIMEOUT)
+
+    def _stop_streams(self):
+        for stream in self._streams.values():
+            try:
+                stream.stop()
+            except ul.ULError:
+                pass
+
+    def _close_streams(self):
+        for stream in self._streams.values():
+            stream.close()
+
+    def stop(self):
+        """Stops the scans and the worker threads. Chunks already merged
+        remain valid."""
+        self._stopping.set()
+        self._stop_streams()
+        for worker in self._workers.values():
+            worker.join()
+        self._workers = {}
+
+    def close(self):
+        """Stops the acquisition and frees the buffers."""
+        try:
+            self.stop()
+        finally:
+            self._close_streams()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            chunk = self.read()
+            if chunk is None:
+                return
+            yield chunk
+
+    def read(self):
+        """Returns the next merged chunk, waiting until every board has
+        acquired it.
+
+        Returns
+        -------
+        MergedChunk or None
+            The chunk, or None once any of the scans has stopped.
+
+        Raises
+        ------
+        ULError
+            If a board's scan failed, including an OVERRUN, or with error
+            code INPUTTIMEOUT if a board's chunk did not arrive within the
+            timeout. Every scan is stopped, and later reads raise the same
+            error.
+        Exception
+            Any other exception that stopped a board's worker thread, in the
+            same way.
+        """
+        deadline = None
+        if self.timeout is not None:
+            deadline = (self._clock() + self.chunk_points / self.rate
+                        + self.timeout)
+        data = {}
+        for board_num in self._queues:
+            item = self._outcome
+            if item is None:
+                if not self._workers:
+                    return None
+                item = self._next_item(board_num, deadline)
+            if item is _END or isinstance(item, Exception):
+                # Once one board has stopped the chunks can no longer be
+                # aligned, so stop the others
+                self._outcome = item
+                self.stop()
+                if item is _END:
+                    return None
+                raise item
+            data[board_num] = item
+        for board_num in data:
+            self.sample_counts[board_num] += self.chunk_points
+        merged = MergedChunk(self._index, self._index * self.chunk_points,
+                             data)
+        self._index += 1
+        return merged
@@ -0,0 +1,215 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Sizing of continuous A/D scans.
+
+:meth:`ScanPlan.for_rate` works out the buffer size, chunk size and poll
+interval of a continuous scan from the rate and the latency the reader can
+accept, rounding the buffer to the packet size the board requires (see
+:attr:`mcculw.device_info.AiInfo.packet_size`), and reports the memory the
+buffer takes and how long the reader may fall behind before the scan
+overruns.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import math
+
+try:
+    from math import gcd
+except ImportError:
+    # Python 3.4 and earlier
+    from fractions import gcd
+
+import numpy
+
+from mcculw import ul
+from mcculw.buffer import ScanBuffer
+from mcculw.device_info import AiInfo
+from mcculw.enums import BoardInfo, InfoType, ScanOptions
+from mcculw.stream import AnalogInputStream
+from mcculw.ul import ULError
+
+# Bounds of the suggested poll interval, in seconds
+_MIN_POLL_INTERVAL = 0.0005
+_MAX_POLL_INTERVAL = 0.05
+
+
+class ScanPlan(object):
+    """The sizes of a continuous A/D scan read in chunks.
+
+    The buffer holds buffer_chunks chunks of chunk_points samples per
+    channel. A chunk is complete every chunk_period seconds, and the reader
+    must copy it out before the scan comes back around the buffer to it.
+
+    Use :meth:`for_rate` to plan a scan for a board.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channels : int
+        The number of channels in the scan.
+    rate : int
+        The sample rate per channel, in Hz.
+    chunk_points : int
+        The number of samples per channel in each chunk.
+    buffer_chunks : int
+        The size of the buffer, in chunks.
+    resolution : int, optional
+        The resolution of the A/D, in bits.
+    options : ScanOptions, optional
+        The scan options. BACKGROUND and CONTINUOUS are always set.
+    packet_size : int, optional
+        The number of samples the buffer size must be a multiple of.
+
+    Attributes
+    ----------
+    points_per_channel : int
+        The size of the buffer, in samples per channel
+    count : int
+        The size of the buffer in samples, to pass as the count of
+        :func:`.a_in_scan`
+    dtype : numpy.dtype
+        The type of the samples in the buffer
+    memory_bytes : int
+        The size of the buffer, in bytes
+    chunk_period : float
+        The time taken to acquire a chunk, in seconds
+    overrun_margin : float
+        The time, in seconds, the reader may wait after a chunk is complete
+        before the scan starts overwriting it
+    poll_interval : float
+        A suggested interval between :func:`.get_status` calls for readers
+        that poll at a fixed interval
+    """
+
+    def __init__(self, board_num, channels, rate, chunk_points, buffer_chunks,
+                 resolution=16, options=0, packet_size=1):
+        if channels < 1 or rate <= 0:
+            raise ValueError('channels must be at least 1 and rate positive')
+        if chunk_points < 1 or buffer_chunks < 2:
+            raise ValueError('chunk_points must be at least 1 and '
+                             'buffer_chunks at least 2')
+        self.board_num = board_num
+        self.channels = channels
+        self.rate = rate
+        self.chunk_points = chunk_points
+        self.buffer_chunks = buffer_chunks
+        self.resolution = resolution
+        self.options = (options | ScanOptions.BACKGROUND
+                        | ScanOptions.CONTINUOUS)
+        self.packet_size = packet_size
+
+        self.points_per_channel = chunk_points * buffer_chunks
+        self.count = self.points_per_channel * channels
+        if self.count % packet_size:
+            raise ValueError('the buffer size must be a multiple of the '
+                             'packet size, {}'.format(packet_size))
+        if self.options & ScanOptions.SCALEDATA:
+            self.dtype = numpy.dtype(numpy.float64)
+        elif resolution <= 16:
+            self.dtype = numpy.dtype(numpy.uint16)
+        elif resolution <= 32:
+            self.dtype = numpy.dtype(numpy.uint32)
+        else:
+            self.dtype = numpy.dtype(numpy.uint64)
+        self.memory_bytes = self.count * self.dtype.itemsize
+        self.chunk_period = chunk_points / rate
+        self.overrun_margin = (buffer_chunks - 1) * self.chunk_period
+        self.poll_interval = min(max(self.chunk_period / 4,
+                                     _MIN_POLL_INTERVAL), _MAX_POLL_INTERVAL)
+
+    @classmethod
+    def for_rate(cls, board_num, channels, rate, latency_target=0.1,
+                 headroom=4.0, options=0):
+        """Plans a continuous scan of the board, reading the resolution,
+        packet size and maximum rate from the board configuration.
+
+        If the board cannot sample channels channels at rate, the rate is
+        lowered to the fastest it can; check the rate of the returned plan.
+
+        Parameters
+        ----------
+        board_num : int
+            The number associated with the board when it was installed with
+            InstaCal or created with :func:`.create_daq_device`.
+        channels : int
+            The number of channels in the scan.
+        rate : int
+            The sample rate per channel, in Hz.
+        latency_target : float, optional
+            The longest time, in seconds, a sample may wait in the buffer
+            before its chunk is complete. Chunks are as large as this
+            allows, rounded to the packet size.
+        headroom : float, optional
+            How many chunk periods the buffer holds, at least 2. The reader
+            may fall behind by all but one of them before the scan overruns.
+        options : ScanOptions, optional
+            The scan options. BACKGROUND and CONTINUOUS are always set.
+            BURSTMODE raises ValueError if the board does not support it.
+        """
+        ai_info = AiInfo(board_num)
+        packet_size = ai_info.packet_size
+        resolution = 16
+        if not options & ScanOptions.SCALEDATA:
+            resolution = ai_info.resolution
+        if (options & ScanOptions.BURSTMODE
+                and not ai_info.supported_scan_options
+                & ScanOptions.BURSTMODE):
+            raise ValueError('board {} does not support BURSTMODE'.format(
+                board_num))
+
+        # The maximum rate is the A/D rate over all channels. In burst mode
+        # each scan of the channels is clocked at it, so a scan must end
+        # before the next starts.
+        try:
+            max_rate = ul.get_config(InfoType.BOARDINFO, board_num, 0,
+                                     BoardInfo.ADMAXRATE)
+        except ULError:
+            max_rate = 0
+        if max_rate and rate * channels > max_rate:
+            rate = max_rate // channels
+
+        chunk_points = max(int(rate * latency_target), 1)
+        # Every chunk, and so the buffer, must hold a whole number of
+        # packets. Rounding down keeps the latency within the target unless
+        # a single packet is longer.
+        step = packet_size // gcd(packet_size, channels)
+        chunk_points = max(chunk_points // step, 1) * step
+        buffer_chunks = max(int(math.ceil(headroom)), 2)
+        return cls(board_num, channels, rate, chunk_points, buffer_chunks,
+                   resolution, options, packet_size)
+
+    def allocate(self):  # -> ScanBuffer
+        """Allocates a buffer of the planned size and type."""
+        return ScanBuffer(self.points_per_channel, self.channels,
+                          self.resolution, self.options)
+
+    def stream(self, low_chan, ul_range, use_events=False):
+        """Creates an :class:`.AnalogInputStream` with the planned sizes.
+
+        Parameters
+        ----------
+        low_chan : int
+            The first A/D channel of the scan; the scan covers channels
+            channels from it.
+        ul_range : ULRange
+            The A/D range code.
+        use_events : bool, optional
+            See :class:`.AnalogInputStream`.
+        """
+        return AnalogInputStream(
+            self.board_num, low_chan, low_chan + self.channels - 1, self.rate,
+            ul_range, self.chunk_points, self.buffer_chunks, self.options,
+            use_events)
+
+    def __repr__(self):
+        return ('ScanPlan(board_num={}, channels={}, rate={}, chunk_points={}, '
+                'buffer_chunks={}, memory_bytes={}, overrun_margin={:.3f})'
+                .format(self.board_num, self.channels, self.rate,
+                        self.chunk_points, self.buffer_chunks,
+                        self.memory_bytes, self.overrun_margin))
@@ -0,0 +1,674 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Records continuous scan data to binary files on a background writer thread,
+and reads the recordings back.
+
+A :class:`Recorder` accepts (points, channels) chunks, such as those read
+from a :class:`mcculw.stream.AnalogInputStream`, and writes them either as a
+``.npy`` file that :func:`numpy.load` can open (format 'npy'), as bare
+interleaved samples (format 'raw'), or as bare samples plus an index of the
+blocks written (format 'indexed'). A JSON sidecar named after the data file
+with ``.json`` appended describes the recording: the channels, ranges,
+rate, resolution, sample type and start time.
+
+The index of an 'indexed' recording, named after the data file with ``.idx``
+appended, holds one INDEX_DTYPE record per block: the index of the block's
+first sample per channel, its byte offset in the data file, and the host
+time.time() at which its last sample was received. It is written as the
+recording runs, so an interrupted recording can still be read up to its last
+complete block.
+
+An 'indexed' recording of integer counts may be compressed with zlib or
+lzma. Each block is then delta encoded per channel, each sample replaced by
+its difference from the previous sample of the same channel (modulo the
+range of the sample type), and compressed on its own, so the index still
+locates every block. Slowly varying signals give small differences that
+compress well. Blocks are compressed on a pool of threads, which zlib and
+lzma let run in parallel.
+
+:class:`Recording` memory-maps a recording of any format, and returns time
+windows of it as NumPy views without reading the rest of the file. Windows
+of a compressed recording are decompressed from the blocks they span.
+
+Chunks are copied into large blocks that the writer thread writes while the
+next block fills up, so :meth:`Recorder.write` never waits for the disk. If
+the disk stalls long enough for every block to be waiting to be written, more
+blocks are allocated rather than holding up the scan; the number of extra
+blocks is reported by :attr:`Recorder.extra_blocks`.
+
+Requires Python 3.4 or later, and NumPy.
+"""
+import collections
+import json
+import lzma
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+from mcculw import ul
+from mcculw.enums import BoardInfo, InfoType, ScanOptions
+
+SIDECAR_SUFFIX = '.json'
+INDEX_SUFFIX = '.idx'
+
+INDEX_DTYPE = numpy.dtype([('first_point', '<u8'), ('offset', '<u8'),
+                           ('host_time', '<f8')])
+
+# The size of the .npy header written, including the magic string. The
+# header is rewritten with the final shape on close, so it is padded to a
+# fixed size large enough for any shape.
+_NPY_HEADER_SIZE = 128
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+# Ends the writer thread
+_STOP = object()
+
+# Compression functions and decompressor classes by name. The level is the
+# zlib level or the lzma preset.
+_COMPRESSORS = {
+    'zlib': (zlib.compress, zlib.decompressobj),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level),
+             lzma.LZMADecompressor),
+}
+
+
+def _npy_header(dtype, points, channels):
+    header = "{{'descr': {!r}, 'fortran_order': False, 'shape': ({}, {}), }}"
+    header = header.format(dtype.str, points, channels)
+    header_len = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2
+    header = header.ljust(header_len - 1) + '\n'
+    return _NPY_MAGIC + struct.pack('<H', header_len) + header.encode('latin1')
+
+
+class _RawFile(object):
+    # Bare interleaved samples
+    data_offset = 0
+
+    def __init__(self, path, dtype, channels):
+        self.path = path
+        self.file = open(path, 'wb')
+
+    def write(self, data, first_point, host_time):
+        self.file.write(memoryview(data).cast('B'))
+
+    def close(self, points):
+        self.file.close()
+
+
+class _NpyFile(_RawFile):
+    # A .npy file whose header is rewritten with the final shape on close
+    data_offset = _NPY_HEADER_SIZE
+
+    def __init__(self, path, dtype, channels):
+        super(_NpyFile, self).__init__(path, dtype, channels)
+        self.dtype = dtype
+        self.channels = channels
+        self.file.write(_npy_header(dtype, 0, channels))
+
+    def close(self, points):
+        try:
+            self.file.seek(0)
+            self.file.write(_npy_header(self.dtype, points, self.channels))
+        finally:
+            self.file.close()
+
+
+def _delta_encode(block):
+    # Keeps the first sample of each channel, so that every block can be
+    # decoded on its own. Unsigned subtraction wraps around, and so does the
+    # sum that undoes it.
+    deltas = numpy.empty_like(block)
+    deltas[0] = block[0]
+    numpy.subtract(block[1:], block[:-1], out=deltas[1:])
+    return deltas
+
+
+def _delta_decode(deltas):
+    return numpy.cumsum(deltas, axis=0, dtype=deltas.dtype)
+
+
+def _encode(compress, level, block):
+    # Runs on the compression pool. Returns the compressed block and the time
+    # taken.
+    start = time.perf_counter()
+    data = compress(_delta_encode(block).tobytes(), level)
+    return data, time.perf_counter() - start
+
+
+class _IndexedFile(_RawFile):
+    # Bare interleaved samples, or compressed blocks, and an index entry for
+    # each block
+
+    def __init__(self, path, dtype, channels):
+        super(_IndexedFile, self).__init__(path, dtype, channels)
+        try:
+            self.index_file = open(path + INDEX_SUFFIX, 'wb')
+        except Exception:
+            self.file.close()
+            raise
+        self.offset = 0
+        self.entry = numpy.zeros(1, INDEX_DTYPE)
+
+    def write(self, data, first_point, host_time):
+        super(_IndexedFile, self).write(data, first_point, host_time)
+        self.entry[0] = (first_point, self.offset, host_time)
+        self.index_file.write(self.entry.tobytes())
+        self.offset += memoryview(data).nbytes
+        # Keep the index usable by readers of a recording in progress
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self, points):
+        try:
+            super(_IndexedFile, self).close(points)
+        finally:
+            self.index_file.close()
+
+
+_FORMATS = {'npy': _NpyFile, 'raw': _RawFile, 'indexed': _IndexedFile}
+
+
+class Recorder(object):
+    """Writes scan chunks to a binary file and a JSON sidecar.
+
+    Parameters
+    ----------
+    path : str
+        The data file to create. It is overwritten if it exists.
+    channels : list of int
+        The channel numbers of the columns of the chunks.
+    ranges : list of ULRange or ULRange
+        The range of each channel, or one range for all of them.
+    rate : float
+        The sample rate per channel, in Hz.
+    dtype : numpy.dtype
+        The type of the samples.
+    resolution : int, optional
+        The resolution of the A/D, in bits, needed to convert counts to
+        engineering units. None for scaled data.
+    file_format : str, optional
+        'npy', 'raw' or 'indexed'.
+    block_points : int, optional
+        The number of samples per channel in each block handed to the
+        writer thread. Every block but the last of a recording is full, so
+        this is also the block size of an 'indexed' recording.
+    num_blocks : int, optional
+        The number of blocks allocated up front. Two give double buffering;
+        more absorb longer disk stalls without allocating. With
+        compression, at least compression_threads + 2 are allocated.
+    metadata : dict, optional
+        Additional entries for the sidecar.
+    compression : str, optional
+        'zlib' or 'lzma' to delta encode and compress the blocks of an
+        'indexed' recording of integer samples. None to store them as they
+        are.
+    compression_level : int, optional
+        The zlib level or lzma preset. Low levels are fastest; raise it
+        only if :attr:`encode_throughput` times compression_threads leaves
+        room above the scan's data rate.
+    compression_threads : int, optional
+        The number of threads compressing blocks. By default, one per CPU.
+
+    Attributes
+    ----------
+    points_written : int
+        The number of samples per channel written to the file so far
+    bytes_written : int
+        The number of bytes of samples written to the file so far
+    extra_blocks : int
+        The number of blocks allocated beyond num_blocks because the writer
+        fell behind
+    start_time : float
+        The estimated time.time() of the first sample, or None before the
+        first chunk is written
+    compressed_bytes : int
+        The number of bytes of compressed blocks written so far
+    """
+
+    def __init__(self, path, channels, ranges, rate, dtype, resolution=None,
+                 file_format='npy', block_points=65536, num_blocks=2,
+                 metadata=None, compression=None, compression_level=1,
+                 compression_threads=None):
+        if file_format not in _FORMATS:
+            raise ValueError('file_format must be one of {}'.format(
+                ', '.join(sorted(_FORMATS))))
+        if compression is not None:
+            if compression not in _COMPRESSORS:
+                raise ValueError('compression must be one of {}'.format(
+                    ', '.join(sorted(_COMPRESSORS))))
+            if file_format != 'indexed':
+                raise ValueError("compression requires file_format 'indexed'")
+            if numpy.dtype(dtype).kind != 'u':
+                raise ValueError('compression requires unsigned integer '
+                                 'samples')
+        self.path = path
+        self.channels = list(channels)
+        if not isinstance(ranges, (list, tuple)):
+            ranges = [ranges] * len(self.channels)
+        self.ranges = list(ranges)
+        self.rate = rate
+        self.dtype = numpy.dtype(dtype)
+        self.resolution = resolution
+        self.file_format = file_format
+        self.block_points = block_points
+        self.metadata = dict(metadata or {})
+        self.start_time = None
+        self.compression = compression
+        self.compression_level = compression_level
+
+        self.points_written = 0
+        self.bytes_written = 0
+        self.compressed_bytes = 0
+        self.extra_blocks = 0
+        self._write_time = 0.0
+        self._encode_time = 0.0
+        self._pool = None
+        if compression is not None:
+            compression_threads = compression_threads or os.cpu_count() or 1
+            self._pool = ThreadPoolExecutor(compression_threads)
+            # A block stays in use until it has been compressed and written
+            num_blocks = max(num_blocks, compression_threads + 2)
+
+        self._free_blocks = collections.deque(
+            self._new_block() for _ in range(max(num_blocks, 1)))
+        self._block = self._free_blocks.popleft()
+        self._filled = 0
+        self._pending = queue.Queue()
+        self._error = None
+        self._closed = False
+
+        try:
+            self._file = _FORMATS[file_format](path, self.dtype,
+                                               len(self.channels))
+        except Exception:
+            self._shutdown_pool()
+            raise
+        self._write_sidecar()
+        self._writer = threading.Thread(target=self._run_writer,
+                                        name='mcculw-recorder')
+        self._writer.daemon = True
+        self._writer.start()
+
+    @classmethod
+    def for_stream(cls, stream, path, **kwargs):
+        """Creates a Recorder for the chunks of an
+        :class:`.AnalogInputStream`, taking the channels, range, rate and
+        sample type from the stream and the resolution from the board.
+
+        Parameters
+        ----------
+        stream : AnalogInputStream
+            The stream whose chunks will be written. Its rate is read, so
+            create the Recorder after starting the stream.
+        path : str
+            The data file to create.
+        **kwargs
+            Other arguments of :class:`Recorder`.
+        """
+        if 'resolution' not in kwargs:
+            kwargs['resolution'] = None
+            if not stream.options & ScanOptions.SCALEDATA:
+                kwargs['resolution'] = ul.get_config(
+                    InfoType.BOARDINFO, stream.board_num, 0, BoardInfo.ADRES)
+        metadata = kwargs.setdefault('metadata', {})
+        metadata.setdefault('board_num', stream.board_num)
+        return cls(path, range(stream.low_chan, stream.high_chan + 1),
+                   stream.ul_range, stream.rate, stream.buffer.dtype,
+                   **kwargs)
+
+    @property
+    def sidecar_path(self):  # -> str
+        return self.path + SIDECAR_SUFFIX
+
+    @property
+    def write_throughput(self):  # -> float
+        """The rate at which the writer thread has written, in bytes per
+        second of time spent writing."""
+        if not self._write_time:
+            return 0.0
+        return self.bytes_written / self._write_time
+
+    @property
+    def compression_ratio(self):  # -> float
+        """The number of bytes of samples per byte of compressed data
+        written, or 1.0 without compression."""
+        if not self.compressed_bytes:
+            return 1.0
+        return self.bytes_written / self.compressed_bytes
+
+    @property
+    def encode_throughput(self):  # -> float
+        """The rate at which one thread delta encodes and compresses, in
+        bytes of samples per second of time spent on it. The pool keeps up
+        with scans of up to about compression_threads times this rate."""
+        if not self._encode_time:
+            return 0.0
+        return self.bytes_written / self._encode_time
+
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _new_block(self):
+        return numpy.empty((self.block_points, len(self.channels)),
+                           self.dtype)
+
+    def _sidecar(self):
+        info = {
+            'format': self.file_format,
+            'dtype': self.dtype.str,
+            'channels': self.channels,
+            'ranges': [getattr(r, 'name', r) for r in self.ranges],
+            'rate': self.rate,
+            'resolution': self.resolution,
+            'start_time': self.start_time,
+            'start_time_utc': None if self.start_time is None else
+            time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.start_time)),
+            'points': self.points_written if self._closed else None,
+            'block_points': self.block_points,
+            'data_offset': self._file.data_offset,
+        }
+        if self.file_format == 'indexed':
+            info['index'] = os.path.basename(self.path) + INDEX_SUFFIX
+        if self.compression is not None:
+            info['compression'] = self.compression
+            info['compression_level'] = self.compression_level
+            info['delta'] = True
+        info.update(self.metadata)
+        return info
+
+    def _write_sidecar(self):
+        with open(self.sidecar_path, 'w') as f:
+            json.dump(self._sidecar(), f, indent=2, sort_keys=True)
+
+    def _run_writer(self):
+        while True:
+            item = self._pending.get()
+            if item is _STOP:
+                return
+            block, filled, host_time, encoded = item
+            if self._error is None:
+                try:
+                    data = block[:filled]
+                    if encoded is not None:
+                        data, encode_time = encoded.result()
+                        self._encode_time += encode_time
+                    start = time.perf_counter()
+                    self._file.write(data, self.points_written, host_time)
+                    self._write_time += time.perf_counter() - start
+                    self.points_written += filled
+                    self.bytes_written += block[:filled].nbytes
+                    if encoded is not None:
+                        self.compressed_bytes += len(data)
+                except Exception as e:
+                    self._error = e
+            elif encoded is not None:
+                # Wait for the pool to be done with the block
+                encoded.exception()
+            self._free_blocks.append(block)
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _hand_over(self):
+        # Passes the current block to the writer and takes a free one
+        if self._filled:
+            host_time = time.time()
+            encoded = None
+            if self._pool is not None:
+                encoded = self._pool.submit(
+                    _encode, _COMPRESSORS[self.compression][0],
+                    self.compression_level, self._block[:self._filled])
+            self._pending.put((self._block, self._filled, host_time,
+                               encoded))
+            try:
+                self._block = self._free_blocks.popleft()
+            except IndexError:
+                self._block = self._new_block()
+                self.extra_blocks += 1
+            self._filled = 0
+
+    def write(self, chunk):
+        """Queues a chunk to be written. Returns without waiting for the
+        disk.
+
+        Parameters
+        ----------
+        chunk : numpy.ndarray
+            A (points, channels) array of samples of the recorder's dtype.
+        """
+        if self._closed:
+            raise ValueError('write to a closed Recorder')
+        self._check_error()
+        chunk = numpy.asarray(chunk)
+        if chunk.ndim != 2 or chunk.shape[1] != len(self.channels):
+            raise ValueError('chunk must have {} columns'.format(
+                len(self.channels)))
+        if self.start_time is None:
+            # The time of the first sample, estimated from the time the
+            # first chunk arrived
+            self.start_time = time.time() - chunk.shape[0] / self.rate
+            self._write_sidecar()
+        start = 0
+        while start < chunk.shape[0]:
+            count = min(chunk.shape[0] - start,
+                        self.block_points - self._filled)
+            self._block[self._filled:self._filled + count] = \
+                chunk[start:start + count]
+            self._filled += count
+            start += count
+            if self._filled == self.block_points:
+                self._hand_over()
+
+    def close(self):
+        """Writes the remaining data, waits for the writer thread, and
+        finishes the file and the sidecar."""
+        if self._closed:
+            return
+        self._hand_over()
+        self._pending.put(_STOP)
+        self._writer.join()
+        self._shutdown_pool()
+        self._closed = True
+        try:
+            self._file.close(self.points_written)
+        finally:
+            self._write_sidecar()
+        self._check_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Recording(object):
+    """A recording made by :class:`Recorder`, memory-mapped for reading.
+
+    The samples of a compressed recording are not mapped: :meth:`window`
+    decompresses the blocks it needs instead.
+
+    Parameters
+    ----------
+    path : str
+        The data file of the recording. Its sidecar must be next to it.
+
+    Attributes
+    ----------
+    info : dict
+        The contents of the sidecar
+    data : numpy.memmap
+        All the samples, as a read-only (points, channels) array, or None
+        for a compressed recording
+    index : numpy.ndarray
+        The INDEX_DTYPE records of an 'indexed' recording, or None
+    rate : float
+        The sample rate per channel, in Hz
+    channels : list of int
+        The channel number of each column of data
+    compression : str
+        'zlib' or 'lzma' for a compressed recording, otherwise None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path + SIDECAR_SUFFIX) as f:
+            self.info = json.load(f)
+        self.rate = self.info['rate']
+        self.channels = self.info['channels']
+        self.compression = self.info.get('compression')
+        self.dtype = dtype = numpy.dtype(self.info['dtype'])
+        offset = self.info.get('data_offset', 0)
+        points = self.info.get('points')
+
+        self.index = None
+        if 'index' in self.info:
+            index_path = os.path.join(os.path.dirname(path),
+                                      self.info['index'])
+            self.index = numpy.fromfile(index_path, INDEX_DTYPE)
+        if self.compression is not None:
+            self.data = None
+            if points is None:
+                # The recording was not closed: every block in the index has
+                # been written in full
+                points = 0
+                if len(self.index):
+                    points = (int(self.index[-1]['first_point'])
+                              + len(self._read_block(len(self.index) - 1)))
+            self._points = points
+            return
+        if points is None:
+            # The recording was not closed: use the complete blocks
+            frame_size = dtype.itemsize * len(self.channels)
+            if self.index is not None and len(self.index):
+                last = self.index[-1]
+                points = min(
+                    int(last['first_point']) + self.info['block_points'],
+                    (os.path.getsize(path) - offset) // frame_size)
+            else:
+                points = (os.path.getsize(path) - offset) // frame_size
+        if points:
+            self.data = numpy.memmap(path, dtype, 'r', offset,
+                                     (points, len(self.channels)))
+        else:
+            self.data = numpy.empty((0, len(self.channels)), dtype)
+        self._points = self.data.shape[0]
+
+    @property
+    def points(self):  # -> int
+        """The number of samples per channel in the recording."""
+        return self._points
+
+    @property
+    def duration(self):  # -> float
+        """The length of the recording, in seconds."""
+        return self.points / self.rate
+
+    def _columns(self, channels):
+        # Converts channel numbers to a slice of columns when they are evenly
+        # spaced, so that the window stays a view
+        if channels is None:
+            return slice(None)
+        if isinstance(channels, int):
+            channels = [channels]
+        columns = [self.channels.index(chan) for chan in channels]
+        if len(columns) == 1:
+            return slice(columns[0], columns[0] + 1)
+        step = columns[1] - columns[0]
+        if step > 0 and columns == list(range(columns[0], columns[-1] + 1,
+                                              step)):
+            return slice(columns[0], columns[-1] + 1, step)
+        return columns
+
+    def _read_block(self, block):
+        # Decompresses and decodes one block of a compressed recording
+        offset = int(self.index[block]['offset'])
+        size = -1
+        if block + 1 < len(self.index):
+            size = int(self.index[block + 1]['offset']) - offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            compressed = f.read(size)
+        decompressor = _COMPRESSORS[self.compression][1]()
+        raw = decompressor.decompress(compressed)
+        if not decompressor.eof:
+            raise ValueError('block {} of {} is truncated'.format(
+                block, self.path))
+        deltas = numpy.frombuffer(raw, self.dtype).reshape(
+            (-1, len(self.channels)))
+        return _delta_decode(deltas)
+
+    def _decompress(self, first, last):
+        # Returns the samples from first up to last of a compressed recording
+        starts = self.index['first_point']
+        block = max(int(numpy.searchsorted(starts, first, 'right')) - 1, 0)
+        parts = []
+        while block < len(self.index) and starts[block] < last:
+            block_first = int(starts[block])
+            parts.append(self._read_block(block)[
+                max(first - block_first, 0):last - block_first])
+            block += 1
+        if not parts:
+            return numpy.empty((0, len(self.channels)), self.dtype)
+        return numpy.concatenate(parts)
+
+    def window(self, t0, t1, channels=None):
+        """Returns the samples from t0 up to t1.
+
+        Parameters
+        ----------
+        t0, t1 : float
+            The start and end of the window, in seconds from the first
+            sample of the recording. They are clipped to the recording.
+        channels : int or list of int, optional
+            The channel numbers to return, in order. By default, all of
+            them.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (points, channels) array. It is a view of the memory-mapped
+            file, read from disk only as it is accessed, unless channels are
+            not evenly spaced columns of the recording, in which case the
+            window is copied. The window of a compressed recording is always
+            a new array.
+        """
+        first = min(max(int(numpy.ceil(t0 * self.rate)), 0), self.points)
+        last = min(max(int(numpy.ceil(t1 * self.rate)), first), self.points)
+        if self.data is None:
+            return self._decompress(first, last)[:, self._columns(channels)]
+        return self.data[first:last, self._columns(channels)]
+
+    def host_time(self, point):
+        """Estimates the host time.time() at which a sample was acquired,
+        from the index of an 'indexed' recording, or from the start time
+        and the rate otherwise.
+
+        Parameters
+        ----------
+        point : int
+            The index of the sample per channel.
+        """
+        if self.index is None or not len(self.index):
+            return self.info['start_time'] + point / self.rate
+        # Each entry is the time at which the last sample of its block
+        # arrived
+        block = numpy.searchsorted(self.index['first_point'], point,
+                                   'right') - 1
+        block = min(max(block, 0), len(self.index) - 1)
+        entry = self.index[block]
+        if block + 1 < len(self.index):
+            block_end = int(self.index[block + 1]['first_point'])
+        else:
+            block_end = self.points
+        return float(entry['host_time']) - (block_end - point) / self.rate
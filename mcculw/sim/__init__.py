@@ -0,0 +1,33 @@
+"""
+A software implementation of the UL cbXxx functions, for running code that
+uses :mod:`mcculw.ul` without DAQ hardware or the UL DLL.
+"""
+from .board import SimulatedBoard, SimError
+from .cbw import SimulatedCbw
+from .memory import MemoryManager
+
+
+def install(devices=None, **kwargs):
+    """Creates a :class:`.SimulatedCbw` and selects it as the backend of
+    :mod:`mcculw.ul`.
+
+    Parameters
+    ----------
+    devices : list of SimulatedBoard, optional
+        The simulated devices. Defaults to a single :class:`.SimulatedBoard`.
+    **kwargs
+        Passed to :class:`.SimulatedCbw`.
+
+    Returns
+    -------
+    SimulatedCbw
+        The simulated library now in use
+    """
+    from mcculw import backend
+    cbw = SimulatedCbw(devices, **kwargs)
+    backend.set_backend(cbw)
+    return cbw
+
+
+__all__ = ['SimulatedBoard', 'SimulatedCbw', 'SimError', 'MemoryManager',
+           'install']
@@ -0,0 +1,566 @@
+# -*- coding: UTF-8 -*-
+
+"""
+A simulated DAQ device: its configuration, I/O state and running scans.
+"""
+from __future__ import absolute_import, division, print_function
+import math
+import threading
+import time
+from builtins import *  # @UnusedWildImport
+
+from mcculw.enums import (BoardInfo, ChannelType, CounterChannelType,
+                          CounterInfo, DigitalInfo, DigitalIODirection,
+                          DigitalPortType, ErrorCode, EventType, FunctionType,
+                          InfoType, InterfaceType, ScanOptions, Status,
+                          ULRange)
+from mcculw.structs import DaqDeviceDescriptor
+from .scan import PeriodicSource
+
+
+class SimError(Exception):
+    """Raised inside the simulator for conditions the UL reports through an
+    error code."""
+
+    def __init__(self, errorcode):
+        super(SimError, self).__init__(errorcode)
+        self.errorcode = errorcode
+
+
+def counts_to_volts(counts, ul_range, resolution):
+    """Converts a count to engineering units the way the simulated
+    cbToEngUnits does."""
+    span = ul_range.range_max - ul_range.range_min
+    return ul_range.range_min + counts * span / (1 << resolution)
+
+
+def volts_to_counts(value, ul_range, resolution):
+    """Converts engineering units to a count the way the simulated
+    cbFromEngUnits does, clipping to the converter's span."""
+    full_scale = 1 << resolution
+    span = ul_range.range_max - ul_range.range_min
+    counts = int(math.floor((value - ul_range.range_min) * full_scale / span
+                            + 0.5))
+    return min(max(counts, 0), full_scale - 1)
+
+
+def default_ai_signal(chan, t):
+    """The default analog input signal: a 1 V, 10 Hz sine with a phase offset
+    of pi/8 per channel."""
+    return math.sin(2 * math.pi * 10.0 * t + chan * math.pi / 8)
+
+
+_DEFAULT_AI_RANGES = (ULRange.BIP10VOLTS, ULRange.BIP5VOLTS,
+                      ULRange.BIP2VOLTS, ULRange.BIP1VOLTS)
+_DEFAULT_DIO_PORTS = ((DigitalPortType.FIRSTPORTA, 8),
+                      (DigitalPortType.FIRSTPORTB, 8))
+_SCAN_OPTIONS = (ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS
+                 | ScanOptions.EXTTRIGGER | ScanOptions.SCALEDATA
+                 | ScanOptions.BLOCKIO | ScanOptions.SINGLEIO)
+_EVENT_TYPES = (EventType.ON_SCAN_ERROR, EventType.ON_DATA_AVAILABLE,
+                EventType.ON_END_OF_INPUT_SCAN,
+                EventType.ON_END_OF_OUTPUT_SCAN)
+_EVENT_TYPE_GROUPS = (EventType.ALL_AI_EVENT_TYPES,
+                      EventType.ALL_AO_EVENT_TYPES, EventType.ALL_EVENT_TYPES)
+_COUNTER_MASK = (1 << 64) - 1
+
+
+def _as_long(count):
+    # The UL reports sample counts as a 32-bit C long, which rolls over
+    return (count + 0x80000000) % 0x100000000 - 0x80000000
+
+
+class _DigitalPort(object):
+    def __init__(self, port_type, num_bits):
+        self.port_type = port_type
+        self.num_bits = num_bits
+        self.direction = DigitalIODirection.IN
+        self.value = 0
+
+    @property
+    def mask(self):
+        return (1 << self.num_bits) - 1
+
+
+class _Counter(object):
+    def __init__(self, now):
+        self.load_value = 0
+        self.start_time = now
+
+    def value(self, now, frequency):
+        ticks = int((now - self.start_time) * frequency)
+        return (self.load_value + ticks) & _COUNTER_MASK
+
+
+class SimulatedBoard(object):
+    """A simulated DAQ device.
+
+    The analog inputs read ai_signal(chan, t), in volts, where t is the time
+    in seconds since the scan started (or since the board was created, for
+    single point reads). Scans repeat a precomputed table covering one
+    ai_signal_period (limited to max_table_frames frames), so the signal
+    should repeat with that period.
+
+    Parameters
+    ----------
+    product_name : string, optional
+    product_id : int, optional
+        Returned as BoardInfo.BOARDTYPE
+    unique_id : string, optional
+    interface_type : InterfaceType, optional
+    num_ai_chans : int, optional
+    ai_resolution : int, optional
+    ai_ranges : list of ULRange, optional
+    num_ao_chans : int, optional
+    ao_resolution : int, optional
+    ao_ranges : list of ULRange, optional
+    dio_ports : list of (DigitalPortType, int), optional
+        The type and number of bits of each digital port
+    num_counters : int, optional
+    counter_frequency : float, optional
+        The rate at which the simulated counters count, in counts per second
+    max_rate : float, optional
+        The maximum aggregate sample rate across all channels of a scan
+    fifo_size : int, optional
+        The number of samples the device can hold between transfers. When a
+        background scan is not serviced before more than fifo_size samples
+        accumulate, the scan stops with ErrorCode.OVERRUN. None (the default)
+        never overruns.
+    realtime : bool, optional
+        If True (the default), foreground scans and network timeouts take as
+        long as they would on hardware. If False they complete immediately.
+    tick_interval : float, optional
+        How often, in seconds, the simulated driver services background scans
+    ai_signal : callable, optional
+        The analog input signal, see above
+    ai_signal_period : float, optional
+        The period of ai_signal in seconds
+    max_table_frames : int, optional
+        The maximum number of frames in a scan's signal table
+    clock : callable, optional
+        Returns the current time in seconds. Defaults to time.perf_counter.
+    """
+
+    def __init__(self, product_name='Simulated DAQ', product_id=0x7FFF,
+                 unique_id='SIM00000', interface_type=InterfaceType.USB,
+                 num_ai_chans=16, ai_resolution=16,
+                 ai_ranges=_DEFAULT_AI_RANGES, num_ao_chans=2,
+                 ao_resolution=16, ao_ranges=(ULRange.BIP10VOLTS,),
+                 dio_ports=_DEFAULT_DIO_PORTS, num_counters=2,
+                 counter_frequency=1000.0, max_rate=1000000.0,
+                 fifo_size=None, realtime=True, tick_interval=0.001,
+                 ai_signal=default_ai_signal, ai_signal_period=0.1,
+                 max_table_frames=8192,
+                 clock=None):
+        self.product_name = product_name
+        self.product_id = product_id
+        self.unique_id = unique_id
+        self.interface_type = InterfaceType(interface_type)
+        self.num_ai_chans = num_ai_chans
+        self.ai_resolution = ai_resolution
+        self.ai_ranges = list(ai_ranges)
+        self.num_ao_chans = num_ao_chans
+        self.ao_resolution = ao_resolution
+        self.ao_ranges = list(ao_ranges)
+        self.counter_frequency = counter_frequency
+        self.max_rate = max_rate
+        self.fifo_size = fifo_size
+        self.realtime = realtime
+        self.tick_interval = tick_interval
+        self.ai_signal = ai_signal
+        self.ai_signal_period = ai_signal_period
+        self.max_table_frames = max_table_frames
+        if clock is None:
+            clock = getattr(time, 'perf_counter', time.time)
+        self.clock = clock
+        self.board_num = None
+
+        self.lock = threading.RLock()
+        now = clock()
+        self._created = now
+        self.ports = [_DigitalPort(port_type, num_bits)
+                      for port_type, num_bits in dio_ports]
+        self.counters = [_Counter(now) for _ in range(num_counters)]
+        self.ao_values = [0] * num_ao_chans
+        self.ai_queue = None
+        self.events = {}
+        self.scans = {}
+        self._driver = None
+        self.config = {}
+        self._init_config()
+
+    # Configuration
+
+    def _init_config(self):
+        board = InfoType.BOARDINFO
+        scan_options = int(_SCAN_OPTIONS)
+        self.config.update({
+            (board, 0, BoardInfo.BOARDTYPE): self.product_id,
+            (board, 0, BoardInfo.NUMADCHANS): self.num_ai_chans,
+            (board, 0, BoardInfo.NUMTEMPCHANS): 0,
+            (board, 0, BoardInfo.ADRES): self.ai_resolution,
+            (board, 0, BoardInfo.RANGE): -1,
+            (board, 0, BoardInfo.ADTRIGSRC): 0,
+            (board, 0, BoardInfo.ADSCANOPTIONS): scan_options,
+            (board, 0, BoardInfo.ADMAXRATE): int(self.max_rate),
+            (board, 0, BoardInfo.NUMDACHANS): self.num_ao_chans,
+            (board, 0, BoardInfo.DACRES): self.ao_resolution,
+            (board, 0, BoardInfo.DACSCANOPTIONS): scan_options,
+            (board, 0, BoardInfo.DINUMDEVS): len(self.ports),
+            (board, 0, BoardInfo.CINUMDEVS): len(self.counters),
+            (board, 0, BoardInfo.NUMEXPS): 0,
+        })
+        daqi_chan_types = (ChannelType.ANALOG, ChannelType.DIGITAL16,
+                           ChannelType.CTR32LOW, ChannelType.PADZERO)
+        daqo_chan_types = (ChannelType.ANALOG, ChannelType.DIGITAL16)
+        self.config[(board, 0, BoardInfo.DAQINUMCHANTYPES)] = len(
+            daqi_chan_types)
+        for index, chan_type in enumerate(daqi_chan_types):
+            self.config[(board, index, BoardInfo.DAQICHANTYPE)] = int(
+                chan_type)
+        self.config[(board, 0, BoardInfo.DAQONUMCHANTYPES)] = len(
+            daqo_chan_types)
+        for index, chan_type in enumerate(daqo_chan_types):
+            self.config[(board, index, BoardInfo.DAQOCHANTYPE)] = int(
+                chan_type)
+        for chan in range(self.num_ao_chans):
+            self.config[(board, chan, BoardInfo.DACRANGE)] = int(
+                self.ao_ranges[0])
+        for index in range(len(self.counters)):
+            self.config[(board, index, BoardInfo.CTRSCANOPTIONS)] = int(
+                ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS
+                | ScanOptions.CTR32BIT)
+            self.config[(InfoType.COUNTERINFO, index, CounterInfo.CTRTYPE)] = (
+                int(CounterChannelType.CTRSCAN))
+            self.config[(InfoType.COUNTERINFO, index, CounterInfo.CTRNUM)] = (
+                index)
+        for index, port in enumerate(self.ports):
+            digital = InfoType.DIGITALINFO
+            self.config.update({
+                (digital, index, DigitalInfo.DEVTYPE): int(port.port_type),
+                (digital, index, DigitalInfo.NUMBITS): port.num_bits,
+                (digital, index, DigitalInfo.INMASK): 0,
+                (digital, index, DigitalInfo.OUTMASK): 0,
+            })
+
+    def get_config(self, info_type, dev_num, config_item):
+        if info_type == InfoType.DIGITALINFO:
+            port = self._port_by_index(dev_num)
+            if config_item == DigitalInfo.CURVAL:
+                return port.value
+            if config_item == DigitalInfo.CONFIG:
+                return int(port.direction)
+        key = (info_type, dev_num, config_item)
+        if key not in self.config:
+            key = (info_type, 0, config_item)
+        if key not in self.config:
+            if info_type not in InfoType.__members__.values():
+                raise SimError(ErrorCode.BADCONFIGTYPE)
+            raise SimError(ErrorCode.BADCONFIGITEM)
+        return self.config[key]
+
+    def set_config(self, info_type, dev_num, config_item, config_val):
+        self.config[(info_type, dev_num, config_item)] = config_val
+
+    def get_config_string(self, info_type, dev_num, config_item):
+        if (info_type == InfoType.BOARDINFO
+                and config_item == BoardInfo.DEVUNIQUEID):
+            return self.unique_id
+        raise SimError(ErrorCode.BADCONFIGITEM)
+
+    def descriptor(self):
+        """Returns the DaqDeviceDescriptor that discovery reports for this
+        device."""
+        descriptor = DaqDeviceDescriptor()
+        descriptor.product_name = self.product_name
+        descriptor.product_id = self.product_id
+        descriptor.interface_type = int(self.interface_type)
+        descriptor.dev_string = self.product_name
+        descriptor.unique_id = self.unique_id
+        descriptor.nuid = abs(hash(self.unique_id)) & 0xFFFFFFFFFFFF
+        return descriptor
+
+    # Analog I/O
+
+    def check_ai_channel(self, chan):
+        if not 0 <= chan < self.num_ai_chans:
+            raise SimError(ErrorCode.BADADCHAN)
+
+    def check_ai_range(self, ul_range):
+        try:
+            ul_range = ULRange(ul_range)
+        except ValueError:
+            raise SimError(ErrorCode.BADRANGE)
+        if ul_range not in self.ai_ranges:
+            raise SimError(ErrorCode.BADRANGE)
+        return ul_range
+
+    def check_ao_channel(self, chan):
+        if not 0 <= chan < self.num_ao_chans:
+            raise SimError(ErrorCode.BADDACHAN)
+
+    def check_ao_range(self, ul_range):
+        try:
+            ul_range = ULRange(ul_range)
+        except ValueError:
+            raise SimError(ErrorCode.BADRANGE)
+        if ul_range not in self.ao_ranges:
+            raise SimError(ErrorCode.BADRANGE)
+        return ul_range
+
+    def ai_volts(self, chan, ul_range):
+        self.check_ai_channel(chan)
+        ul_range = self.check_ai_range(ul_range)
+        volts = self.ai_signal(chan, self.clock() - self._created)
+        return min(max(volts, ul_range.range_min), ul_range.range_max)
+
+    def ai_counts(self, chan, ul_range):
+        ul_range = self.check_ai_range(ul_range)
+        return volts_to_counts(self.ai_volts(chan, ul_range), ul_range,
+                               self.ai_resolution)
+
+    def a_out(self, chan, ul_range, counts):
+        self.check_ao_channel(chan)
+        self.check_ao_range(ul_range)
+        if not 0 <= counts < (1 << self.ao_resolution):
+            raise SimError(ErrorCode.BADDAVAL)
+        self.ao_values[chan] = counts
+
+    def load_queue(self, chan_list, gain_list):
+        if not chan_list:
+            self.ai_queue = None
+            return
+        for chan, gain in zip(chan_list, gain_list):
+            self.check_ai_channel(chan)
+            self.check_ai_range(gain)
+        self.ai_queue = (list(chan_list), [ULRange(g) for g in gain_list])
+
+    # Digital I/O
+
+    def _port_by_index(self, index):
+        if not 0 <= index < len(self.ports):
+            raise SimError(ErrorCode.BADPORTNUM)
+        return self.ports[index]
+
+    def port(self, port_type):
+        for port in self.ports:
+            if port.port_type == port_type:
+                return port
+        raise SimError(ErrorCode.BADPORTNUM)
+
+    def _bit_location(self, port_type, bit_num):
+        # Bit numbers beyond the width of the port continue into the
+        # following ports
+        index = self.ports.index(self.port(port_type))
+        while bit_num >= self.ports[index].num_bits:
+            bit_num -= self.ports[index].num_bits
+            index += 1
+            if index >= len(self.ports):
+                raise SimError(ErrorCode.BADBITNUMBER)
+        return self.ports[index], bit_num
+
+    def d_in(self, port_type):
+        return self.port(port_type).value
+
+    def d_out(self, port_type, value):
+        port = self.port(port_type)
+        port.value = value & port.mask
+
+    def d_bit_in(self, port_type, bit_num):
+        port, bit = self._bit_location(port_type, bit_num)
+        return (port.value >> bit) & 1
+
+    def d_bit_out(self, port_type, bit_num, bit_value):
+        port, bit = self._bit_location(port_type, bit_num)
+        if bit_value:
+            port.value |= 1 << bit
+        else:
+            port.value &= ~(1 << bit)
+
+    def d_config_port(self, port_type, direction):
+        self.port(port_type).direction = DigitalIODirection(direction)
+
+    def d_config_bit(self, port_type, bit_num, direction):
+        if port_type != DigitalPortType.AUXPORT:
+            raise SimError(ErrorCode.BADPORTNUM)
+        self._bit_location(port_type, bit_num)
+
+    # Counters
+
+    def counter(self, counter_num):
+        if not 0 <= counter_num < len(self.counters):
+            raise SimError(ErrorCode.BADCOUNTERDEVNUM)
+        return self.counters[counter_num]
+
+    def c_in(self, counter_num):
+        return self.counter(counter_num).value(self.clock(),
+                                               self.counter_frequency)
+
+    def c_load(self, counter_num, value):
+        counter = self.counter(counter_num)
+        counter.load_value = value
+        counter.start_time = self.clock()
+
+    # Events
+
+    def enable_event(self, event_type, event_param, callback, user_data):
+        for single_type in self._split_event_types(event_type):
+            if single_type in self.events:
+                raise SimError(ErrorCode.ALREADYENABLED)
+        for single_type in self._split_event_types(event_type):
+            self.events[single_type] = (callback, event_param, user_data)
+
+    def disable_event(self, event_type):
+        for single_type in self._split_event_types(event_type):
+            self.events.pop(single_type, None)
+
+    @staticmethod
+    def _split_event_types(event_type):
+        single_types = [t for t in _EVENT_TYPES if event_type & t]
+        if event_type in _EVENT_TYPE_GROUPS:
+            return single_types
+        supported = 0
+        for single_type in _EVENT_TYPES:
+            supported |= single_type
+        if not single_types or event_type & ~supported:
+            raise SimError(ErrorCode.BADEVENTTYPE)
+        return single_types
+
+    def _fire_events(self, pending):
+        # Called without the board lock held, so that handlers can call back
+        # into the library
+        for event_type, event_data in pending:
+            handler = self.events.get(event_type)
+            if handler is not None:
+                callback, _, user_data = handler
+                callback(self.board_num, int(event_type), event_data,
+                         user_data)
+
+    # Scans
+
+    def status(self, function_type):
+        self.service()
+        with self.lock:
+            task = self.scans.get(function_type)
+            if task is None:
+                return Status.IDLE, 0, -1, ErrorCode.NOERRORS
+            return (task.status, _as_long(task.position), task.cur_index,
+                    task.error)
+
+    def build_ai_source(self, channels, ranges, rate, ctype, scaled):
+        """Builds the signal table for an analog input scan."""
+        table_frames = max(1, min(int(round(rate * self.ai_signal_period)),
+                                  self.max_table_frames))
+        table = (ctype * (table_frames * len(channels)))()
+        i = 0
+        for frame in range(table_frames):
+            t = frame / rate
+            for chan, ul_range in zip(channels, ranges):
+                volts = self.ai_signal(chan, t)
+                volts = min(max(volts, ul_range.range_min),
+                            ul_range.range_max)
+                if scaled:
+                    table[i] = volts
+                else:
+                    table[i] = volts_to_counts(volts, ul_range,
+                                               self.ai_resolution)
+                i += 1
+        return PeriodicSource(table)
+
+    def start_scan(self, task):
+        """Starts a scan. Foreground scans run to completion before this
+        returns."""
+        if task.count <= 0 or task.count < task.num_chans:
+            raise SimError(ErrorCode.BADCOUNT)
+        if task.continuous and task.count % task.num_chans:
+            raise SimError(ErrorCode.BADCOUNT)
+        if task.rate <= 0 or task.rate * task.num_chans > self.max_rate:
+            raise SimError(ErrorCode.BADRATE)
+        if not task.address:
+            raise SimError(ErrorCode.BADPOINTER)
+        if task.continuous and not task.background:
+            raise SimError(ErrorCode.BADOPTION)
+        with self.lock:
+            running = self.scans.get(task.function_type)
+            if running is not None and running.is_running:
+                raise SimError(ErrorCode.ALREADYACTIVE)
+            self.scans[task.function_type] = task
+            task.start(self.clock())
+        if task.background:
+            self._start_driver()
+        else:
+            if self.realtime:
+                time.sleep(task.duration)
+            with self.lock:
+                task.start_time -= task.duration
+                pending = self._advance(task, self.clock())
+            self._fire_events(pending)
+
+    def stop_scan(self, function_type):
+        with self.lock:
+            task = self.scans.get(function_type)
+            if task is not None and task.is_running:
+                self._advance(task, self.clock())
+                task.stop()
+
+    def service(self):
+        """Transfers the data of every running scan up to the current time
+        and raises any resulting events."""
+        pending = []
+        with self.lock:
+            now = self.clock()
+            for task in list(self.scans.values()):
+                if task.is_running:
+                    pending.extend(self._advance(task, now))
+        self._fire_events(pending)
+
+    def _advance(self, task, now):
+        pending = []
+        if not task.is_running:
+            return pending
+        target = task.target_position(now)
+        if (self.fifo_size is not None and task.background
+                and target - task.position > self.fifo_size):
+            task.stop(ErrorCode.OVERRUN)
+            pending.append((EventType.ON_SCAN_ERROR, int(ErrorCode.OVERRUN)))
+            return pending
+        if not task.transfer(target):
+            return pending
+        if not task.is_input and task.function_type == FunctionType.AOFUNCTION:
+            frame = task.last_frame()
+            if frame is not None:
+                for chan, value in zip(task.channels, frame):
+                    self.ao_values[chan] = int(value)
+        available = self.events.get(EventType.ON_DATA_AVAILABLE)
+        if available is not None and task.is_input:
+            event_param = max(available[1], 1)
+            if task.position - task.last_event_count >= event_param:
+                task.last_event_count = task.position
+                pending.append((EventType.ON_DATA_AVAILABLE,
+                                _as_long(task.position)))
+        if not task.is_running:
+            end_event = (EventType.ON_END_OF_INPUT_SCAN if task.is_input
+                         else EventType.ON_END_OF_OUTPUT_SCAN)
+            pending.append((end_event, _as_long(task.position)))
+        return pending
+
+    def _start_driver(self):
+        with self.lock:
+            if self._driver is not None and self._driver.is_alive():
+                return
+            self._driver = threading.Thread(
+                target=self._run_driver,
+                name='mcculw-sim-board-{}'.format(self.board_num))
+            self._driver.daemon = True
+            self._driver.start()
+
+    def _run_driver(self):
+        while True:
+            time.sleep(self.tick_interval)
+            self.service()
+            with self.lock:
+                if not any(task.is_running and task.background
+                           for task in self.scans.values()):
+                    self._driver = None
+                    return
+
@@ -0,0 +1,669 @@
+# -*- coding: UTF-8 -*-
+
+"""
+The simulated library: an object exposing the cbXxx functions that
+:mod:`mcculw.ul` calls, backed by one or more :class:`.SimulatedBoard`
+devices.
+"""
+from __future__ import absolute_import, division, print_function
+import functools
+import threading
+import time
+from ctypes import sizeof
+from builtins import *  # @UnusedWildImport
+
+from mcculw.enums import (ChannelType, ErrorCode, FunctionType, ScanOptions,
+                          ULRange)
+from .board import (SimError, SimulatedBoard, counts_to_volts,
+                    volts_to_counts)
+from .memory import (MemoryManager, WIN_BUF_TYPE, WIN_BUF_32_TYPE,
+                     WIN_BUF_64_TYPE, SCALED_WIN_BUF_TYPE, address_of,
+                     copy_elements, referenced_object)
+from .scan import FunctionSource, ScanTask
+
+
+def _ul_function(func):
+    # Reports SimError exceptions through the return value, as the UL does
+    @functools.wraps(func)
+    def wrapper(*args):
+        try:
+            result = func(*args)
+        except SimError as e:
+            return int(e.errorcode)
+        return ErrorCode.NOERRORS if result is None else result
+    return wrapper
+
+
+def _set_out(ref, value):
+    referenced_object(ref).value = value
+
+
+def _get_in(ref):
+    return referenced_object(ref).value
+
+
+class SimulatedCbw(object):
+    """A software implementation of the UL cbXxx functions.
+
+    Select it as the backend of :mod:`mcculw.ul` with
+    ``mcculw.backend.set_backend(SimulatedCbw())`` or by setting
+    MCCULW_BACKEND to ``mcculw.sim:SimulatedCbw``. Functions that are not
+    simulated return ErrorCode.BADBOARDTYPE.
+
+    Parameters
+    ----------
+    devices : list of SimulatedBoard, optional
+        The devices that can be discovered. Defaults to a single
+        :class:`.SimulatedBoard`.
+    installed : bool, optional
+        If True (the default), the devices start out configured as board
+        numbers 0, 1, ..., as if they had been installed with InstaCal.
+        :func:`.ignore_instacal` removes them.
+    net_devices : dict, optional
+        Maps host names to the devices returned by
+        :func:`.get_net_device_descriptor`. Unknown hosts report
+        ErrorCode.NETDEVNOTFOUND.
+    realtime : bool, optional
+        If True (the default), lookups of unknown network hosts block for the
+        requested timeout, as they do on a real network, and discovery takes
+        discovery_time.
+    discovery_time : float, optional
+        The time, in seconds, :func:`.get_daq_device_inventory` takes. Real
+        discovery over USB, Bluetooth and Ethernet takes seconds.
+    """
+
+    def __init__(self, devices=None, installed=True, net_devices=None,
+                 realtime=True, discovery_time=0.0):
+        if devices is None:
+            devices = [SimulatedBoard()]
+        self.devices = list(devices)
+        self.net_devices = dict(net_devices or {})
+        self.realtime = realtime
+        self.discovery_time = discovery_time
+        self.memory = MemoryManager()
+        self.boards = {}
+        self._instacal_boards = set()
+        self._lock = threading.Lock()
+        if installed:
+            for board_num, device in enumerate(self.devices):
+                self._install(board_num, device)
+                self._instacal_boards.add(board_num)
+
+    def _install(self, board_num, device):
+        device.board_num = board_num
+        self.boards[board_num] = device
+
+    def __getattr__(self, name):
+        # Functions the simulator does not implement report that they cannot
+        # be used with this board
+        if not name.startswith('cb'):
+            raise AttributeError(name)
+
+        def unsupported(*args):
+            return int(ErrorCode.BADBOARDTYPE)
+        unsupported.__name__ = name
+        return unsupported
+
+    def board(self, board_num):
+        """Returns the device configured with the given board number."""
+        try:
+            return self.boards[board_num]
+        except KeyError:
+            raise SimError(ErrorCode.BADBOARD)
+
+    # Device discovery and configuration
+
+    @_ul_function
+    def cbIgnoreInstaCal(self):
+        with self._lock:
+            for board_num in self._instacal_boards:
+                self.boards.pop(board_num, None)
+            self._instacal_boards.clear()
+
+    @_ul_function
+    def cbGetDaqDeviceInventory(self, interface_type, devices, num_devices):
+        if self.realtime and self.discovery_time:
+            time.sleep(self.discovery_time)
+        matching = [device for device in self.devices
+                    if device.interface_type & interface_type]
+        matching = matching[:_get_in(num_devices)]
+        for index, device in enumerate(matching):
+            devices[index] = device.descriptor()
+        _set_out(num_devices, len(matching))
+
+    @_ul_function
+    def cbGetNetDeviceDescriptor(self, host, port, descriptor, timeout):
+        if isinstance(host, bytes):
+            host = host.decode('utf8')
+        device = self.net_devices.get(host)
+        if device is None:
+            if self.realtime:
+                time.sleep(timeout / 1000.0)
+            raise SimError(ErrorCode.NETDEVNOTFOUND)
+        result = referenced_object(descriptor)
+        found = device.descriptor()
+        for field, _ in result._fields_:
+            setattr(result, field, getattr(found, field))
+
+    @_ul_function
+    def cbCreateDaqDevice(self, board_num, descriptor):
+        unique_id = descriptor.unique_id
+        known = self.devices + list(self.net_devices.values())
+        device = next((d for d in known if d.unique_id == unique_id), None)
+        if device is None:
+            raise SimError(ErrorCode.BADBOARD)
+        with self._lock:
+            if board_num in self.boards:
+                raise SimError(ErrorCode.BOARDNUMINUSE)
+            self._install(board_num, device)
+
+    @_ul_function
+    def cbReleaseDaqDevice(self, board_num):
+        with self._lock:
+            device = self.boards.pop(board_num, None)
+        if device is not None:
+            for function_type in list(device.scans):
+                device.stop_scan(function_type)
+
+    def cbGetBoardNumber(self, descriptor):
+        for board_num, device in self.boards.items():
+            if device.unique_id == descriptor.unique_id:
+                return board_num
+        return -1
+
+    @_ul_function
+    def cbGetConfig(self, info_type, board_num, dev_num, config_item,
+                    config_val):
+        _set_out(config_val, self.board(board_num).get_config(
+            info_type, dev_num, config_item))
+
+    @_ul_function
+    def cbSetConfig(self, info_type, board_num, dev_num, config_item,
+                    config_val):
+        self.board(board_num).set_config(info_type, dev_num, config_item,
+                                         config_val)
+
+    @_ul_function
+    def cbGetConfigString(self, info_type, board_num, dev_num, config_item,
+                          config_val, max_config_len):
+        value = self.board(board_num).get_config_string(
+            info_type, dev_num, config_item)
+        encoded = value.encode('utf-8')[:_get_in(max_config_len) - 1]
+        config_val.value = encoded
+
+    @_ul_function
+    def cbGetBoardName(self, board_num, name):
+        name.value = self.board(board_num).product_name.encode('utf-8')
+
+    @_ul_function
+    def cbGetErrMsg(self, error_code, msg):
+        try:
+            text = ErrorCode(error_code).name
+        except ValueError:
+            text = 'Unknown error code ' + str(error_code)
+        msg.value = ('Simulated error: ' + text).encode('utf-8')
+
+    @_ul_function
+    def cbFlashLED(self, board_num):
+        self.board(board_num)
+
+    @_ul_function
+    def cbAInputMode(self, board_num, input_mode):
+        self.board(board_num)
+
+    @_ul_function
+    def cbAChanInputMode(self, board_num, channel, input_mode):
+        self.board(board_num).check_ai_channel(channel)
+
+    @_ul_function
+    def cbSetTrigger(self, board_num, trig_type, low_threshold,
+                     high_threshold):
+        self.board(board_num)
+
+    # Analog I/O
+
+    @_ul_function
+    def cbAIn(self, board_num, channel, ul_range, data_value):
+        _set_out(data_value, self.board(board_num).ai_counts(channel,
+                                                              ul_range))
+
+    @_ul_function
+    def cbAIn32(self, board_num, channel, ul_range, data_value, options):
+        _set_out(data_value, self.board(board_num).ai_counts(channel,
+                                                              ul_range))
+
+    @_ul_function
+    def cbVIn(self, board_num, channel, ul_range, data_value, options):
+        _set_out(data_value, self.board(board_num).ai_volts(channel,
+                                                             ul_range))
+
+    @_ul_function
+    def cbVIn32(self, board_num, channel, ul_range, data_value, options):
+        _set_out(data_value, self.board(board_num).ai_volts(channel,
+                                                             ul_range))
+
+    @_ul_function
+    def cbAOut(self, board_num, channel, ul_range, data_value):
+        self.board(board_num).a_out(channel, ul_range, data_value)
+
+    @_ul_function
+    def cbVOut(self, board_num, channel, ul_range, data_value, options):
+        # A c_float, as passed by VoltageOutputChannel, converts to its value
+        # on the way to the DLL
+        data_value = getattr(data_value, 'value', data_value)
+        board = self.board(board_num)
+        ul_range = board.check_ao_range(ul_range)
+        board.a_out(channel, ul_range, volts_to_counts(
+            data_value, ul_range, board.ao_resolution))
+
+    @_ul_function
+    def cbALoadQueue(self, board_num, chan_list, gain_list, count):
+        self.board(board_num).load_queue(
+            [chan_list[i] for i in range(count)],
+            [gain_list[i] for i in range(count)])
+
+    @_ul_function
+    def cbToEngUnits(self, board_num, ul_range, data_value, eng_units_value):
+        board = self.board(board_num)
+        _set_out(eng_units_value, counts_to_volts(
+            data_value, ULRange(ul_range), board.ai_resolution))
+
+    @_ul_function
+    def cbToEngUnits32(self, board_num, ul_range, data_value,
+                       eng_units_value):
+        board = self.board(board_num)
+        _set_out(eng_units_value, counts_to_volts(
+            data_value, ULRange(ul_range), board.ai_resolution))
+
+    @_ul_function
+    def cbFromEngUnits(self, board_num, ul_range, eng_units_value,
+                       data_value):
+        board = self.board(board_num)
+        _set_out(data_value, volts_to_counts(
+            eng_units_value, ULRange(ul_range), board.ao_resolution))
+
+    @_ul_function
+    def cbAInScan(self, board_num, low_chan, high_chan, num_points, rate,
+                  ul_range, memhandle, options):
+        board = self.board(board_num)
+        if board.ai_queue is not None:
+            channels, ranges = board.ai_queue
+        else:
+            if high_chan < low_chan:
+                raise SimError(ErrorCode.BADADCHAN)
+            channels = list(range(low_chan, high_chan + 1))
+            for chan in channels:
+                board.check_ai_channel(chan)
+            ranges = [board.check_ai_range(ul_range)] * len(channels)
+        scaled = bool(options & ScanOptions.SCALEDATA)
+        if scaled:
+            default_type = SCALED_WIN_BUF_TYPE
+        elif board.ai_resolution > 16:
+            default_type = WIN_BUF_32_TYPE
+        else:
+            default_type = WIN_BUF_TYPE
+        ctype = self.memory.element_type(memhandle, default_type)
+        frame_rate = _get_in(rate)
+        source = board.build_ai_source(channels, ranges, frame_rate, ctype,
+                                       scaled) if frame_rate > 0 else None
+        task = ScanTask(FunctionType.AIFUNCTION, address_of(memhandle),
+                        ctype, num_points, channels, frame_rate, options,
+                        source)
+        board.start_scan(task)
+
+    @_ul_function
+    def cbAPretrig(self, board_num, low_chan, high_chan, pretrig_count,
+                   total_count, rate, ul_range, memhandle, options):
+        # Runs in the foreground, and the trigger occurs as soon as the
+        # pretrigger samples have been acquired. Unless CONVERTDATA is set
+        # the buffer is left as pretrigger hardware leaves it: the
+        # post-trigger samples first, then the pretrigger samples, and on
+        # 12-bit boards each sample holds the channel number in its low 4
+        # bits.
+        board = self.board(board_num)
+        if options & ScanOptions.BACKGROUND:
+            raise SimError(ErrorCode.BADOPTION)
+        if high_chan < low_chan:
+            raise SimError(ErrorCode.BADADCHAN)
+        channels = list(range(low_chan, high_chan + 1))
+        for chan in channels:
+            board.check_ai_channel(chan)
+        ranges = [board.check_ai_range(ul_range)] * len(channels)
+        num_chans = len(channels)
+        pretrig = -(-_get_in(pretrig_count) // num_chans) * num_chans
+        total = _get_in(total_count) // num_chans * num_chans
+        if pretrig < 0 or total <= pretrig:
+            raise SimError(ErrorCode.BADCOUNT)
+        frame_rate = _get_in(rate)
+        source = board.build_ai_source(channels, ranges, frame_rate,
+                                       WIN_BUF_TYPE, False) \
+            if frame_rate > 0 else None
+        task = ScanTask(FunctionType.AIFUNCTION, address_of(memhandle),
+                        WIN_BUF_TYPE, total, channels, frame_rate, options,
+                        source)
+        board.start_scan(task)
+        if not options & ScanOptions.CONVERTDATA:
+            data = (WIN_BUF_TYPE * total).from_address(task.address)
+            raw = list(data)
+            if board.ai_resolution == 12:
+                raw = [(value << 4) | (channels[i % num_chans] & 0xF)
+                       for i, value in enumerate(raw)]
+            data[:] = raw[pretrig:] + raw[:pretrig]
+        _set_out(pretrig_count, pretrig)
+        _set_out(total_count, total)
+
+    @_ul_function
+    def cbAConvertPretrigData(self, board_num, pretrig_count, total_count,
+                              data, chan_tags):
+        board = self.board(board_num)
+        pretrig = _get_in(pretrig_count)
+        total = _get_in(total_count)
+        address = address_of(data)
+        if not address:
+            raise SimError(ErrorCode.BADPOINTER)
+        if not 0 <= pretrig < total:
+            raise SimError(ErrorCode.BADCOUNT)
+        values = (WIN_BUF_TYPE * total).from_address(address)
+        ordered = values[total - pretrig:] + values[:total - pretrig]
+        if board.ai_resolution == 12:
+            tags_address = address_of(chan_tags)
+            if tags_address:
+                tags = (WIN_BUF_TYPE * total).from_address(tags_address)
+                tags[:] = [value & 0xF for value in ordered]
+            ordered = [value >> 4 for value in ordered]
+        values[:] = ordered
+
+    @_ul_function
+    def cbAOutScan(self, board_num, low_chan, high_chan, num_points, rate,
+                   ul_range, memhandle, options):
+        board = self.board(board_num)
+        if high_chan < low_chan:
+            raise SimError(ErrorCode.BADDACHAN)
+        channels = list(range(low_chan, high_chan + 1))
+        for chan in channels:
+            board.check_ao_channel(chan)
+        board.check_ao_range(ul_range)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_TYPE)
+        task = ScanTask(FunctionType.AOFUNCTION, address_of(memhandle),
+                        ctype, num_points, channels, _get_in(rate), options)
+        board.start_scan(task)
+
+    # Digital I/O
+
+    @_ul_function
+    def cbDIn(self, board_num, port_type, data_value):
+        _set_out(data_value, self.board(board_num).d_in(port_type))
+
+    @_ul_function
+    def cbDIn32(self, board_num, port_type, data_value):
+        _set_out(data_value, self.board(board_num).d_in(port_type))
+
+    @_ul_function
+    def cbDOut(self, board_num, port_type, data_value):
+        self.board(board_num).d_out(port_type, data_value)
+
+    @_ul_function
+    def cbDOut32(self, board_num, port_type, data_value):
+        self.board(board_num).d_out(port_type, data_value)
+
+    @_ul_function
+    def cbDBitIn(self, board_num, port_type, bit_num, bit_value):
+        _set_out(bit_value, self.board(board_num).d_bit_in(port_type,
+                                                            bit_num))
+
+    @_ul_function
+    def cbDBitOut(self, board_num, port_type, bit_num, bit_value):
+        self.board(board_num).d_bit_out(port_type, bit_num, bit_value)
+
+    @_ul_function
+    def cbDConfigPort(self, board_num, port_type, direction):
+        self.board(board_num).d_config_port(port_type, direction)
+
+    @_ul_function
+    def cbDConfigBit(self, board_num, port_type, bit_num, direction):
+        self.board(board_num).d_config_bit(port_type, bit_num, direction)
+
+    @_ul_function
+    def cbDInScan(self, board_num, port_type, count, rate, memhandle,
+                  options):
+        board = self.board(board_num)
+        port = board.port(port_type)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_TYPE)
+        source = FunctionSource([lambda frame: port.value], ctype)
+        task = ScanTask(FunctionType.DIFUNCTION, address_of(memhandle), ctype,
+                        count, [port_type], _get_in(rate), options, source)
+        board.start_scan(task)
+
+    @_ul_function
+    def cbDOutScan(self, board_num, port_type, count, rate, memhandle,
+                   options):
+        board = self.board(board_num)
+        board.port(port_type)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_TYPE)
+        task = ScanTask(FunctionType.DOFUNCTION, address_of(memhandle), ctype,
+                        count, [port_type], _get_in(rate), options)
+        board.start_scan(task)
+
+    # Counters
+
+    @_ul_function
+    def cbCIn(self, board_num, counter_num, count):
+        _set_out(count, self.board(board_num).c_in(counter_num) & 0xFFFF)
+
+    @_ul_function
+    def cbCIn32(self, board_num, counter_num, count):
+        _set_out(count,
+                 self.board(board_num).c_in(counter_num) & 0xFFFFFFFF)
+
+    @_ul_function
+    def cbCIn64(self, board_num, counter_num, count):
+        _set_out(count, self.board(board_num).c_in(counter_num))
+
+    @_ul_function
+    def cbCClear(self, board_num, counter_num):
+        self.board(board_num).c_load(counter_num, 0)
+
+    @_ul_function
+    def cbCLoad(self, board_num, reg_num, load_value):
+        self.board(board_num).c_load(reg_num, load_value)
+
+    @_ul_function
+    def cbCLoad32(self, board_num, reg_num, load_value):
+        self.board(board_num).c_load(reg_num, load_value)
+
+    @_ul_function
+    def cbCLoad64(self, board_num, reg_num, load_value):
+        self.board(board_num).c_load(reg_num, load_value)
+
+    @_ul_function
+    def cbCInScan(self, board_num, first_ctr, last_ctr, count, rate,
+                  memhandle, options):
+        board = self.board(board_num)
+        if last_ctr < first_ctr:
+            raise SimError(ErrorCode.BADCOUNTERDEVNUM)
+        counters = [board.counter(ctr)
+                    for ctr in range(first_ctr, last_ctr + 1)]
+        frame_rate = _get_in(rate)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_32_TYPE)
+        ticks_per_frame = board.counter_frequency / max(frame_rate, 1)
+        mask = (1 << (8 * sizeof(ctype))) - 1
+        start = board.clock()
+        if not options & ScanOptions.NOCLEAR:
+            for counter in counters:
+                counter.load_value = 0
+                counter.start_time = start
+        bases = [counter.value(start, board.counter_frequency)
+                 for counter in counters]
+        source = FunctionSource(
+            [_counter_channel(base, ticks_per_frame, mask)
+             for base in bases], ctype)
+        task = ScanTask(FunctionType.CTRFUNCTION, address_of(memhandle),
+                        ctype, count, list(range(first_ctr, last_ctr + 1)),
+                        frame_rate, options, source)
+        board.start_scan(task)
+
+    # Synchronous DAQ scans
+
+    @_ul_function
+    def cbDaqInScan(self, board_num, chan_list, chan_type_list, gain_list,
+                    chan_count, rate, pretrig_count, total_count, memhandle,
+                    options):
+        board = self.board(board_num)
+        frame_rate = _get_in(rate)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_TYPE)
+        funcs = []
+        channels = []
+        for i in range(chan_count):
+            chan = chan_list[i]
+            chan_type = ChannelType(chan_type_list[i] & 0xFF)
+            funcs.append(self._daq_channel(board, chan, chan_type,
+                                           gain_list[i], frame_rate))
+            channels.append(chan)
+        _set_out(pretrig_count, 0)
+        task = ScanTask(FunctionType.DAQIFUNCTION, address_of(memhandle),
+                        ctype, _get_in(total_count), channels, frame_rate,
+                        options, FunctionSource(funcs, ctype))
+        board.start_scan(task)
+
+    @staticmethod
+    def _daq_channel(board, chan, chan_type, gain, frame_rate):
+        if chan_type in (ChannelType.ANALOG, ChannelType.ANALOG_SE,
+                         ChannelType.ANALOG_DIFF):
+            ul_range = board.check_ai_range(gain)
+            board.check_ai_channel(chan)
+            resolution = min(board.ai_resolution, 16)
+
+            def analog(frame):
+                volts = board.ai_signal(chan, frame / frame_rate)
+                return volts_to_counts(volts, ul_range, resolution)
+            return analog
+        if chan_type in (ChannelType.DIGITAL8, ChannelType.DIGITAL16,
+                         ChannelType.DIGITAL):
+            port = board.port(chan)
+            return lambda frame: port.value
+        if chan_type in (ChannelType.CTR16, ChannelType.CTR32LOW,
+                         ChannelType.CTR32HIGH, ChannelType.CTR):
+            counter = board.counter(chan)
+            shift = 16 if chan_type == ChannelType.CTR32HIGH else 0
+            start = board.clock()
+            base = counter.value(start, board.counter_frequency)
+            ticks_per_frame = board.counter_frequency / max(frame_rate, 1)
+            return lambda frame: (
+                (base + int(frame * ticks_per_frame)) >> shift) & 0xFFFF
+        if chan_type == ChannelType.PADZERO:
+            return lambda frame: 0
+        raise SimError(ErrorCode.BADCHANTYPE)
+
+    @_ul_function
+    def cbDaqOutScan(self, board_num, chan_list, chan_type_list, gain_list,
+                     chan_count, rate, count, memhandle, options):
+        board = self.board(board_num)
+        ctype = self.memory.element_type(memhandle, WIN_BUF_TYPE)
+        task = ScanTask(FunctionType.DAQOFUNCTION, address_of(memhandle),
+                        ctype, count,
+                        [chan_list[i] for i in range(chan_count)],
+                        _get_in(rate), options)
+        board.start_scan(task)
+
+    # Background operations
+
+    @_ul_function
+    def cbGetIOStatus(self, board_num, status, cur_count, cur_index,
+                      function_type):
+        state, count, index, error = self.board(board_num).status(
+            function_type)
+        _set_out(status, int(state))
+        _set_out(cur_count, count)
+        _set_out(cur_index, index)
+        if error:
+            raise SimError(error)
+
+    @_ul_function
+    def cbStopIOBackground(self, board_num, function_type):
+        self.board(board_num).stop_scan(function_type)
+
+    @_ul_function
+    def cbEnableEvent(self, board_num, event_type, event_param, callback,
+                      user_data):
+        self.board(board_num).enable_event(event_type, event_param, callback,
+                                           address_of(user_data))
+
+    @_ul_function
+    def cbDisableEvent(self, board_num, event_type):
+        self.board(board_num).disable_event(event_type)
+
+    # Memory
+
+    def cbWinBufAlloc(self, num_points):
+        return self.memory.alloc(num_points, WIN_BUF_TYPE)
+
+    def cbWinBufAlloc32(self, num_points):
+        return self.memory.alloc(num_points, WIN_BUF_32_TYPE)
+
+    def cbWinBufAlloc64(self, num_points):
+        return self.memory.alloc(num_points, WIN_BUF_64_TYPE)
+
+    def cbScaledWinBufAlloc(self, num_points):
+        return self.memory.alloc(num_points, SCALED_WIN_BUF_TYPE)
+
+    @_ul_function
+    def cbWinBufFree(self, memhandle):
+        if not self.memory.free(memhandle):
+            raise SimError(ErrorCode.BADPOINTER)
+
+    def _buf_to_array(self, memhandle, data_array, first_point, count,
+                      ctype):
+        memhandle = address_of(memhandle)
+        if not memhandle:
+            raise SimError(ErrorCode.BADPOINTER)
+        copy_elements(address_of(data_array),
+                      memhandle + first_point * sizeof(ctype), ctype, count)
+
+    def _array_to_buf(self, data_array, memhandle, first_point, count,
+                      ctype):
+        memhandle = address_of(memhandle)
+        if not memhandle:
+            raise SimError(ErrorCode.BADPOINTER)
+        copy_elements(memhandle + first_point * sizeof(ctype),
+                      address_of(data_array), ctype, count)
+
+    @_ul_function
+    def cbWinBufToArray(self, memhandle, data_array, first_point, count):
+        self._buf_to_array(memhandle, data_array, first_point, count,
+                           WIN_BUF_TYPE)
+
+    @_ul_function
+    def cbWinBufToArray32(self, memhandle, data_array, first_point, count):
+        self._buf_to_array(memhandle, data_array, first_point, count,
+                           WIN_BUF_32_TYPE)
+
+    @_ul_function
+    def cbWinBufToArray64(self, memhandle, data_array, first_point, count):
+        self._buf_to_array(memhandle, data_array, first_point, count,
+                           WIN_BUF_64_TYPE)
+
+    @_ul_function
+    def cbScaledWinBufToArray(self, memhandle, data_array, first_point,
+                              count):
+        self._buf_to_array(memhandle, data_array, first_point, count,
+                           SCALED_WIN_BUF_TYPE)
+
+    @_ul_function
+    def cbWinArrayToBuf(self, data_array, memhandle, first_point, count):
+        self._array_to_buf(data_array, memhandle, first_point, count,
+                           WIN_BUF_TYPE)
+
+    @_ul_function
+    def cbWinArrayToBuf32(self, data_array, memhandle, first_point, count):
+        self._array_to_buf(data_array, memhandle, first_point, count,
+                           WIN_BUF_32_TYPE)
+
+    @_ul_function
+    def cbScaledWinArrayToBuf(self, data_array, memhandle, first_point,
+                              count):
+        self._array_to_buf(data_array, memhandle, first_point, count,
+                           SCALED_WIN_BUF_TYPE)
+
+
+def _counter_channel(base, ticks_per_frame, mask):
+    return lambda frame: (base + int(frame * ticks_per_frame)) & mask
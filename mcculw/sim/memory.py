@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Memory buffers handed out by the simulated cbWinBufAlloc functions, and helpers
+for resolving the raw addresses behind the arguments mcculw.ul passes in.
+"""
+from __future__ import absolute_import, division, print_function
+import threading
+from ctypes import (addressof, cast, c_void_p, c_ushort, c_uint32, c_uint64,
+                    c_double, sizeof, memmove, Array, Structure, _Pointer,
+                    _SimpleCData)
+from builtins import *  # @UnusedWildImport
+
+
+WIN_BUF_TYPE = c_ushort
+WIN_BUF_32_TYPE = c_uint32
+WIN_BUF_64_TYPE = c_uint64
+SCALED_WIN_BUF_TYPE = c_double
+
+
+def address_of(obj):
+    """Returns the address of the memory referenced by a memhandle, ctypes
+    object, ``byref()`` result or NumPy array.
+
+    Parameters
+    ----------
+    obj : int or ctypes object or numpy.ndarray
+        The object to resolve
+
+    Returns
+    -------
+    int
+        The address, or 0 for a NULL handle
+    """
+    if obj is None:
+        return 0
+    if isinstance(obj, int):
+        return obj
+    if isinstance(obj, c_void_p):
+        return obj.value or 0
+    if isinstance(obj, _Pointer):
+        return cast(obj, c_void_p).value or 0
+    if isinstance(obj, (Array, Structure, _SimpleCData)):
+        return addressof(obj)
+    referenced = getattr(obj, '_obj', None)
+    if referenced is not None:
+        # The result of byref()
+        return addressof(referenced)
+    array_interface = getattr(obj, '__array_interface__', None)
+    if array_interface is not None:
+        return array_interface['data'][0]
+    return int(obj)
+
+
+def referenced_object(obj):
+    """Returns the ctypes object behind a ``byref()`` result, or the object
+    itself."""
+    return getattr(obj, '_obj', obj)
+
+
+def copy_elements(dest_address, src_address, ctype, count):
+    if count > 0:
+        memmove(dest_address, src_address, count * sizeof(ctype))
+
+
+class MemoryManager(object):
+    """Allocates the buffers returned as memhandles by the simulated library.
+
+    A memhandle is the address of a zeroed ctypes array, so code that casts a
+    memhandle to a pointer (as the examples do) works against the simulator
+    just as it does against the UL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = {}
+
+    def alloc(self, num_points, ctype):
+        """Allocates a buffer and returns its memhandle, or 0 on failure."""
+        if num_points <= 0:
+            return 0
+        buffer_ = (ctype * num_points)()
+        memhandle = addressof(buffer_)
+        with self._lock:
+            self._buffers[memhandle] = buffer_
+        return memhandle
+
+    def free(self, memhandle):
+        """Frees a buffer. Returns False if the memhandle is unknown."""
+        with self._lock:
+            return self._buffers.pop(address_of(memhandle), None) is not None
+
+    def lookup(self, memhandle):
+        """Returns the ctypes array behind a memhandle, or None if the memory
+        was not allocated by this manager."""
+        with self._lock:
+            return self._buffers.get(address_of(memhandle))
+
+    def element_type(self, memhandle, default=None):
+        buffer_ = self.lookup(memhandle)
+        if buffer_ is None:
+            return default
+        return buffer_._type_
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffers)
@@ -0,0 +1,196 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Background and foreground scans driven by a virtual sample clock.
+
+A scan does not generate samples on a timer of its own. Whenever it is
+serviced, it works out how many samples the hardware would have transferred
+since the scan started at the requested rate, and moves that many samples
+between the sample source and the scan buffer in a few block copies.
+"""
+from __future__ import absolute_import, division, print_function
+from ctypes import addressof, sizeof, memmove
+from builtins import *  # @UnusedWildImport
+
+from mcculw.enums import ErrorCode, ScanOptions, Status
+
+
+class PeriodicSource(object):
+    """Produces samples by repeating a table of interleaved samples.
+
+    Parameters
+    ----------
+    table : ctypes array
+        One period of the signal, holding whole frames (one sample per
+        channel) of the scan's element type
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._address = addressof(table)
+        self._length = len(table)
+        self._element_size = sizeof(table._type_)
+
+    def fill(self, dest_address, dest_index, position, count):
+        """Copies the samples at scan positions [position, position + count)
+        to consecutive elements of the destination starting at
+        dest_index."""
+        size = self._element_size
+        while count > 0:
+            src_index = position % self._length
+            n = min(count, self._length - src_index)
+            memmove(dest_address + dest_index * size,
+                    self._address + src_index * size, n * size)
+            dest_index += n
+            position += n
+            count -= n
+
+
+class FunctionSource(object):
+    """Produces samples by calling a function per channel with the frame
+    number of each sample. Used for data that does not repeat, such as
+    counters.
+
+    Parameters
+    ----------
+    channel_funcs : list of callable
+        One function per channel in the scan, each taking the frame number and
+        returning the sample value
+    ctype : ctypes type
+        The element type of the scan buffer
+    """
+
+    def __init__(self, channel_funcs, ctype):
+        self._channel_funcs = list(channel_funcs)
+        self._ctype = ctype
+
+    def fill(self, dest_address, dest_index, position, count):
+        funcs = self._channel_funcs
+        num_chans = len(funcs)
+        values = [funcs[p % num_chans](p // num_chans)
+                  for p in range(position, position + count)]
+        dest = (self._ctype * count).from_address(
+            dest_address + dest_index * sizeof(self._ctype))
+        dest[:] = values
+
+
+class ScanTask(object):
+    """The state of a single scan on a simulated board.
+
+    Parameters
+    ----------
+    function_type : FunctionType
+        The function type the scan reports its status under
+    memhandle : int
+        The address of the scan buffer
+    ctype : ctypes type
+        The element type of the scan buffer
+    count : int
+        The total number of samples in the scan, which is also the size of the
+        buffer for CONTINUOUS scans
+    channels : list of int
+        The channel (or port, or counter) of each sample in a frame
+    rate : int
+        The number of frames per second
+    options : ScanOptions
+        The scan options
+    source : PeriodicSource or FunctionSource, optional
+        The source of the samples for input scans. Output scans have no
+        source; their buffer is only read.
+    """
+
+    def __init__(self, function_type, memhandle, ctype, count, channels, rate,
+                 options, source=None):
+        self.function_type = function_type
+        self.address = memhandle
+        self.ctype = ctype
+        self.count = count
+        self.channels = list(channels)
+        self.num_chans = len(self.channels)
+        self.rate = rate
+        self.options = ScanOptions(options)
+        self.source = source
+        self.continuous = bool(options & ScanOptions.CONTINUOUS)
+        self.background = bool(options & ScanOptions.BACKGROUND)
+        self.position = 0
+        self.status = Status.IDLE
+        self.error = ErrorCode.NOERRORS
+        self.start_time = None
+        self.last_event_count = 0
+
+    @property
+    def is_input(self):
+        return self.source is not None
+
+    @property
+    def is_running(self):
+        return self.status == Status.RUNNING
+
+    @property
+    def duration(self):
+        """The time in seconds that a finite scan takes to complete."""
+        return self.count / self.num_chans / self.rate
+
+    @property
+    def cur_index(self):
+        """The buffer index of the start of the last complete frame, or -1 if
+        no frame has been transferred."""
+        if self.position < self.num_chans:
+            return -1
+        last_frame_start = self.position - self.num_chans
+        if self.continuous:
+            last_frame_start %= self.count
+        return last_frame_start
+
+    def start(self, now):
+        self.start_time = now
+        self.status = Status.RUNNING
+
+    def stop(self, error=ErrorCode.NOERRORS):
+        self.status = Status.IDLE
+        if error:
+            self.error = error
+
+    def target_position(self, now):
+        """Returns the number of samples the hardware would have transferred
+        by the given time."""
+        frames = int((now - self.start_time) * self.rate)
+        target = frames * self.num_chans
+        if not self.continuous:
+            target = min(target, self.count)
+        return target
+
+    def transfer(self, target):
+        """Transfers samples up to the target position. Input scans copy from
+        the source into the buffer, wrapping at the end of the buffer. Returns
+        the number of samples transferred."""
+        new_samples = target - self.position
+        if new_samples <= 0:
+            return 0
+        if self.is_input:
+            start = self.position
+            if new_samples > self.count:
+                # Only the newest buffer-full survives the wrap
+                start = target - self.count
+            self._fill(start, target - start)
+        self.position = target
+        if not self.continuous and self.position >= self.count:
+            self.status = Status.IDLE
+        return new_samples
+
+    def _fill(self, position, count):
+        while count > 0:
+            index = position % self.count
+            n = min(count, self.count - index)
+            self.source.fill(self.address, index, position, n)
+            position += n
+            count -= n
+
+    def last_frame(self):
+        """Returns the samples of the last frame transferred, or None."""
+        index = self.cur_index
+        if index < 0:
+            return None
+        frame = (self.ctype * self.num_chans).from_address(
+            self.address + index * sizeof(self.ctype))
+        return list(frame)
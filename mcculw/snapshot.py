@@ -0,0 +1,199 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Reads a set of A/D channels with a single scan instead of one
+:func:`mcculw.ul.v_in` call per channel.
+
+The channel/gain pairs are loaded into the board's channel/gain queue with
+:func:`mcculw.ul.a_load_queue` and each snapshot is a short foreground
+:func:`mcculw.ul.a_in_scan` of that queue, so reading N channels costs one
+round trip to the device rather than N. The queue is only reloaded when a
+different set of channels is read from the same board.
+
+By default the board scales the data (SCALEDATA). For boards that do not
+support it, pass options without SCALEDATA: the scan then returns counts,
+which are converted to engineering units with
+:func:`mcculw.conversion.counts_to_volts` at the A/D resolution of the
+board. Either way, snapshots are in engineering units.
+
+Requires NumPy, and a board with a channel/gain queue.
+"""
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+from mcculw import ul
+from mcculw.buffer import ScanBuffer
+from mcculw.conversion import counts_to_volts
+from mcculw.enums import BoardInfo, InfoType, ScanOptions
+
+DEFAULT_RATE = 1000
+
+# The queue most recently loaded by this module, by board number
+_loaded_queues = {}
+
+# Snapshot objects created by snapshot(), by (board_num, channels, rate,
+# samples, options)
+_snapshots = {}
+
+# A snapshot is a single foreground scan
+_UNSUPPORTED_OPTIONS = ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS
+
+
+class Snapshot(object):
+    """Reads the same list of A/D channels repeatedly, each read being a
+    single foreground scan of the board's channel/gain queue. The scan
+    buffer is allocated once and reused.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channels : list of (int, ULRange)
+        The channel and A/D range of each value in the snapshot, in order.
+    rate : int, optional
+        The per-channel sample rate of the scan, in Hz.
+    samples : int, optional
+        The number of samples taken from each channel. When greater than 1
+        the samples are averaged.
+    options : ScanOptions, optional
+        The options of the scan. Without SCALEDATA, the counts scanned are
+        converted to engineering units here. BACKGROUND and CONTINUOUS are
+        not supported.
+    """
+
+    def __init__(self, board_num, channels, rate=DEFAULT_RATE, samples=1,
+                 options=ScanOptions.SCALEDATA):
+        self._buffer = None
+        if not channels:
+            raise ValueError('channels must not be empty')
+        if samples < 1:
+            raise ValueError('samples must be at least 1')
+        if options & _UNSUPPORTED_OPTIONS:
+            raise ValueError('a snapshot is a foreground scan: BACKGROUND '
+                             'and CONTINUOUS are not supported')
+        self.board_num = board_num
+        self.channels = tuple((int(chan), ul_range)
+                              for chan, ul_range in channels)
+        self.rate = rate
+        self.samples = samples
+        self._chan_list = [chan for chan, _ in self.channels]
+        self._gain_list = [ul_range for _, ul_range in self.channels]
+        self._queue = tuple((chan, int(ul_range))
+                            for chan, ul_range in self.channels)
+        self.options = options
+        self._scaled = bool(options & ScanOptions.SCALEDATA)
+        self._resolution = 16
+        if not self._scaled:
+            self._resolution = ul.get_config(InfoType.BOARDINFO, board_num, 0,
+                                             BoardInfo.ADRES)
+        self._buffer = ScanBuffer(samples, len(self.channels),
+                                  self._resolution, options)
+
+    def _load_queue(self):
+        if _loaded_queues.get(self.board_num) != self._queue:
+            # Forget the queue first, so a failed load is retried
+            _loaded_queues.pop(self.board_num, None)
+            ul.a_load_queue(self.board_num, self._chan_list,
+                            self._gain_list, len(self._chan_list))
+            _loaded_queues[self.board_num] = self._queue
+
+    def read(self):
+        """Scans the channels once.
+
+        Returns
+        -------
+        numpy.ndarray
+            The value of each channel in engineering units, in the order
+            the channels were given.
+        """
+        if self._buffer is None:
+            raise ValueError('read from a closed Snapshot')
+        self._load_queue()
+        buf = self._buffer
+        ul.a_in_scan(self.board_num, min(self._chan_list),
+                     max(self._chan_list), buf.count, self.rate,
+                     self._gain_list[0], buf.memhandle, self.options)
+        if self.samples == 1:
+            values = buf.array[0].copy()
+        else:
+            values = buf.array.mean(axis=0)
+        if self._scaled:
+            return values
+        volts = numpy.empty(len(self.channels))
+        for i, (_, ul_range) in enumerate(self.channels):
+            volts[i] = counts_to_volts(values[i], ul_range, self._resolution)
+        return volts
+
+    def close(self):
+        """Frees the scan buffer. The channel/gain queue is left loaded;
+        see :func:`release_queue`."""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def snapshot(board_num, channels, rate=DEFAULT_RATE, samples=1,
+             options=ScanOptions.SCALEDATA):
+    """Reads a list of A/D channels with a single foreground scan.
+
+    The :class:`Snapshot` used for each distinct set of arguments is kept
+    and reused by later calls. Use :func:`release_queue` to free them.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    channels : list of (int, ULRange)
+        The channel and A/D range of each value in the snapshot, in order.
+    rate : int, optional
+        The per-channel sample rate of the scan, in Hz.
+    samples : int, optional
+        The number of samples taken from each channel. When greater than 1
+        the samples are averaged.
+    options : ScanOptions, optional
+        See :class:`Snapshot`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The value of each channel in engineering units, in the order the
+        channels were given.
+    """
+    key = (board_num, tuple((int(chan), int(ul_range))
+                            for chan, ul_range in channels), rate, samples,
+           int(options))
+    reader = _snapshots.get(key)
+    if reader is None:
+        reader = _snapshots[key] = Snapshot(board_num, channels, rate,
+                                            samples, options)
+    return reader.read()
+
+
+def release_queue(board_num):
+    """Disables the channel/gain queue of the board and frees the buffers of
+    the snapshots cached for it by :func:`snapshot`.
+
+    Call this before using the board with functions that expect the queue
+    to be disabled, or if the queue was loaded with
+    :func:`mcculw.ul.a_load_queue` since the last snapshot.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    """
+    for key in [key for key in _snapshots if key[0] == board_num]:
+        _snapshots.pop(key).close()
+    _loaded_queues.pop(board_num, None)
+    ul.a_load_queue(board_num, [], [], 0)
@@ -0,0 +1,312 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Continuous analog input as an iterator of fixed-size NumPy chunks.
+
+:class:`AnalogInputStream` runs a BACKGROUND | CONTINUOUS
+:func:`mcculw.ul.a_in_scan` into a circular :class:`mcculw.buffer.ScanBuffer`
+and hands out the samples in order, taking care of the buffer wrapping
+around and detecting when the scan has overwritten data that had not been
+read yet.
+
+By default the stream polls :func:`mcculw.ul.get_status` at an interval
+adapted to the time left until the next chunk. With use_events=True it
+instead sleeps on ON_DATA_AVAILABLE, ON_SCAN_ERROR and ON_END_OF_INPUT_SCAN
+events, waking up as soon as the UL reports data, an error or the end of
+the scan, and checks the status only when a chunk is due and no event has
+reported it yet.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import collections
+import threading
+import time
+from ctypes import c_int
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+from mcculw import ul
+from mcculw.buffer import SampleCounter, ScanBuffer
+from mcculw.enums import (ErrorCode, EventType, FunctionType, ScanOptions,
+                          Status)
+from mcculw.ul import ULError
+
+# Bounds of the time waited between two get_status calls while waiting for
+# a chunk, in seconds
+_MIN_POLL_INTERVAL = 0.0005
+_MAX_POLL_INTERVAL = 0.05
+
+# The longest time waited for an event before checking get_status, in
+# seconds
+_EVENT_TIMEOUT = 0.5
+
+_STREAM_EVENTS = (EventType.ON_DATA_AVAILABLE | EventType.ON_SCAN_ERROR
+                  | EventType.ON_END_OF_INPUT_SCAN)
+
+# The callbacks of the streams with events enabled, by board number. The UL
+# calls them from its own thread, so they must not be garbage collected
+# before the events are disabled.
+_event_callbacks = {}
+
+
+class AnalogInputStream(object):
+    """Reads a continuous A/D scan in chunks of chunk_points samples per
+    channel.
+
+    The scan starts when the stream is entered as a context manager, or by
+    :meth:`start`, and is stopped by leaving the context or by
+    :meth:`close`. Iterating the stream yields (chunk_points, channels)
+    arrays until the scan stops.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    low_chan : int
+        The first A/D channel of the scan.
+    high_chan : int
+        The last A/D channel of the scan.
+    rate : int
+        The sample rate per channel, in Hz.
+    ul_range : ULRange
+        The A/D range code.
+    chunk_points : int
+        The number of samples per channel in each chunk.
+    buffer_chunks : int, optional
+        The size of the circular buffer, in chunks. The larger it is, the
+        longer the reader may fall behind before the scan overruns it.
+    options : ScanOptions, optional
+        Additional scan options. BACKGROUND and CONTINUOUS are always set.
+    use_events : bool, optional
+        If True, the stream waits for UL events rather than polling. The
+        board must support ON_DATA_AVAILABLE, and no other handler may be
+        enabled for the same events while the scan runs.
+
+    Attributes
+    ----------
+    rate : int
+        The actual sample rate per channel, once the scan has started
+    channels : int
+        The number of channels in the scan
+    """
+
+    def __init__(self, board_num, low_chan, high_chan, rate, ul_range,
+                 chunk_points, buffer_chunks=8, options=0,
+                 use_events=False):
+        if high_chan < low_chan:
+            raise ValueError('high_chan must not be less than low_chan')
+        if chunk_points < 1 or buffer_chunks < 2:
+            raise ValueError('chunk_points must be at least 1 and '
+                             'buffer_chunks at least 2')
+        self.board_num = board_num
+        self.low_chan = low_chan
+        self.high_chan = high_chan
+        self.rate = rate
+        self.ul_range = ul_range
+        self.channels = high_chan - low_chan + 1
+        self.chunk_points = chunk_points
+        self.options = (options | ScanOptions.BACKGROUND
+                        | ScanOptions.CONTINUOUS)
+
+        self._buffer = ScanBuffer.for_board(
+            board_num, chunk_points * buffer_chunks, self.channels,
+            self.options)
+        self._chunk_count = chunk_points * self.channels
+        self._consumed = 0
+        # The number of samples the scan has transferred, from the counts of
+        # get_status and the events, which roll over
+        self._counter = SampleCounter()
+        self._running = False
+
+        self.use_events = use_events
+        # Filled by the event callback, drained by the reading thread
+        self._notifications = collections.deque()
+        self._wakeup = threading.Event()
+        self._event_error = ErrorCode.NOERRORS
+        self._ended = False
+        self._callback = None
+        self._user_data = None
+
+    @property
+    def buffer(self):  # -> ScanBuffer
+        """The circular buffer the scan writes to."""
+        return self._buffer
+
+    @property
+    def samples_read(self):  # -> int
+        """The number of samples, over all channels, read from the stream."""
+        return self._consumed
+
+    def start(self):
+        """Starts the scan."""
+        if self._running:
+            return
+        self._consumed = 0
+        self._counter.reset()
+        if self.use_events:
+            self._enable_events()
+        try:
+            self.rate = ul.a_in_scan(
+                self.board_num, self.low_chan, self.high_chan,
+                self._buffer.count, self.rate, self.ul_range,
+                self._buffer.memhandle, self.options)
+        except ULError:
+            self._disable_events()
+            raise
+        self._running = True
+
+    def stop(self):
+        """Stops the scan. Chunks that were already read remain valid."""
+        if self._running:
+            self._running = False
+            try:
+                ul.stop_background(self.board_num, FunctionType.AIFUNCTION)
+            finally:
+                self._disable_events()
+
+    def _enable_events(self):
+        if self.board_num in _event_callbacks:
+            raise ULError(ErrorCode.ALREADYENABLED)
+        self._notifications.clear()
+        self._event_error = ErrorCode.NOERRORS
+        self._ended = False
+        callback = ul.ULEventCallback(self._handle_event)
+        # The callback ignores its user data, but the UL needs a pointer
+        self._user_data = c_int()
+        ul.enable_event(self.board_num, _STREAM_EVENTS, self._chunk_count,
+                        callback, self._user_data)
+        self._callback = _event_callbacks[self.board_num] = callback
+
+    def _disable_events(self):
+        if self._callback is not None:
+            try:
+                ul.disable_event(self.board_num, _STREAM_EVENTS)
+            finally:
+                self._callback = None
+                del _event_callbacks[self.board_num]
+
+    def _handle_event(self, board_num, event_type, event_data, c_user_data):
+        # Runs on the UL's event thread: only hand the event over
+        self._notifications.append((event_type, event_data))
+        self._wakeup.set()
+
+    def close(self):
+        """Stops the scan and frees the buffer."""
+        try:
+            self.stop()
+        finally:
+            self._buffer.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            chunk = self.read()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _status(self):
+        status, cur_count, _ = ul.get_status(self.board_num,
+                                             FunctionType.AIFUNCTION)
+        return status, self._counter.update(cur_count)
+
+    def _wait_for(self, count):
+        # Waits until the scan has transferred count samples. Returns the
+        # number transferred, which is less than count if the scan stopped.
+        if self.use_events:
+            return self._wait_for_events(count)
+        sample_rate = self.rate * self.channels
+        while True:
+            status, cur_count = self._status()
+            if cur_count >= count or status != Status.RUNNING:
+                return cur_count
+            interval = (count - cur_count) / sample_rate
+            time.sleep(min(max(interval, _MIN_POLL_INTERVAL),
+                           _MAX_POLL_INTERVAL))
+
+    def _wait_for_events(self, count):
+        sample_rate = self.rate * self.channels
+        while True:
+            self._wakeup.clear()
+            while self._notifications:
+                event_type, event_data = self._notifications.popleft()
+                if event_type == EventType.ON_SCAN_ERROR:
+                    self._event_error = event_data
+                else:
+                    if event_type == EventType.ON_END_OF_INPUT_SCAN:
+                        self._ended = True
+                    self._counter.update(event_data)
+            if self._event_error:
+                self.stop()
+                raise ULError(self._event_error)
+            if self._counter.total >= count or self._ended:
+                return self._counter.total
+            # ON_DATA_AVAILABLE fires once at least a chunk has been acquired
+            # since the previous event, so events drift later than chunk
+            # boundaries. Wake up when the chunk is due at the scan rate, and
+            # check the status then.
+            timeout = (count - self._counter.total) / sample_rate
+            timeout = min(max(timeout, _MIN_POLL_INTERVAL), _EVENT_TIMEOUT)
+            if not self._wakeup.wait(timeout):
+                status, _ = self._status()
+                self._ended = status != Status.RUNNING
+
+    def _check_overrun(self, cur_count):
+        # The samples from self._consumed on are intact only while the scan
+        # has not wrapped around the buffer past them
+        if cur_count - self._consumed > self._buffer.count:
+            self.stop()
+            raise ULError(ErrorCode.OVERRUN)
+
+    def read(self, out=None):
+        """Returns the next chunk, waiting for the scan to acquire it.
+
+        Parameters
+        ----------
+        out : numpy.ndarray, optional
+            A (chunk_points, channels) array of the buffer's dtype that
+            receives the chunk. A new array is returned if it is not given.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            The chunk, or None if the scan has stopped before acquiring it.
+
+        Raises
+        ------
+        ULError
+            With error code OVERRUN if the scan overwrote samples before
+            they were read. The scan is stopped.
+        """
+        if not self._running:
+            return None
+        end = self._consumed + self._chunk_count
+        cur_count = self._wait_for(end)
+        if cur_count < end:
+            self.stop()
+            return None
+        self._check_overrun(cur_count)
+
+        if out is None:
+            out = numpy.empty((self.chunk_points, self.channels),
+                              self._buffer.dtype)
+        elif (out.shape != (self.chunk_points, self.channels)
+              or not out.flags.c_contiguous):
+            raise ValueError('out must be a contiguous array of shape '
+                             '(chunk_points, channels)')
+        self._buffer.copy(self._consumed, self._chunk_count, out.reshape(-1))
+
+        # The scan kept writing during the copy; the chunk is valid only if
+        # none of it was overwritten in the meantime
+        self._check_overrun(self._status()[1])
+        self._consumed = end
+        return out
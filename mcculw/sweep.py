@@ -0,0 +1,262 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Frequency sweeps: drive an analog output with a sine at each frequency of a
+list and acquire the response on the analog inputs.
+
+:class:`FrequencySweep` replaces the loop of the qSweep examples. The output
+and input buffers are allocated once. The drive frequency is set through the
+scan rate, so the output waveform, a whole number of cycles, is written once
+and rewritten in place only when the amplitude changes. Each step's input
+scan is armed before the previous step's data is handed to the caller, so
+the analysis of one step overlaps the acquisition of the next.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import collections
+import time
+from builtins import *  # @UnusedWildImport
+
+from mcculw import ul
+from mcculw.buffer import ScanBuffer
+from mcculw.enums import (BoardInfo, ErrorCode, FunctionType, InfoType,
+                          ScanOptions, Status)
+from mcculw.ul import ULError
+from mcculw.waveform import write_waveform
+
+DigitalTrigger = collections.namedtuple(
+    'DigitalTrigger',
+    'port_type bit_num trig_type low_threshold high_threshold')
+
+SweepStep = collections.namedtuple('SweepStep', 'index frequency rate data')
+
+# The longest time slept between two get_status calls while a step runs, in
+# seconds
+_POLL_INTERVAL = 0.001
+
+
+class FrequencySweep(object):
+    """Steps a sine output through a list of frequencies and acquires the
+    input at each of them.
+
+    At each step the output and input scans run at rate =
+    frequency * points_per_cycle, for cycles cycles of the sine. Iterating
+    the sweep runs it and yields a SweepStep tuple per frequency, of index,
+    frequency (as requested), rate (the actual input scan rate) and data (a
+    (points, channels) array of input counts). The data is a view of one of
+    two input buffers, which the step after next reuses: use it, or copy
+    it, before requesting the next step.
+
+    Parameters
+    ----------
+    board_num : int
+        The number associated with the board when it was installed with
+        InstaCal or created with :func:`.create_daq_device`.
+    frequencies : list of float
+        The drive frequencies, in Hz.
+    ao_range : ULRange
+        The D/A range code.
+    ai_range : ULRange
+        The A/D range code.
+    ao_channel : int, optional
+        The D/A channel driven.
+    ai_low_chan : int, optional
+        The first A/D channel acquired.
+    ai_high_chan : int, optional
+        The last A/D channel acquired. By default, only ai_low_chan.
+    amplitude : float or list of float, optional
+        The amplitude of the sine, in volts, or one amplitude per frequency.
+    offset : float, optional
+        The offset of the sine, in volts.
+    cycles : int, optional
+        The number of cycles output and acquired at each step.
+    points_per_cycle : int, optional
+        The number of samples per cycle.
+    trigger : DigitalTrigger or tuple, optional
+        If given, the scans are started with EXTTRIGGER after
+        :func:`.set_trigger` is called with the trig_type, low_threshold and
+        high_threshold, and the bit bit_num of port port_type, which must be
+        wired to the trigger input and configured for output, is driven low
+        before and high after arming each step.
+    timeout : float, optional
+        The time, in seconds, a step may take beyond its expected duration
+        before the sweep fails with INPUTTIMEOUT. By default, it waits
+        forever.
+
+    Attributes
+    ----------
+    elapsed : float
+        The wall-clock time the last run of the sweep took, in seconds
+    """
+
+    def __init__(self, board_num, frequencies, ao_range, ai_range,
+                 ao_channel=0, ai_low_chan=0, ai_high_chan=None,
+                 amplitude=1.0, offset=0.0, cycles=5, points_per_cycle=10,
+                 trigger=None, timeout=None):
+        if ai_high_chan is None:
+            ai_high_chan = ai_low_chan
+        if cycles < 1 or points_per_cycle < 2:
+            raise ValueError('cycles must be at least 1 and points_per_cycle '
+                             'at least 2')
+        self.board_num = board_num
+        self.frequencies = list(frequencies)
+        for frequency in self.frequencies:
+            # The scan rate must be at least 1 Hz
+            if frequency * points_per_cycle < 1:
+                raise ValueError('frequency {} is too low for {} points per '
+                                 'cycle'.format(frequency, points_per_cycle))
+        if isinstance(amplitude, (int, float)):
+            amplitude = [amplitude] * len(self.frequencies)
+        self.amplitudes = list(amplitude)
+        if len(self.amplitudes) != len(self.frequencies):
+            raise ValueError('amplitude must be a number or have one value '
+                             'per frequency')
+        self.ao_range = ao_range
+        self.ai_range = ai_range
+        self.ao_channel = ao_channel
+        self.ai_low_chan = ai_low_chan
+        self.ai_high_chan = ai_high_chan
+        self.offset = offset
+        self.cycles = cycles
+        self.points_per_cycle = points_per_cycle
+        self.points = cycles * points_per_cycle
+        self.trigger = None if trigger is None else DigitalTrigger(*trigger)
+        self.timeout = timeout
+        self.options = ScanOptions.BACKGROUND
+        if self.trigger is not None:
+            self.options |= ScanOptions.EXTTRIGGER
+        self.elapsed = None
+        # Python 2 has no perf_counter
+        self._clock = getattr(time, 'perf_counter', time.time)
+
+        self._ao_resolution = ul.get_config(
+            InfoType.BOARDINFO, board_num, 0, BoardInfo.DACRES)
+        self._ao_buffer = ScanBuffer(self.points, 1, self._ao_resolution)
+        self._ai_buffers = []
+        try:
+            for _ in range(2):
+                self._ai_buffers.append(ScanBuffer.for_board(
+                    board_num, self.points, ai_high_chan - ai_low_chan + 1))
+        except Exception:
+            self.close()
+            raise
+        self._written_amplitude = None
+        self._running = False
+
+    def _write_waveform(self, amplitude):
+        write_waveform(self._ao_buffer, 'sine', self.points, self.cycles,
+                       amplitude, self.ao_range, self._ao_resolution,
+                       self.offset)
+        self._written_amplitude = amplitude
+
+    def _arm(self, index):
+        # Starts the scans of a step
+        frequency = self.frequencies[index]
+        amplitude = self.amplitudes[index]
+        if amplitude != self._written_amplitude:
+            self._write_waveform(amplitude)
+        rate = int(round(frequency * self.points_per_cycle))
+        ai_buffer = self._ai_buffers[index % 2]
+        if self.trigger is not None:
+            ul.d_bit_out(self.board_num, self.trigger.port_type,
+                         self.trigger.bit_num, 0)
+        self._running = True
+        rate = ul.a_in_scan(
+            self.board_num, self.ai_low_chan, self.ai_high_chan,
+            ai_buffer.count, rate, self.ai_range, ai_buffer.memhandle,
+            self.options)
+        ul.a_out_scan(
+            self.board_num, self.ao_channel, self.ao_channel,
+            self._ao_buffer.count, rate, self.ao_range,
+            self._ao_buffer.memhandle, self.options)
+        if self.trigger is not None:
+            ul.d_bit_out(self.board_num, self.trigger.port_type,
+                         self.trigger.bit_num, 1)
+        return SweepStep(index, frequency, rate, ai_buffer.array)
+
+    def _wait(self, step):
+        # Waits for both scans of the step to complete, sleeping through
+        # most of its expected duration rather than polling
+        duration = self.points / step.rate
+        deadline = None
+        if self.timeout is not None:
+            deadline = self._clock() + duration + self.timeout
+        time.sleep(duration)
+        while True:
+            in_status, in_count, _ = ul.get_status(
+                self.board_num, FunctionType.AIFUNCTION)
+            out_status, _, _ = ul.get_status(
+                self.board_num, FunctionType.AOFUNCTION)
+            if in_status == Status.IDLE and out_status == Status.IDLE:
+                break
+            if deadline is not None and self._clock() > deadline:
+                raise ULError(ErrorCode.INPUTTIMEOUT)
+            time.sleep(_POLL_INTERVAL)
+        self._running = False
+        if in_count < step.data.size:
+            # The scan was stopped before it completed
+            raise ULError(ErrorCode.INPUTTIMEOUT)
+
+    def _stop(self):
+        if self._running:
+            self._running = False
+            for function_type in (FunctionType.AIFUNCTION,
+                                  FunctionType.AOFUNCTION):
+                try:
+                    ul.stop_background(self.board_num, function_type)
+                except ULError:
+                    pass
+
+    def __iter__(self):
+        if self.trigger is not None:
+            ul.set_trigger(self.board_num, self.trigger.trig_type,
+                           self.trigger.low_threshold,
+                           self.trigger.high_threshold)
+        start = self._clock()
+        previous = None
+        try:
+            for index in range(len(self.frequencies)):
+                step = self._arm(index)
+                if previous is not None:
+                    # Analyzed by the caller while this step runs
+                    yield previous
+                self._wait(step)
+                previous = step
+            if previous is not None:
+                yield previous
+        finally:
+            self._stop()
+            self.elapsed = self._clock() - start
+
+    def run(self, analyze=None):
+        """Runs the sweep and returns the result of each step.
+
+        Parameters
+        ----------
+        analyze : callable, optional
+            Called with each SweepStep while the next step is acquired. Its
+            return value is the result of the step. By default, the result
+            is a copy of the step's data.
+
+        Returns
+        -------
+        list
+            The results, in the order of frequencies
+        """
+        if analyze is None:
+            return [step.data.copy() for step in self]
+        return [analyze(step) for step in self]
+
+    def close(self):
+        """Stops a step in progress and frees the buffers."""
+        self._stop()
+        self._ao_buffer.close()
+        for ai_buffer in self._ai_buffers:
+            ai_buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -5,12 +5,13 @@ Wraps all of the methods from UL for use in Python.
 """
 from __future__ import absolute_import, division, print_function
 import collections
+import os
 import struct
 from ctypes import *  # @UnusedWildImport
 from ctypes.wintypes import HGLOBAL
-from ctypes.util import find_library
 from builtins import *  # @UnusedWildImport
 
+from mcculw import backend, instrumentation
 from mcculw.enums import (ErrorCode, Status, ChannelType, TimerIdleState,
                           PulseOutOptions, TInOptions)
 from mcculw.structs import DaqDeviceDescriptor
@@ -20,7 +21,19 @@ class ULError(Exception):
     def __init__(self, errorcode):
         super(ULError, self).__init__()
         self.errorcode = errorcode
-        self.message = get_err_msg(errorcode)
+        self._message = None
+
+    @property
+    def message(self):
+        # Resolved on first use, so raising and catching a ULError never
+        # calls into the UL
+        if self._message is None:
+            self._message = get_err_msg(self.errorcode)
+        return self._message
+
+    @message.setter
+    def message(self, value):
+        self._message = value
 
     def __str__(self):
         return "Error " + str(self.errorcode) + ": " + self.message
@@ -29,13 +42,17 @@ class ULError(Exception):
 _ERRSTRLEN = 256
 _BOARDNAMELEN = 64
 
-# Load the correct library based on the Python architecture in use
+# Error messages by error code, filled in as messages are looked up or by
+# preload_err_msgs()
+_err_msgs = {}
+
+# The library matching the Python architecture in use is loaded, and each
+# function bound, the first time it is called. See mcculw.backend for
+# selecting a different backend.
 is_32bit = struct.calcsize("P") == 4
-dll_file_name = 'cbw32.dll' if is_32bit else 'cbw64.dll'
-dll_absolute_path = find_library(dll_file_name)
-if dll_absolute_path is None:
-    dll_absolute_path = dll_file_name
-_cbw = WinDLL(dll_absolute_path)
+dll_file_name = backend.default_library_name()
+_cbw = backend.cbw
+_call_recorder = instrumentation.CallRecorder()
 
 _cbw.cbAChanInputMode.argtypes = [c_int, c_int, c_int]
 
@@ -3144,7 +3161,12 @@ def d_out_scan(board_num, port_type, count, rate, memhandle, options):
     return rate_internal.value
 
 
-ULEventCallback = WINFUNCTYPE(None, c_int, c_uint, c_uint, c_void_p)
+try:
+    ULEventCallback = WINFUNCTYPE(None, c_int, c_uint, c_uint, c_void_p)
+except NameError:
+    # WINFUNCTYPE only exists on Windows; stand-in backends on other
+    # platforms use the C calling convention.
+    ULEventCallback = CFUNCTYPE(None, c_int, c_uint, c_uint, c_void_p)
 
 _cbw.cbEnableEvent.argtypes = [
     c_int, c_uint, c_uint, ULEventCallback, c_void_p]
@@ -4024,6 +4046,9 @@ def get_err_msg(error_code):
     message property. Some functions do return an error code in cases where it is used as a
     warning. Call this function to convert the returned error code to a descriptive error message.
 
+    Messages are retrieved from the UL once per error code and remembered; see
+    :func:`.preload_err_msgs`.
+
     Parameters
     ----------
     error_code
@@ -4034,9 +4059,37 @@ def get_err_msg(error_code):
     string
         The error message associated with the given error_code
     """
-    msg = create_string_buffer(_ERRSTRLEN)
-    _check_err(_cbw.cbGetErrMsg(error_code, msg))
-    return msg.value.decode('utf-8')
+    key = int(error_code)
+    message = _err_msgs.get(key)
+    if message is None:
+        msg = create_string_buffer(_ERRSTRLEN)
+        _check_err(_cbw.cbGetErrMsg(error_code, msg))
+        message = _err_msgs[key] = msg.value.decode('utf-8')
+    return message
+
+
+def preload_err_msgs(table=None):
+    """Fills the error message table used by :func:`.get_err_msg` and
+    :class:`.ULError`, so that later lookups never call into the UL.
+
+    Parameters
+    ----------
+    table : dict, optional
+        Maps error codes to messages, for example the result of an earlier
+        call saved by the application. If omitted, the message for every
+        :class:`~mcculw.enums.ErrorCode` is retrieved from the UL now.
+
+    Returns
+    -------
+    dict
+        The complete table of error codes to messages
+    """
+    if table is None:
+        for error_code in ErrorCode:
+            get_err_msg(error_code)
+    else:
+        _err_msgs.update((int(code), msg) for code, msg in table.items())
+    return dict(_err_msgs)
 
 
 StatusResult = collections.namedtuple(
@@ -6119,6 +6172,51 @@ def save_config(config_file_name):
     _check_err(_cbw.cbSaveConfig(config_file_name.encode('utf-8')))
 
 
+def enable_instrumentation():
+    """Starts recording the count and latency of every call this module makes
+    into the UL, per UL function and per board number. Read the results with
+    :func:`.stats`. Instrumentation can also be enabled at import by setting
+    the MCCULW_INSTRUMENT environment variable to 1.
+    """
+    _cbw.set_wrapper(_call_recorder.wrap)
+
+
+def disable_instrumentation():
+    """Stops recording call statistics. Calls into the UL are made directly
+    again, without any instrumentation overhead. Statistics recorded so far
+    are kept until :func:`.reset_stats` is called.
+    """
+    _cbw.set_wrapper(None)
+
+
+def stats(reset=False):
+    """Returns the call statistics recorded since instrumentation was enabled
+    or the statistics were last reset.
+
+    Parameters
+    ----------
+    reset : bool, optional
+        If True, the statistics are cleared after they are read.
+
+    Returns
+    -------
+    dict
+        Maps the name of each UL function called (for example 'cbAIn' or
+        'cbGetIOStatus') to a dict that maps board numbers to a
+        :class:`~mcculw.instrumentation.CallStats` tuple with the fields count,
+        total_time, min_time, max_time and histogram. Times are in seconds.
+        The histogram holds call counts for the latency buckets bounded by
+        :data:`~mcculw.instrumentation.HISTOGRAM_BOUNDS`. Functions that do not
+        take a board number are recorded under the board number None.
+    """
+    return _call_recorder.snapshot(reset)
+
+
+def reset_stats():
+    """Clears the call statistics recorded so far."""
+    _call_recorder.reset()
+
+
 def _to_ctypes_array(list_, datatype):
     return (datatype * len(list_))(*list_)
 
@@ -6126,3 +6224,7 @@ def _to_ctypes_array(list_, datatype):
 def _check_err(errcode):
     if errcode:
         raise ULError(errcode)
+
+
+if os.environ.get(instrumentation.INSTRUMENT_ENV_VAR, '0') not in ('', '0'):
+    enable_instrumentation()
@@ -0,0 +1,225 @@
+# -*- coding: UTF-8 -*-
+
+"""
+Output waveforms for :func:`mcculw.ul.a_out_scan` and
+:func:`mcculw.ul.daq_out_scan`, encoded as D/A counts.
+
+A waveform is a whole number of cycles of a shape spread over a number of
+points, sampled at phases 2 * pi * cycles * n / points for n below points,
+so the last point is not a repeat of the first and the buffer loops
+seamlessly in a CONTINUOUS scan. :func:`waveform_counts` keeps the counts
+of the waveforms built most recently, so that a sweep or test returning to
+the same waveform copies it from memory instead of computing it again, and
+:func:`write_waveform` copies them straight into an output buffer.
+
+The shapes span -1 to 1 before they are scaled by the amplitude and shifted
+by the offset:
+
+- 'sine' starts at 0, rising.
+- 'square' is 1 for the first half of each cycle and -1 for the second.
+- 'triangle' starts at 0, rising, and peaks a quarter of the way through
+  each cycle.
+- 'chirp' is a sine whose frequency rises, or falls, linearly across the
+  buffer; its cycles are given as a (start, end) pair.
+- 'arbitrary' repeats a table of one cycle, interpolated linearly.
+
+Requires NumPy.
+"""
+from __future__ import absolute_import, division, print_function
+import collections
+import hashlib
+import threading
+from builtins import *  # @UnusedWildImport
+
+import numpy
+
+from mcculw.conversion import count_array, volts_to_counts
+
+SHAPES = ('sine', 'square', 'triangle', 'chirp', 'arbitrary')
+
+# The number of waveforms waveform_counts keeps. It may be changed; the
+# least recently used waveforms are dropped on the next miss.
+CACHE_SIZE = 32
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses size')
+
+# Counts by key, least recently used first
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _check_cycles(shape, cycles):
+    # Returns cycles as a key value, checking that it loops seamlessly
+    if shape == 'chirp':
+        start, end = cycles
+        total = (start + end) / 2
+    else:
+        total = cycles
+    if total < 1 or total != int(total):
+        raise ValueError('the waveform must hold a whole number of cycles, '
+                         'at least 1, to repeat seamlessly')
+    if shape == 'chirp':
+        return float(start), float(end)
+    return int(cycles)
+
+
+def waveform_volts(shape, points, cycles, amplitude=1.0, offset=0.0,
+                   table=None):
+    """Builds a waveform in volts.
+
+    Parameters
+    ----------
+    shape : str
+        One of SHAPES.
+    points : int
+        The number of points in the waveform.
+    cycles : int or (float, float)
+        The number of cycles in the waveform. For 'chirp', the frequencies,
+        in cycles per waveform length, at its start and end, whose mean must
+        be a whole number.
+    amplitude : float, optional
+        The peak amplitude, in volts.
+    offset : float, optional
+        The value the waveform is centered on, in volts.
+    table : sequence of float, optional
+        For 'arbitrary', one cycle of the shape, from -1 to 1.
+
+    Returns
+    -------
+    numpy.ndarray
+        A float64 array of points values
+    """
+    if shape not in SHAPES:
+        raise ValueError('unknown shape {!r}; expected one of {}'.format(
+            shape, ', '.join(SHAPES)))
+    if points < 2:
+        raise ValueError('a waveform must have at least 2 points')
+    cycles = _check_cycles(shape, cycles)
+    if (table is None) != (shape != 'arbitrary'):
+        raise ValueError('table must be given for, and only for, the '
+                         'arbitrary shape')
+
+    position = numpy.arange(points) / points
+    if shape == 'chirp':
+        start, end = cycles
+        phase = position * (start + (end - start) / 2 * position)
+        phase -= numpy.floor(phase)
+        wave = numpy.sin(2 * numpy.pi * phase)
+    else:
+        # The position in the cycle of each point, from 0 to 1, computed
+        # from the whole waveform rather than accumulated per point
+        phase = position * cycles
+        phase -= numpy.floor(phase)
+        if shape == 'sine':
+            wave = numpy.sin(2 * numpy.pi * phase)
+        elif shape == 'square':
+            wave = numpy.where(phase < 0.5, 1.0, -1.0)
+        elif shape == 'triangle':
+            wave = 1 - 4 * numpy.abs((phase + 0.25) % 1 - 0.5)
+        else:
+            table = numpy.asarray(table, numpy.float64).ravel()
+            if table.size < 1:
+                raise ValueError('table must hold at least one value')
+            wave = numpy.interp(phase * table.size,
+                                numpy.arange(table.size + 1),
+                                numpy.append(table, table[0]))
+    wave *= amplitude
+    wave += offset
+    return wave
+
+
+def waveform_counts(shape, points, cycles, amplitude, ul_range, resolution,
+                    offset=0.0, table=None):
+    """Returns a waveform encoded as counts for a D/A range, from the cache
+    if it was built recently.
+
+    See :func:`waveform_volts` for the parameters describing the waveform.
+    Values beyond the range are clipped, as by
+    :func:`mcculw.conversion.volts_to_counts`.
+
+    Parameters
+    ----------
+    ul_range : ULRange
+        The D/A range the counts are for.
+    resolution : int
+        The resolution of the D/A, in bits.
+
+    Returns
+    -------
+    numpy.ndarray
+        A read-only uint16 array (uint32 above 16 bits) of points counts,
+        shared with other callers asking for the same waveform
+    """
+    global _hits, _misses
+    table_key = None
+    if table is not None:
+        table = numpy.ascontiguousarray(table, numpy.float64)
+        table_key = hashlib.sha1(table.tobytes()).hexdigest()
+    key = (shape, points, _check_cycles(shape, cycles), amplitude, offset,
+           ul_range, resolution, table_key)
+    with _cache_lock:
+        counts = _cache.get(key)
+        if counts is not None:
+            _cache.move_to_end(key)
+            _hits += 1
+            return counts
+
+    counts = volts_to_counts(
+        waveform_volts(shape, points, cycles, amplitude, offset, table),
+        ul_range, resolution)
+    counts.flags.writeable = False
+    with _cache_lock:
+        _misses += 1
+        _cache[key] = counts
+        while len(_cache) > max(CACHE_SIZE, 0):
+            _cache.popitem(last=False)
+    return counts
+
+
+def write_waveform(out, shape, points, cycles, amplitude, ul_range,
+                   resolution, offset=0.0, table=None):
+    """Writes a waveform, from :func:`waveform_counts`, into an output
+    buffer.
+
+    Parameters
+    ----------
+    out : numpy.ndarray, ScanBuffer or int
+        Receives the counts: an integer array, a
+        :class:`mcculw.buffer.ScanBuffer` or a memhandle returned by
+        :func:`.win_buf_alloc` (or :func:`.win_buf_alloc_32` for
+        resolutions above 16 bits). It must hold points values. A
+        memhandle is written from its first element. To fill one channel
+        of a multi-channel buffer, pass the column of its array.
+
+    The other parameters are those of :func:`waveform_counts`, in the same
+    order.
+
+    Returns
+    -------
+    numpy.ndarray
+        The array the counts were written to
+    """
+    counts = waveform_counts(shape, points, cycles, amplitude, ul_range,
+                             resolution, offset, table)
+    target = count_array(out, points, resolution)
+    numpy.copyto(target, counts.reshape(target.shape), casting='unsafe')
+    return target
+
+
+def cache_info():  # -> CacheInfo
+    """Returns the number of cache hits and misses of
+    :func:`waveform_counts` since the last :func:`clear_cache`, and the
+    number of waveforms cached."""
+    with _cache_lock:
+        return CacheInfo(_hits, _misses, len(_cache))
+
+
+def clear_cache():
+    """Drops the cached waveforms and resets the counts of
+    :func:`cache_info`."""
+    global _hits, _misses
+    with _cache_lock:
+        _cache.clear()
+        _hits = _misses = 0
@@ -0,0 +1,16 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import backend, ul
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    # Tests install the simulator, enable instrumentation and look up error
+    # messages; none of that may leak into the next test
+    yield
+    ul.disable_instrumentation()
+    backend.set_backend(None)
+    ul._err_msgs.clear()
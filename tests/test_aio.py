@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy
+
+from mcculw import aio, sim
+from mcculw.enums import ScanOptions, ULRange
+from mcculw.sim.board import volts_to_counts
+
+RATE = 1024
+CHANNELS = 2
+CHUNK_POINTS = 64
+# A ramp of one period, 128 frames long at RATE
+PERIOD_FRAMES = 128
+
+
+def _ramp(chan, t):
+    return 8 * t + chan
+
+
+def _as_long(count):
+    return (count + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+def test_chunks_across_count_rollover():
+    sim.install([sim.SimulatedBoard(ai_signal=_ramp,
+                                    ai_signal_period=PERIOD_FRAMES / RATE)])
+    # get_status reports counts 256 samples short of rolling over when the
+    # scan starts, as if its count had started 12 days earlier
+    offset = 2 ** 31 - 256
+
+    async def read():
+        scan = await aio.a_in_scan(0, 0, CHANNELS - 1, 16 * CHUNK_POINTS,
+                                   RATE, ULRange.BIP10VOLTS,
+                                   options=ScanOptions.CONTINUOUS,
+                                   chunk_points=CHUNK_POINTS)
+        status = scan.status
+
+        def offset_status():
+            state, cur_count, cur_index = status()
+            return state, _as_long(cur_count + offset), cur_index
+
+        scan.status = offset_status
+        scan._counter._last = offset
+        chunks = []
+        async with scan:
+            async for chunk in scan:
+                chunks.append(chunk)
+                if len(chunks) == 8:
+                    break
+        return numpy.concatenate(chunks).reshape(-1), scan._counter.total
+
+    samples, total = asyncio.run(read())
+    assert offset + total > 2 ** 31
+    positions = numpy.arange(samples.size)
+    frames = positions // CHANNELS % PERIOD_FRAMES
+    expected = [volts_to_counts(_ramp(chan, frame / RATE),
+                                ULRange.BIP10VOLTS, 16)
+                for chan, frame in zip(positions % CHANNELS, frames)]
+    numpy.testing.assert_array_equal(samples, expected)
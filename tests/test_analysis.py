@@ -0,0 +1,111 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import numpy
+import pytest
+
+from mcculw.analysis import fit_sine
+
+
+def _sine(amplitude, phase, offset, cycles, points):
+    phi = 2 * numpy.pi * cycles * numpy.arange(points) / points
+    return offset + amplitude * numpy.sin(phi + phase)
+
+
+@pytest.mark.parametrize('amplitude, phase, offset, cycles, points', [
+    (1.0, 0.0, 0.0, 5, 50),
+    (2.5, 1.0, -0.3, 3, 64),
+    (0.01, -2.0, 4.0, 1, 9),
+    # Not a whole number of cycles
+    (3.0, 3.0, 1.5, 2.7, 100),
+    (1.0, numpy.pi, 0.0, 4, 40),
+])
+def test_exact_sine(amplitude, phase, offset, cycles, points):
+    fit = fit_sine(_sine(amplitude, phase, offset, cycles, points), cycles)
+    assert fit.amplitude == pytest.approx(amplitude)
+    # Compare angles on the circle: pi and -pi are the same phase
+    assert numpy.cos(fit.phase - phase) == pytest.approx(1.0)
+    assert -numpy.pi < fit.phase <= numpy.pi
+    assert fit.offset == pytest.approx(offset, abs=1e-12)
+    assert fit.rms_residual == pytest.approx(0.0, abs=1e-12)
+    assert fit.amplitude_error == pytest.approx(0.0, abs=1e-12)
+    assert fit.phase_error == pytest.approx(0.0, abs=1e-9)
+    assert fit.offset_error == pytest.approx(0.0, abs=1e-12)
+
+
+def test_noisy_sine():
+    random = numpy.random.RandomState(1)
+    points = 1000
+    noise = 0.05
+    records = numpy.array([_sine(2.0, 0.5, 0.1, 10, points)
+                           + random.normal(0, noise, points)
+                           for _ in range(200)])
+    fit = fit_sine(records, 10)
+    assert fit.amplitude.shape == (200,)
+    assert fit.rms_residual == pytest.approx(noise, rel=0.1)
+    # White noise: the errors are sigma * sqrt(2 / points) for the
+    # amplitude, that over the amplitude for the phase and
+    # sigma / sqrt(points) for the offset
+    assert fit.amplitude_error == pytest.approx(
+        noise * numpy.sqrt(2 / points), rel=0.1)
+    assert fit.phase_error == pytest.approx(
+        noise * numpy.sqrt(2 / points) / 2.0, rel=0.1)
+    assert fit.offset_error == pytest.approx(noise / numpy.sqrt(points),
+                                             rel=0.1)
+    # The reported errors match the spread of the fits
+    assert fit.amplitude.mean() == pytest.approx(2.0, abs=0.005)
+    assert fit.phase.mean() == pytest.approx(0.5, abs=0.005)
+    assert fit.offset.mean() == pytest.approx(0.1, abs=0.005)
+    assert fit.amplitude.std() == pytest.approx(fit.amplitude_error.mean(),
+                                                rel=0.2)
+    assert fit.phase.std() == pytest.approx(fit.phase_error.mean(), rel=0.2)
+    assert fit.offset.std() == pytest.approx(fit.offset_error.mean(),
+                                             rel=0.2)
+
+
+def test_multi_channel_record():
+    # A (points, channels) scan buffer, fitted along the points axis
+    points = 90
+    params = [(1.0, 0.2, 0.0), (0.5, -1.2, 2.0), (3.0, 2.9, -1.0)]
+    data = numpy.stack([_sine(amplitude, phase, offset, 3, points)
+                        for amplitude, phase, offset in params], axis=1)
+    fit = fit_sine(data, 3, axis=0)
+    assert fit.amplitude.shape == (3,)
+    numpy.testing.assert_allclose(fit.amplitude, [p[0] for p in params])
+    numpy.testing.assert_allclose(fit.phase, [p[1] for p in params],
+                                  atol=1e-12)
+    numpy.testing.assert_allclose(fit.offset, [p[2] for p in params],
+                                  atol=1e-12)
+
+
+def test_batch_with_cycles_per_record():
+    # Steps of a sweep, each channel of each step with its own frequency
+    points = 60
+    cycles = numpy.array([[2], [3.5], [5]])
+    amplitudes = numpy.array([[1.0, 2.0], [0.5, 0.25], [4.0, 3.0]])
+    phases = numpy.array([[0.0, 1.0], [-1.0, 2.0], [0.5, -3.0]])
+    data = numpy.empty((3, 2, points))
+    for step in range(3):
+        for chan in range(2):
+            data[step, chan] = _sine(amplitudes[step, chan],
+                                     phases[step, chan], 0.0,
+                                     cycles[step, 0], points)
+    fit = fit_sine(data, cycles)
+    assert fit.amplitude.shape == (3, 2)
+    numpy.testing.assert_allclose(fit.amplitude, amplitudes)
+    numpy.testing.assert_allclose(fit.phase, phases, atol=1e-12)
+
+    # The same as fitting each record on its own
+    single = fit_sine(data[1, 0], 3.5)
+    assert fit.amplitude[1, 0] == pytest.approx(float(single.amplitude))
+
+
+def test_zero_amplitude():
+    fit = fit_sine(numpy.full(40, 1.5), 4)
+    assert fit.amplitude == pytest.approx(0.0, abs=1e-12)
+    assert fit.offset == pytest.approx(1.5)
+
+
+def test_too_few_samples():
+    with pytest.raises(ValueError):
+        fit_sine([0.0, 1.0, 0.0], 1)
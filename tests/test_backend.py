@@ -0,0 +1,178 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import threading
+from ctypes import CDLL, c_long
+from ctypes.util import find_library
+
+import pytest
+
+from mcculw import backend, sim, ul
+from mcculw.backend import LazyLibrary
+from mcculw.enums import ErrorCode
+from mcculw.ul import ULError
+
+
+class _Backend(object):
+    # Provides every cbXxx function, recording each lookup and call
+
+    def __init__(self, result=0):
+        self.result = result
+        self.lookups = []
+        self.calls = []
+
+    def __getattr__(self, name):
+        if not name.startswith('cb'):
+            raise AttributeError(name)
+        self.lookups.append(name)
+
+        def func(*args):
+            self.calls.append((name,) + args)
+            return self.result
+        return func
+
+
+def test_binds_each_function_once():
+    fake = _Backend()
+    library = LazyLibrary(fake)
+    assert fake.lookups == []
+    library.cbAIn(0, 1)
+    library.cbAIn(0, 2)
+    library.cbAOut(0, 3)
+    library.cbAIn(0, 4)
+    assert fake.lookups == ['cbAIn', 'cbAOut']
+    assert [call[0] for call in fake.calls] == ['cbAIn', 'cbAIn', 'cbAOut',
+                                                'cbAIn']
+    # The bound function replaces the prototype on the instance
+    assert library.cbAIn is library.bind('cbAIn')
+
+
+def test_prototype_called_before_binding():
+    # ul holds on to prototypes, such as the ones declaring argtypes, that
+    # were looked up before the function was bound
+    fake = _Backend()
+    library = LazyLibrary(fake)
+    prototype = library.cbFlashLED
+    prototype.argtypes = [c_long]
+    assert prototype(0) == 0
+    assert prototype(1) == 0
+    assert fake.lookups == ['cbFlashLED']
+
+
+def test_concurrent_first_calls_bind_once():
+    fake = _Backend()
+    library = LazyLibrary(fake)
+    go = threading.Event()
+
+    def call():
+        go.wait()
+        library.cbAIn(0)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    go.set()
+    for thread in threads:
+        thread.join()
+    assert fake.lookups == ['cbAIn']
+    assert len(fake.calls) == 8
+
+
+def test_backend_loaded_on_first_call():
+    library = LazyLibrary('mcculw.sim:SimulatedCbw')
+    library.cbAIn.argtypes = None
+    assert not library.is_loaded
+    assert isinstance(library.backend, sim.SimulatedCbw)
+    assert library.is_loaded
+
+
+def test_set_backend_rebinds():
+    first = _Backend(1)
+    second = _Backend(2)
+    library = LazyLibrary(first)
+    assert library.cbAIn(0) == 1
+    library.set_backend(second)
+    assert library.cbAIn(0) == 2
+    assert library.cbAIn(0) == 2
+    assert first.lookups == ['cbAIn']
+    assert second.lookups == ['cbAIn']
+
+    # An import path is resolved on first use
+    library.set_backend('mcculw.sim:SimulatedCbw')
+    assert not library.is_loaded
+    assert isinstance(library.backend, sim.SimulatedCbw)
+
+
+def test_set_backend_takes_effect_in_ul():
+    fake = _Backend()
+    backend.set_backend(fake)
+    assert backend.get_backend() is fake
+    ul.flash_led(3)
+    assert fake.calls == [('cbFlashLED', 3)]
+
+    fake.result = int(ErrorCode.BADBOARD)
+    with pytest.raises(ULError) as e:
+        ul.flash_led(3)
+    assert e.value.errorcode == ErrorCode.BADBOARD
+
+    cbw = sim.install()
+    assert backend.get_backend() is cbw
+    ul.flash_led(0)
+    assert len(fake.calls) == 2
+
+
+def test_set_backend_none_restores_default(monkeypatch):
+    monkeypatch.setenv(backend.BACKEND_ENV_VAR, 'mcculw.sim:SimulatedCbw')
+    fake = _Backend()
+    backend.set_backend(fake)
+    backend.set_backend(None)
+    assert isinstance(backend.get_backend(), sim.SimulatedCbw)
+
+
+def test_wrapper():
+    fake = _Backend()
+    library = LazyLibrary(fake)
+    wrapped = []
+
+    def wrapper(name, func):
+        wrapped.append(name)
+        return lambda *args: func(*args) + 10
+
+    assert library.cbAIn(0) == 0
+    library.set_wrapper(wrapper)
+    assert library.cbAIn(0) == 10
+    assert library.cbAIn(0) == 10
+    assert wrapped == ['cbAIn']
+    library.set_wrapper(None)
+    assert library.cbAIn(0) == 0
+
+
+@pytest.mark.skipif(find_library('c') is None, reason='needs the C library')
+def test_ctypes_library_gets_declared_signature():
+    library = LazyLibrary(CDLL(find_library('c')))
+    library.labs.argtypes = [c_long]
+    library.labs.restype = c_long
+    assert library.labs(-5) == 5
+    assert library.labs.argtypes == [c_long]
+    assert library.labs.restype is c_long
+
+
+def test_bind_all():
+    fake = _Backend()
+    library = LazyLibrary(fake)
+    library.cbAIn.argtypes = None
+    library.cbAOut.argtypes = None
+    library.bind_all()
+    assert sorted(fake.lookups) == ['cbAIn', 'cbAOut']
+    library.cbAIn(0)
+    assert sorted(fake.lookups) == ['cbAIn', 'cbAOut']
+
+
+def test_resolve_backend(monkeypatch):
+    fake = _Backend()
+    assert backend.resolve_backend(fake) is fake
+    assert isinstance(backend.resolve_backend(sim.SimulatedCbw),
+                      sim.SimulatedCbw)
+    # A native str on Python 2, as read from os.environ
+    monkeypatch.setenv(backend.BACKEND_ENV_VAR, 'mcculw.sim:SimulatedCbw')
+    assert isinstance(backend.resolve_backend(), sim.SimulatedCbw)
@@ -0,0 +1,89 @@
+import os
+import time
+
+import numpy
+import pytest
+
+from mcculw.batch import BatchRunner, map_records
+
+# Views of records kept by _keep_record, in the worker process
+_kept = []
+
+
+def _slow_sum(record):
+    # The first records take the longest, so that later chunks complete
+    # first
+    time.sleep(0.002 * max(0, 10 - int(record[0])))
+    return int(record.sum())
+
+
+def _fail_on_zero(record, directory):
+    value = int(record[0])
+    open(os.path.join(directory, str(value)), 'w').close()
+    if value == 0:
+        raise ValueError('record 0')
+    time.sleep(0.01)
+    return value
+
+
+def _keep_record(record):
+    _kept.append(record)
+    return 0
+
+
+def _mapped_blocks():
+    # The shared memory blocks mapped into this worker process
+    with open('/proc/self/maps') as maps:
+        return [line for line in maps if '/psm_' in line]
+
+
+def _records(count):
+    return numpy.arange(count * 4, dtype=numpy.int32).reshape(count, 4) // 4
+
+
+def test_results_in_record_order():
+    data = _records(40)
+    with BatchRunner(3, chunk_size=2) as runner:
+        assert runner.map(_slow_sum, data) == [4 * i for i in range(40)]
+
+
+def test_map_records():
+    assert map_records(_slow_sum, _records(5), max_workers=2) == [
+        0, 4, 8, 12, 16]
+
+
+def test_progress():
+    reports = []
+    with BatchRunner(2, chunk_size=3) as runner:
+        runner.map(_slow_sum, _records(10),
+                   progress=lambda done, total: reports.append((done, total)))
+    # One report per chunk, the last with every record done
+    assert len(reports) == 4
+    assert [total for _, total in reports] == [10] * 4
+    assert [done for done, _ in reports] == sorted(
+        done for done, _ in reports)
+    assert reports[-1] == (10, 10)
+
+
+def test_exception_cancels_remaining_chunks(tmp_path):
+    with BatchRunner(1, chunk_size=1) as runner:
+        with pytest.raises(ValueError, match='record 0'):
+            runner.map(_fail_on_zero, _records(50), (str(tmp_path),))
+    # The chunks the pool had not handed to the worker never ran
+    assert len(os.listdir(str(tmp_path))) < 50
+
+
+def test_kept_record_view_is_an_error():
+    with BatchRunner(1) as runner:
+        with pytest.raises(BufferError, match='copy the record'):
+            runner.map(_keep_record, _records(4))
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'),
+                    reason='needs /proc/self/maps')
+def test_workers_release_shared_memory():
+    with BatchRunner(2) as runner:
+        runner.map(_slow_sum, _records(20))
+        mapped = [runner._pool.submit(_mapped_blocks).result()
+                  for _ in range(8)]
+    assert mapped == [[]] * 8
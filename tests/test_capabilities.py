@@ -0,0 +1,113 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import json
+
+import pytest
+
+from mcculw import sim, ul
+from mcculw.device_info import DeviceCapabilities
+from mcculw.device_info import capabilities
+from mcculw.enums import BoardInfo, ErrorCode
+from mcculw.ul import ULError
+
+
+@pytest.fixture(autouse=True)
+def board():
+    board = sim.SimulatedBoard()
+    sim.install([board])
+    return board
+
+
+@pytest.fixture
+def cache_path(tmpdir):
+    return str(tmpdir.join('capabilities.json'))
+
+
+def _fail_gather(cls, board_num):
+    raise AssertionError('gathered instead of read from the cache')
+
+
+def test_to_dict_round_trip():
+    gathered = DeviceCapabilities.gather(0)
+    data = json.loads(json.dumps(gathered.to_dict()))
+    restored = DeviceCapabilities.from_dict(data)
+    assert restored == gathered
+    assert restored.ai == gathered.ai
+    assert type(restored.ai) is type(gathered.ai)
+    assert restored.unique_id == 'SIM00000'
+
+
+def test_cache_round_trip(cache_path, monkeypatch):
+    gathered = DeviceCapabilities.for_board(0, cache_path)
+    with open(cache_path) as f:
+        cache = json.load(f)
+    assert cache['version'] == capabilities._CACHE_VERSION
+    assert list(cache['devices']) == ['32767/SIM00000']
+
+    monkeypatch.setattr(DeviceCapabilities, 'gather',
+                        classmethod(_fail_gather))
+    assert DeviceCapabilities.for_board(0, cache_path) == gathered
+
+
+def test_refresh_gathers_again(cache_path, monkeypatch):
+    cached = DeviceCapabilities.for_board(0, cache_path)
+    changed = cached._replace(product_name='Reconfigured')
+    monkeypatch.setattr(DeviceCapabilities, 'gather',
+                        classmethod(lambda cls, board_num: changed))
+    assert DeviceCapabilities.for_board(0, cache_path) == cached
+    assert DeviceCapabilities.for_board(0, cache_path,
+                                        refresh=True) == changed
+
+    monkeypatch.setattr(DeviceCapabilities, 'gather',
+                        classmethod(_fail_gather))
+    assert DeviceCapabilities.for_board(0, cache_path) == changed
+
+
+@pytest.mark.parametrize('contents', [
+    json.dumps({'version': capabilities._CACHE_VERSION + 1,
+                'devices': {'32767/SIM00000': {'product_id': 1}}}),
+    '{"version": 1, "devices": {',
+    json.dumps({'version': capabilities._CACHE_VERSION,
+                'devices': {'32767/SIM00000': {'no_such_field': 1}}}),
+], ids=['other version', 'corrupt', 'other fields'])
+def test_unusable_cache_is_rewritten(cache_path, contents):
+    with open(cache_path, 'w') as f:
+        f.write(contents)
+    result = DeviceCapabilities.for_board(0, cache_path)
+    assert result == DeviceCapabilities.gather(0)
+    with open(cache_path) as f:
+        cache = json.load(f)
+    assert cache['version'] == capabilities._CACHE_VERSION
+    assert DeviceCapabilities.from_dict(
+        cache['devices']['32767/SIM00000']) == result
+
+
+def test_device_without_unique_id(cache_path, monkeypatch):
+    get_config_string = ul.get_config_string
+
+    def no_unique_id(info_type, board_num, dev_num, config_item, max_len):
+        if config_item == BoardInfo.DEVUNIQUEID:
+            raise ULError(ErrorCode.BADCONFIGITEM)
+        return get_config_string(info_type, board_num, dev_num, config_item,
+                                 max_len)
+
+    monkeypatch.setattr(ul, 'get_config_string', no_unique_id)
+    result = DeviceCapabilities.for_board(0, cache_path)
+    assert result.unique_id is None
+    assert result == DeviceCapabilities.gather(0)
+    # Gathered every time, never cached
+    with pytest.raises(IOError):
+        open(cache_path)
+
+
+def test_empty_unique_id_is_not_cached(cache_path, board):
+    board.unique_id = ''
+    DeviceCapabilities.for_board(0, cache_path)
+    with pytest.raises(IOError):
+        open(cache_path)
+
+
+def test_missing_board():
+    with pytest.raises(ULError):
+        DeviceCapabilities.for_board(1, None)
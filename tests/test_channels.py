@@ -0,0 +1,147 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import channels, sim, ul
+from mcculw.enums import DigitalPortType, ErrorCode, ULRange
+from mcculw.ul import ULError
+
+PORT_A = DigitalPortType.FIRSTPORTA
+PORT_B = DigitalPortType.FIRSTPORTB
+
+# Handle, ul function and arguments of the channels read, with a valid
+# channel and with one the board does not have
+INPUTS = [
+    (channels.AnalogInputChannel, ul.a_in, (3, ULRange.BIP10VOLTS),
+     (16, ULRange.BIP10VOLTS)),
+    (channels.AnalogInputChannel32, ul.a_in_32, (3, ULRange.BIP5VOLTS),
+     (16, ULRange.BIP5VOLTS)),
+    (channels.VoltageInputChannel, ul.v_in, (3, ULRange.BIP10VOLTS),
+     (3, ULRange.UNI5VOLTS)),
+    (channels.VoltageInputChannel32, ul.v_in_32, (3, ULRange.BIP10VOLTS),
+     (16, ULRange.BIP10VOLTS)),
+    (channels.DigitalPort, ul.d_in, (PORT_A,),
+     (DigitalPortType.AUXPORT,)),
+    (channels.DigitalPort32, ul.d_in_32, (PORT_B,),
+     (DigitalPortType.AUXPORT,)),
+    (channels.DigitalBit, ul.d_bit_in, (PORT_A, 9), (PORT_A, 16)),
+    (channels.CounterChannel, ul.c_in, (1,), (2,)),
+    (channels.CounterChannel32, ul.c_in_32, (1,), (2,)),
+    (channels.CounterChannel64, ul.c_in_64, (1,), (2,)),
+]
+
+
+@pytest.fixture(autouse=True)
+def board():
+    # A constant signal and a stopped clock, so that the handle and the ul
+    # function read the same values
+    board = sim.SimulatedBoard(ai_signal=lambda chan, t: chan - 2.3,
+                               ai_ranges=[ULRange.BIP10VOLTS,
+                                          ULRange.BIP5VOLTS],
+                               clock=lambda: 100.0)
+    sim.install([board])
+    ul.d_out(0, PORT_A, 0xA5)
+    ul.d_out(0, PORT_B, 0x3C)
+    ul.c_load(0, 1, 0x123456789)
+    return board
+
+
+def _name(value):
+    return getattr(value, '__name__', None)
+
+
+@pytest.mark.parametrize('handle_type, function, args, bad_args', INPUTS,
+                         ids=_name)
+def test_read_matches_ul(handle_type, function, args, bad_args):
+    handle = handle_type(0, *args)
+    expected = function(0, *args)
+    assert handle.read() == expected
+    assert type(handle.read()) is type(expected)
+    # The reused value is not shared between handles
+    other = handle_type(0, *args)
+    assert other.read() == handle.read()
+
+
+@pytest.mark.parametrize('handle_type, function, args, bad_args', INPUTS,
+                         ids=_name)
+def test_read_error(handle_type, function, args, bad_args):
+    with pytest.raises(ULError) as expected:
+        function(0, *bad_args)
+    with pytest.raises(ULError) as e:
+        handle_type(0, *bad_args).read()
+    assert e.value.errorcode == expected.value.errorcode
+    assert e.value.errorcode != ErrorCode.NOERRORS
+    with pytest.raises(ULError) as e:
+        handle_type(1, *args).read()
+    assert e.value.errorcode == ErrorCode.BADBOARD
+
+
+def test_counter_widths():
+    assert channels.CounterChannel(0, 1).read() == 0x6789
+    assert channels.CounterChannel32(0, 1).read() == 0x23456789
+    assert channels.CounterChannel64(0, 1).read() == 0x123456789
+
+
+def test_analog_output_channel(board):
+    handle = channels.AnalogOutputChannel(0, 1, ULRange.BIP10VOLTS)
+    handle.write(40000)
+    assert board.ao_values == [0, 40000]
+    ul.a_out(0, 1, ULRange.BIP10VOLTS, 12345)
+    written = list(board.ao_values)
+    handle.write(12345)
+    assert board.ao_values == written
+    with pytest.raises(ULError) as e:
+        handle.write(70000)
+    assert e.value.errorcode == ErrorCode.BADDAVAL
+    with pytest.raises(ULError) as e:
+        channels.AnalogOutputChannel(0, 2, ULRange.BIP10VOLTS).write(0)
+    assert e.value.errorcode == ErrorCode.BADDACHAN
+
+
+@pytest.mark.parametrize('volts', [-10.0, -2.5, 0.0, 1.234, 9.99])
+def test_voltage_output_channel(board, volts):
+    handle = channels.VoltageOutputChannel(0, 0, ULRange.BIP10VOLTS)
+    assert handle.ul_range == ULRange.BIP10VOLTS
+    ul.v_out(0, 0, ULRange.BIP10VOLTS, volts)
+    expected = board.ao_values[0]
+    board.ao_values[0] = None
+    handle.write(volts)
+    assert board.ao_values[0] == expected
+
+
+def test_voltage_output_channel_error():
+    with pytest.raises(ULError) as expected:
+        ul.v_out(0, 0, ULRange.UNI5VOLTS, 1.0)
+    with pytest.raises(ULError) as e:
+        channels.VoltageOutputChannel(0, 0, ULRange.UNI5VOLTS).write(1.0)
+    assert e.value.errorcode == expected.value.errorcode
+    with pytest.raises(ULError) as e:
+        channels.VoltageOutputChannel(0, 5, ULRange.BIP10VOLTS).write(1.0)
+    assert e.value.errorcode == ErrorCode.BADDACHAN
+
+
+@pytest.mark.parametrize('handle_type', [channels.DigitalPort,
+                                         channels.DigitalPort32])
+def test_digital_port_write(handle_type):
+    handle = handle_type(0, PORT_B)
+    handle.write(0x5A)
+    assert ul.d_in(0, PORT_B) == 0x5A
+    assert handle.read() == 0x5A
+    with pytest.raises(ULError) as e:
+        handle_type(0, DigitalPortType.AUXPORT).write(1)
+    assert e.value.errorcode == ErrorCode.BADPORTNUM
+
+
+def test_digital_bit_write():
+    # Bit 9 of port A is bit 1 of port B
+    handle = channels.DigitalBit(0, PORT_A, 9)
+    handle.write(1)
+    assert ul.d_in(0, PORT_B) == 0x3E
+    assert handle.read() == 1
+    handle.write(0)
+    assert ul.d_in(0, PORT_B) == 0x3C
+    assert ul.d_bit_in(0, PORT_A, 9) == 0
+    with pytest.raises(ULError) as e:
+        channels.DigitalBit(0, PORT_A, 16).write(1)
+    assert e.value.errorcode == ErrorCode.BADBITNUMBER
@@ -0,0 +1,167 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import c_uint, c_ushort
+
+import numpy
+import pytest
+
+from mcculw import sim, ul
+from mcculw.buffer import ScanBuffer
+from mcculw.conversion import counts_to_volts, volts_to_counts
+from mcculw.enums import ULRange
+
+RANGES = [ul_range for ul_range in ULRange
+          if ul_range.range_max > ul_range.range_min]
+
+
+def _edge_counts(resolution):
+    # 0, one count, mid-scale, full scale and, where the UL's count type can
+    # hold them, counts beyond the converter's span
+    full_scale = 1 << resolution
+    counts = [0, 1, full_scale // 2, full_scale - 1]
+    limit = 1 << (16 if resolution <= 16 else 32)
+    counts += [c for c in (full_scale, limit - 1) if c < limit]
+    return counts
+
+
+def _expected(counts, ul_range, resolution):
+    # The UL's formula, computed by hand one count at a time
+    span = ul_range.range_max - ul_range.range_min
+    return [ul_range.range_min + c * span / 2 ** resolution for c in counts]
+
+
+@pytest.mark.parametrize('resolution', [12, 16])
+@pytest.mark.parametrize('ul_range', RANGES, ids=lambda r: r.name)
+def test_counts_to_volts_matches_to_eng_units(ul_range, resolution):
+    sim.install([sim.SimulatedBoard(ai_resolution=resolution)])
+    counts = _edge_counts(resolution)
+    expected = numpy.array(
+        [ul.to_eng_units(0, ul_range, c) for c in counts], numpy.float32)
+    result = counts_to_volts(numpy.array(counts, numpy.uint16), ul_range,
+                             resolution, out=numpy.empty(len(counts),
+                                                         numpy.float32))
+    numpy.testing.assert_array_equal(result, expected)
+    numpy.testing.assert_allclose(
+        result, _expected(counts, ul_range, resolution), rtol=1e-6,
+        atol=1e-6 * (ul_range.range_max - ul_range.range_min))
+
+
+@pytest.mark.parametrize('resolution', [18, 20, 24])
+@pytest.mark.parametrize('ul_range', RANGES, ids=lambda r: r.name)
+def test_counts_to_volts_matches_to_eng_units_32(ul_range, resolution):
+    sim.install([sim.SimulatedBoard(ai_resolution=resolution)])
+    counts = _edge_counts(resolution)
+    expected = [ul.to_eng_units_32(0, ul_range, c) for c in counts]
+    result = counts_to_volts(numpy.array(counts, numpy.uint32), ul_range,
+                             resolution)
+    assert result.dtype == numpy.float64
+    numpy.testing.assert_array_equal(result, expected)
+    numpy.testing.assert_allclose(
+        result, _expected(counts, ul_range, resolution), rtol=1e-12)
+
+
+def test_counts_to_volts_edges_by_hand():
+    result = counts_to_volts([0, 2048, 4095, 4096, 65535],
+                             ULRange.BIP10VOLTS, 12)
+    numpy.testing.assert_allclose(
+        result, [-10.0, 0.0, 10.0 - 20.0 / 4096, 10.0,
+                 -10.0 + 65535 * 20.0 / 4096])
+    result = counts_to_volts([0, 32768, 65535], ULRange.UNI5VOLTS, 16)
+    numpy.testing.assert_allclose(result,
+                                  [0.0, 2.5, 5.0 - 5.0 / 65536])
+
+
+def test_counts_to_volts_keeps_shape_and_rejects_bad_out():
+    counts = numpy.arange(12, dtype=numpy.uint16).reshape(3, 4)
+    assert counts_to_volts(counts, ULRange.BIP5VOLTS, 16).shape == (3, 4)
+    with pytest.raises(ValueError):
+        counts_to_volts(counts, ULRange.BIP5VOLTS, 16,
+                        out=numpy.empty(12))
+
+
+@pytest.mark.parametrize('resolution', [12, 16, 18, 24, 32])
+@pytest.mark.parametrize('ul_range', RANGES, ids=lambda r: r.name)
+def test_volts_to_counts_round_trip(ul_range, resolution):
+    full_scale = 1 << resolution
+    counts = numpy.array([0, 1, 2, full_scale // 3, full_scale // 2,
+                          full_scale - 2, full_scale - 1])
+    volts = counts_to_volts(counts, ul_range, resolution)
+    result = volts_to_counts(volts, ul_range, resolution)
+    assert result.dtype == (numpy.uint16 if resolution <= 16
+                            else numpy.uint32)
+    numpy.testing.assert_array_equal(result, counts)
+    # Values within half a count round to it
+    half_count = (ul_range.range_max - ul_range.range_min) / full_scale / 2
+    numpy.testing.assert_array_equal(
+        volts_to_counts(volts[1:-1] + 0.9 * half_count, ul_range,
+                        resolution), counts[1:-1])
+    numpy.testing.assert_array_equal(
+        volts_to_counts(volts[1:-1] - 0.9 * half_count, ul_range,
+                        resolution), counts[1:-1])
+
+
+@pytest.mark.parametrize('resolution', [12, 16, 32])
+def test_volts_to_counts_clips_at_range_limits(resolution):
+    full_scale = 1 << resolution
+    volts = [-1000.0, -10.0, -10.0 - 1e-9, 10.0, 10.0 - 1e-9, 1000.0]
+    result = volts_to_counts(volts, ULRange.BIP10VOLTS, resolution)
+    assert result.tolist() == [0, 0, 0, full_scale - 1, full_scale - 1,
+                               full_scale - 1]
+    result = volts_to_counts([-1.0, 0.0, 2.5, 6.0], ULRange.UNI5VOLTS,
+                             resolution)
+    assert result.tolist() == [0, 0, full_scale // 2, full_scale - 1]
+
+
+@pytest.mark.parametrize('ul_range', RANGES, ids=lambda r: r.name)
+def test_volts_to_counts_matches_from_eng_units(ul_range):
+    sim.install([sim.SimulatedBoard(ao_resolution=16)])
+    volts = numpy.linspace(ul_range.range_min, ul_range.range_max, 17)
+    expected = [ul.from_eng_units(0, ul_range, v) for v in volts]
+    assert volts_to_counts(volts, ul_range, 16).tolist() == expected
+
+
+def test_volts_to_counts_by_hand():
+    assert volts_to_counts([-10.0, 0.0, 5.0], ULRange.BIP10VOLTS,
+                           12).tolist() == [0, 2048, 3072]
+    assert volts_to_counts([0.0, 2.5], ULRange.UNI5VOLTS,
+                           16).tolist() == [0, 32768]
+    assert volts_to_counts([0.0, 5.0], ULRange.BIP10VOLTS,
+                           32).tolist() == [1 << 31, 3 << 30]
+
+
+def test_volts_to_counts_into_out():
+    volts = numpy.linspace(-5, 5, 12)
+    expected = volts_to_counts(volts, ULRange.BIP5VOLTS, 16)
+    # An array of another shape and type
+    out = numpy.zeros((3, 4), numpy.int32)
+    assert volts_to_counts(volts, ULRange.BIP5VOLTS, 16, out=out) is out
+    assert out.ravel().tolist() == expected.tolist()
+    with pytest.raises(ValueError):
+        volts_to_counts(volts, ULRange.BIP5VOLTS, 16,
+                        out=numpy.zeros(11, numpy.uint16))
+
+
+def test_volts_to_counts_into_buffers():
+    sim.install()
+    volts = numpy.linspace(-5, 5, 12)
+    expected = volts_to_counts(volts, ULRange.BIP5VOLTS, 16).tolist()
+    with ScanBuffer(6, 2, 16) as buffer:
+        result = volts_to_counts(volts, ULRange.BIP5VOLTS, 16, out=buffer)
+        assert numpy.shares_memory(result, buffer.array)
+        assert buffer.array.ravel().tolist() == expected
+
+    memhandle = ul.win_buf_alloc(12)
+    try:
+        volts_to_counts(volts, ULRange.BIP5VOLTS, 16, out=memhandle)
+        assert list((c_ushort * 12).from_address(memhandle)) == expected
+    finally:
+        ul.win_buf_free(memhandle)
+
+    expected = volts_to_counts(volts, ULRange.BIP5VOLTS, 20).tolist()
+    memhandle = ul.win_buf_alloc_32(12)
+    try:
+        volts_to_counts(volts, ULRange.BIP5VOLTS, 20, out=memhandle)
+        assert list((c_uint * 12).from_address(memhandle)) == expected
+    finally:
+        ul.win_buf_free(memhandle)
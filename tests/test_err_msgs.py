@@ -0,0 +1,92 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import sim, ul
+from mcculw.enums import ErrorCode, ULRange
+from mcculw.ul import ULError
+
+
+@pytest.fixture
+def cbw(monkeypatch):
+    cbw = sim.install()
+    # Record the codes looked up in the UL
+    cbw.looked_up = []
+    get_err_msg = cbw.cbGetErrMsg
+
+    def recording_get_err_msg(error_code, msg):
+        cbw.looked_up.append(int(error_code))
+        return get_err_msg(error_code, msg)
+
+    monkeypatch.setattr(cbw, 'cbGetErrMsg', recording_get_err_msg,
+                        raising=False)
+    return cbw
+
+
+def test_message_resolved_on_access(cbw):
+    with pytest.raises(ULError) as e:
+        ul.a_in(5, 0, ULRange.BIP10VOLTS)
+    error = e.value
+    assert error.errorcode == ErrorCode.BADBOARD
+    # Raising and catching did not look the message up
+    assert cbw.looked_up == []
+    assert error.message == 'Simulated error: BADBOARD'
+    assert cbw.looked_up == [ErrorCode.BADBOARD]
+    assert str(error) == 'Error {}: Simulated error: BADBOARD'.format(
+        ErrorCode.BADBOARD)
+    assert cbw.looked_up == [ErrorCode.BADBOARD]
+
+
+def test_message_setter(cbw):
+    error = ULError(ErrorCode.BADBOARD)
+    error.message = 'Set by the caller'
+    assert str(error).endswith(': Set by the caller')
+    assert cbw.looked_up == []
+
+
+def test_get_err_msg_memoized(cbw):
+    assert ul.get_err_msg(ErrorCode.BADRANGE) == 'Simulated error: BADRANGE'
+    assert ul.get_err_msg(int(ErrorCode.BADRANGE)) == (
+        'Simulated error: BADRANGE')
+    assert ULError(ErrorCode.BADRANGE).message == 'Simulated error: BADRANGE'
+    assert cbw.looked_up == [ErrorCode.BADRANGE]
+    ul.get_err_msg(ErrorCode.BADBOARD)
+    assert cbw.looked_up == [ErrorCode.BADRANGE, ErrorCode.BADBOARD]
+
+
+def test_failed_lookup_not_cached(cbw, monkeypatch):
+    monkeypatch.setattr(cbw, 'cbGetErrMsg',
+                        lambda error_code, msg: int(ErrorCode.BADBOARD),
+                        raising=False)
+    with pytest.raises(ULError):
+        ul.get_err_msg(ErrorCode.BADRANGE)
+    assert int(ErrorCode.BADRANGE) not in ul.preload_err_msgs({})
+
+
+def test_preload_table(cbw):
+    table = ul.preload_err_msgs({ErrorCode.BADBOARD: 'No such board',
+                                 int(ErrorCode.BADRANGE): 'No such range'})
+    assert table == {int(ErrorCode.BADBOARD): 'No such board',
+                     int(ErrorCode.BADRANGE): 'No such range'}
+    assert ul.get_err_msg(ErrorCode.BADBOARD) == 'No such board'
+    assert ULError(ErrorCode.BADRANGE).message == 'No such range'
+    assert cbw.looked_up == []
+    # The returned table is a copy
+    table.clear()
+    assert ul.get_err_msg(ErrorCode.BADBOARD) == 'No such board'
+
+
+def test_preload_all_from_ul(cbw):
+    table = ul.preload_err_msgs()
+    assert sorted(table) == sorted(int(code) for code in ErrorCode)
+    assert len(cbw.looked_up) == len(table)
+    assert table[int(ErrorCode.OVERRUN)] == 'Simulated error: OVERRUN'
+    # Later lookups use the table, as does a saved copy preloaded into a
+    # fresh cache
+    ul.get_err_msg(ErrorCode.OVERRUN)
+    assert len(cbw.looked_up) == len(table)
+    ul._err_msgs.clear()
+    ul.preload_err_msgs(table)
+    assert ULError(ErrorCode.OVERRUN).message == 'Simulated error: OVERRUN'
+    assert len(cbw.looked_up) == len(table)
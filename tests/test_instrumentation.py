@@ -0,0 +1,104 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import backend, sim, ul
+from mcculw.enums import BoardInfo, InfoType, ULRange
+from mcculw.instrumentation import HISTOGRAM_BOUNDS, CallRecorder
+from mcculw.ul import ULError
+
+
+class _SteppingClock(object):
+    # Advances by step at every reading, so each call takes step seconds
+
+    def __init__(self, step):
+        self.step = step
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+def _bucket(elapsed):
+    return next((i for i, bound in enumerate(HISTOGRAM_BOUNDS)
+                 if elapsed <= bound), len(HISTOGRAM_BOUNDS))
+
+
+def test_recorder_times_calls_per_board():
+    recorder = CallRecorder(_SteppingClock(3e-6))
+    a_in = recorder.wrap('cbAIn', lambda *args: 0)
+    get_config = recorder.wrap('cbGetConfig', lambda *args: 0)
+    alloc = recorder.wrap('cbWinBufAlloc', lambda count: 1234)
+    assert a_in(0, 1, 2) == 0
+    a_in(0, 1, 2)
+    a_in(1, 1, 2)
+    get_config(InfoType.BOARDINFO, 2, 0, BoardInfo.ADRES)
+    assert alloc(10) == 1234
+    assert a_in.__name__ == 'cbAIn'
+
+    stats = recorder.snapshot()
+    assert sorted(stats) == ['cbAIn', 'cbGetConfig', 'cbWinBufAlloc']
+    assert sorted(stats['cbAIn']) == [0, 1]
+    # The board number of cbGetConfig is its second argument, and
+    # cbWinBufAlloc takes none
+    assert list(stats['cbGetConfig']) == [2]
+    assert list(stats['cbWinBufAlloc']) == [None]
+
+    board_0 = stats['cbAIn'][0]
+    assert board_0.count == 2
+    assert board_0.total_time == pytest.approx(6e-6)
+    assert board_0.min_time == pytest.approx(3e-6)
+    assert board_0.max_time == pytest.approx(3e-6)
+    assert sum(board_0.histogram) == 2
+    assert board_0.histogram[_bucket(3e-6)] == 2
+
+
+def test_recorder_times_failing_calls():
+    recorder = CallRecorder(_SteppingClock(2.0))
+
+    def fail(board_num):
+        raise RuntimeError('backend')
+
+    with pytest.raises(RuntimeError):
+        recorder.wrap('cbFlashLED', fail)(0)
+    stats = recorder.snapshot()['cbFlashLED'][0]
+    assert stats.count == 1
+    # Slower than the last bound
+    assert stats.histogram[-1] == 1
+
+
+def test_snapshot_reset():
+    recorder = CallRecorder(_SteppingClock(1e-3))
+    recorder.wrap('cbAIn', lambda *args: 0)(0)
+    assert recorder.snapshot(reset=True)['cbAIn'][0].count == 1
+    assert recorder.snapshot() == {}
+    recorder.record('cbAIn', 0, 1e-3)
+    recorder.reset()
+    assert recorder.snapshot() == {}
+
+
+def test_ul_instrumentation():
+    sim.install()
+    ul.reset_stats()
+    ul.a_in(0, 0, ULRange.BIP10VOLTS)
+    # Off by default: the backend function is called directly
+    assert ul.stats() == {}
+    assert backend.cbw.cbAIn == backend.get_backend().cbAIn
+
+    ul.enable_instrumentation()
+    for _ in range(3):
+        ul.a_in(0, 0, ULRange.BIP10VOLTS)
+    with pytest.raises(ULError):
+        ul.a_in(5, 0, ULRange.BIP10VOLTS)
+    ul.get_config(InfoType.BOARDINFO, 0, 0, BoardInfo.ADRES)
+    stats = ul.stats()
+    assert stats['cbAIn'][0].count == 3
+    assert stats['cbAIn'][5].count == 1
+    assert stats['cbGetConfig'][0].count == 1
+
+    ul.disable_instrumentation()
+    ul.a_in(0, 0, ULRange.BIP10VOLTS)
+    assert ul.stats(reset=True)['cbAIn'][0].count == 3
+    assert ul.stats() == {}
@@ -0,0 +1,197 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import threading
+import time
+
+import pytest
+
+from mcculw import sim, ul
+from mcculw.enums import ErrorCode, InterfaceType
+from mcculw.inventory import DeviceInventory, resolve_net_devices
+from mcculw.ul import ULError
+
+
+def _board(unique_id, product_id=0x7FFF, **kwargs):
+    return sim.SimulatedBoard(unique_id=unique_id, product_id=product_id,
+                              **kwargs)
+
+
+@pytest.fixture
+def cbw():
+    return sim.install([_board('A'), _board('B')], installed=False)
+
+
+def _ids(devices):
+    return sorted(device.unique_id for device in devices)
+
+
+def test_refresh_reports_added_and_removed(cbw):
+    inventory = DeviceInventory()
+    added, removed = inventory.refresh()
+    assert _ids(added) == ['A', 'B']
+    assert removed == []
+    assert _ids(inventory.devices) == ['A', 'B']
+    assert inventory.last_refresh is not None
+
+    # Nothing changed: the descriptors callers hold are kept
+    held = inventory.find('A')
+    assert inventory.refresh() == ([], [])
+    assert inventory.find('A') is held
+
+    cbw.devices.append(_board('C'))
+    del cbw.devices[0]
+    added, removed = inventory.refresh()
+    assert _ids(added) == ['C']
+    assert _ids(removed) == ['A']
+    assert _ids(inventory.devices) == ['B', 'C']
+    assert inventory.find('A') is None
+
+
+def test_changed_descriptor_is_added_and_removed(cbw):
+    inventory = DeviceInventory()
+    inventory.refresh()
+    cbw.devices[1] = _board('B', product_id=0x7FFE)
+    added, removed = inventory.refresh()
+    assert [device.product_id for device in added] == [0x7FFE]
+    assert [device.product_id for device in removed] == [0x7FFF]
+    assert _ids(inventory.find_product(0x7FFE)) == ['B']
+    assert _ids(inventory.find_product(0x7FFF)) == ['A']
+
+
+def test_interface_type(cbw):
+    cbw.devices.append(_board('E', interface_type=InterfaceType.ETHERNET))
+    inventory = DeviceInventory(InterfaceType.USB)
+    inventory.refresh()
+    assert _ids(inventory.devices) == ['A', 'B']
+
+
+def test_listeners_notified_of_changes(cbw):
+    inventory = DeviceInventory()
+    calls = []
+
+    def listener(added, removed):
+        calls.append((_ids(added), _ids(removed)))
+
+    inventory.add_listener(listener)
+    inventory.refresh()
+    # Not called when nothing changed
+    inventory.refresh()
+    cbw.devices.pop()
+    inventory.refresh()
+    inventory.remove_listener(listener)
+    cbw.devices.pop()
+    inventory.refresh()
+    assert calls == [(['A', 'B'], []), ([], ['B'])]
+
+
+def test_failing_listener(cbw):
+    inventory = DeviceInventory()
+    calls = []
+
+    def failing(added, removed):
+        raise RuntimeError('listener')
+
+    inventory.add_listener(failing)
+    inventory.add_listener(lambda added, removed: calls.append(added))
+    with pytest.raises(RuntimeError):
+        inventory.refresh()
+    # The other listeners heard about the change, and the cache is updated
+    assert len(calls) == 1
+    assert isinstance(inventory.last_error, RuntimeError)
+    assert _ids(inventory.devices) == ['A', 'B']
+
+
+def test_failed_discovery_keeps_devices(cbw, monkeypatch):
+    inventory = DeviceInventory()
+    inventory.refresh()
+
+    def fail(interface_type, number_of_devices):
+        raise ULError(ErrorCode.NO_USB_BOARD)
+
+    monkeypatch.setattr(ul, 'get_daq_device_inventory', fail)
+    with pytest.raises(ULError):
+        inventory.refresh()
+    assert inventory.last_error.errorcode == ErrorCode.NO_USB_BOARD
+    assert _ids(inventory.devices) == ['A', 'B']
+
+
+def test_background_refresh(cbw):
+    changes = []
+    changed = threading.Event()
+
+    def listener(added, removed):
+        changes.append((_ids(added), _ids(removed)))
+        changed.set()
+
+    inventory = DeviceInventory(refresh_interval=0.01)
+    inventory.add_listener(listener)
+    with inventory:
+        assert inventory.find('A', timeout=5) is not None
+        assert changed.wait(5)
+        changed.clear()
+        cbw.devices.append(_board('C'))
+        assert inventory.find('C', timeout=5) is not None
+        assert changed.wait(5)
+        changed.clear()
+        cbw.devices.pop(0)
+        assert changed.wait(5)
+    assert changes == [(['A', 'B'], []), (['C'], []), ([], ['A'])]
+
+    # Stopped: the cache is kept but no longer refreshed
+    cbw.devices.append(_board('D'))
+    assert _ids(inventory.devices) == ['B', 'C']
+    assert inventory.find('D', timeout=0.05) is None
+
+
+def test_create_daq_device(cbw):
+    inventory = DeviceInventory()
+    inventory.refresh()
+    device = inventory.create_daq_device(3, 'B')
+    assert device.unique_id == 'B'
+    assert ul.get_board_number(device) == 3
+    with pytest.raises(ULError) as e:
+        inventory.create_daq_device(4, 'Z')
+    assert e.value.errorcode == ErrorCode.BADBOARD
+
+
+@pytest.fixture
+def net_cbw():
+    return sim.install([], net_devices={'a': _board('NA'), 'c': _board('NC')})
+
+
+def test_resolve_net_devices_in_input_order(net_cbw):
+    # The first lookup times out last, after the others completed
+    hosts = ['slow', 'a', ('c', 1234), 'missing']
+    start = time.time()
+    results = resolve_net_devices(hosts, timeout={None: 0, 'slow': 200})
+    assert time.time() - start < 1
+    assert list(results) == hosts
+    assert results['a'].unique_id == 'NA'
+    assert results[('c', 1234)].unique_id == 'NC'
+    # The failed lookups do not abort the others
+    for host in 'slow', 'missing':
+        assert isinstance(results[host], ULError)
+        assert results[host].errorcode == ErrorCode.NETDEVNOTFOUND
+
+
+def test_resolve_net_devices_concurrently(net_cbw):
+    # Four lookups timing out after 0.2 s take 0.2 s, not 0.8 s
+    start = time.time()
+    results = resolve_net_devices(['w', 'x', 'y', 'z'], timeout=200)
+    assert time.time() - start < 0.6
+    assert all(isinstance(result, ULError) for result in results.values())
+
+
+def test_resolve_net_devices_and_create(net_cbw):
+    ul.create_daq_device(5, net_cbw.net_devices['c'].descriptor())
+    results = resolve_net_devices(['missing', 'a', 'c'], timeout=0,
+                                  first_board_num=4)
+    assert ul.get_board_number(results['a']) == 4
+    # Board 5 is in use: the creation error is reported for its host only
+    assert results['c'].errorcode == ErrorCode.BOARDNUMINUSE
+    assert results['missing'].errorcode == ErrorCode.NETDEVNOTFOUND
+
+
+def test_resolve_no_hosts(net_cbw):
+    assert resolve_net_devices([]) == {}
@@ -0,0 +1,75 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import sim, ul
+from mcculw.enums import ErrorCode, ULRange
+from mcculw.multiboard import MultiBoardAcquisition
+from mcculw.ul import ULError
+
+BOARDS = [(0, 0, 1, ULRange.BIP10VOLTS), (1, 0, 0, ULRange.BIP10VOLTS)]
+RATE = 2000
+CHUNK_POINTS = 100
+
+
+@pytest.fixture(autouse=True)
+def two_boards():
+    sim.install([sim.SimulatedBoard(), sim.SimulatedBoard()])
+
+
+def test_read_merges_chunks():
+    with MultiBoardAcquisition(BOARDS, RATE, CHUNK_POINTS) as acquisition:
+        chunks = [acquisition.read() for _ in range(3)]
+    assert [chunk.first_point for chunk in chunks] == [0, 100, 200]
+    for chunk in chunks:
+        assert chunk.data[0].shape == (CHUNK_POINTS, 2)
+        assert chunk.data[1].shape == (CHUNK_POINTS, 1)
+    assert acquisition.sample_counts == {0: 300, 1: 300}
+
+
+def test_start_rejects_unequal_rates(monkeypatch):
+    a_in_scan = ul.a_in_scan
+
+    def slower_board_1(board_num, *args):
+        rate = a_in_scan(board_num, *args)
+        return rate - 1 if board_num == 1 else rate
+
+    monkeypatch.setattr(ul, 'a_in_scan', slower_board_1)
+    acquisition = MultiBoardAcquisition(BOARDS, RATE, CHUNK_POINTS)
+    try:
+        with pytest.raises(ValueError):
+            acquisition.start()
+        assert not acquisition._workers
+        assert all(not stream._running
+                   for stream in acquisition._streams.values())
+    finally:
+        acquisition.close()
+
+
+def test_read_times_out():
+    acquisition = MultiBoardAcquisition(BOARDS, RATE, CHUNK_POINTS,
+                                        timeout=0.1)
+    # Board 1 never delivers a chunk
+    acquisition._streams[1].read = (
+        lambda out=None: acquisition._stopping.wait() and None)
+    with acquisition:
+        with pytest.raises(ULError) as error:
+            acquisition.read()
+        assert error.value.errorcode == ErrorCode.INPUTTIMEOUT
+        with pytest.raises(ULError):
+            acquisition.read()
+
+
+def test_read_raises_worker_exception():
+    acquisition = MultiBoardAcquisition(BOARDS, RATE, CHUNK_POINTS)
+
+    def unplugged(out=None):
+        raise RuntimeError('board 1 unplugged')
+
+    acquisition._streams[1].read = unplugged
+    with acquisition:
+        with pytest.raises(RuntimeError, match='unplugged'):
+            acquisition.read()
+        with pytest.raises(RuntimeError, match='unplugged'):
+            acquisition.read()
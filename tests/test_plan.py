@@ -0,0 +1,105 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import pytest
+
+from mcculw import sim
+from mcculw.enums import BoardInfo, InfoType, ScanOptions
+from mcculw.plan import ScanPlan
+
+# USB-1208LS and USB-1208FS, with packets of 64 and 31 samples
+USB_1208LS = 122
+USB_1208FS = 130
+
+
+def _install(**kwargs):
+    board = sim.SimulatedBoard(**kwargs)
+    sim.install([board])
+    return board
+
+
+def test_packet_size_of_one():
+    _install()
+    plan = ScanPlan.for_rate(0, 3, 1000, latency_target=0.1, headroom=4)
+    assert plan.rate == 1000
+    assert plan.chunk_points == 100
+    assert plan.buffer_chunks == 4
+    assert plan.points_per_channel == 400
+    assert plan.count == 1200
+    assert plan.memory_bytes == 2400
+    assert plan.chunk_period == pytest.approx(0.1)
+    assert plan.overrun_margin == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize('product_id, channels, rate, chunk_points', [
+    # 4 channels of 16 points fill a 64 sample packet exactly
+    (USB_1208LS, 4, 160, 16),
+    # 100 points rounded down to whole packets of 16 points
+    (USB_1208LS, 4, 1000, 96),
+    # 3 channels share no factor with 64: chunks are whole packets of 64
+    # points
+    (USB_1208LS, 3, 1000, 64),
+    # A single packet is longer than the latency target
+    (USB_1208LS, 1, 100, 64),
+    (USB_1208FS, 2, 1000, 93),
+], ids=['multiple', 'rounded down', 'coprime', 'one packet', '31'])
+def test_buffer_is_whole_packets(product_id, channels, rate, chunk_points):
+    _install(product_id=product_id)
+    plan = ScanPlan.for_rate(0, channels, rate, latency_target=0.1)
+    assert plan.chunk_points == chunk_points
+    assert plan.count % plan.packet_size == 0
+    assert plan.chunk_points * channels % plan.packet_size == 0
+
+
+def test_size_not_a_multiple_of_the_packet_size():
+    with pytest.raises(ValueError, match='packet size, 64'):
+        ScanPlan(0, 3, 1000, 100, 4, packet_size=64)
+
+
+def test_rate_is_lowered_to_the_board_maximum():
+    _install(max_rate=10000)
+    plan = ScanPlan.for_rate(0, 3, 5000, latency_target=0.1)
+    assert plan.rate == 3333
+    assert plan.chunk_points == 333
+    # A rate the board can reach is left alone
+    assert ScanPlan.for_rate(0, 2, 5000).rate == 5000
+
+
+def test_burst_mode_needs_board_support():
+    _install()
+    with pytest.raises(ValueError, match='BURSTMODE'):
+        ScanPlan.for_rate(0, 2, 1000, options=ScanOptions.BURSTMODE)
+
+
+def test_burst_mode_rate_limit():
+    board = _install(max_rate=8000)
+    key = (InfoType.BOARDINFO, 0, BoardInfo.ADSCANOPTIONS)
+    board.config[key] |= ScanOptions.BURSTMODE
+    plan = ScanPlan.for_rate(0, 4, 4000, options=ScanOptions.BURSTMODE)
+    assert plan.rate == 2000
+    assert plan.options & ScanOptions.BURSTMODE
+    assert plan.options & ScanOptions.CONTINUOUS
+
+
+def test_scaled_data():
+    _install(ai_resolution=12)
+    assert ScanPlan.for_rate(0, 1, 1000).dtype.itemsize == 2
+    plan = ScanPlan.for_rate(0, 1, 1000, options=ScanOptions.SCALEDATA)
+    assert plan.resolution == 16
+    assert plan.dtype.itemsize == 8
+
+
+def test_allocate():
+    _install()
+    plan = ScanPlan.for_rate(0, 2, 1000)
+    with plan.allocate() as buffer:
+        assert buffer.array.shape == (plan.points_per_channel, 2)
+        assert buffer.array.dtype == plan.dtype
+
+
+@pytest.mark.parametrize('args', [
+    (0, 1000, 10, 4), (1, 0, 10, 4), (1, 1000, 0, 4), (1, 1000, 10, 1),
+])
+def test_bad_arguments(args):
+    with pytest.raises(ValueError):
+        ScanPlan(0, *args)
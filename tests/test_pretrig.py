@@ -0,0 +1,100 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import c_ushort
+
+import numpy
+import pytest
+
+from mcculw import sim, ul
+from mcculw.conversion import convert_pretrig_data
+
+# A 12-bit capture of 8 samples from channels 0 and 1, in time order: A/D
+# values 10 to 80, and the raw words holding them above their channel tags
+VALUES_12 = [10, 20, 30, 40, 50, 60, 70, 80]
+TAGS_12 = [0, 1, 0, 1, 0, 1, 0, 1]
+WORDS_12 = [160, 321, 480, 641, 800, 961, 1120, 1281]
+
+# The raw buffer holds the post-trigger samples first, then the pretrigger
+# ones, by pretrig_count
+RAW_12 = {
+    0: WORDS_12,
+    2: [480, 641, 800, 961, 1120, 1281, 160, 321],
+    # More pretrigger than post-trigger samples: the trigger index wraps
+    # past the middle of the buffer
+    6: [1120, 1281, 160, 321, 480, 641, 800, 961],
+}
+
+VALUES_16 = [0, 1, 32768, 65535, 4660, 22136]
+RAW_16 = {
+    1: [1, 32768, 65535, 4660, 22136, 0],
+    4: [4660, 22136, 0, 1, 32768, 65535],
+    5: [22136, 0, 1, 32768, 65535, 4660],
+}
+
+
+def _array(values):
+    return numpy.array(values, numpy.uint16)
+
+
+@pytest.mark.parametrize('pretrig_count', sorted(RAW_12))
+def test_12_bit(pretrig_count):
+    raw = _array(RAW_12[pretrig_count])
+    data, tags = convert_pretrig_data(raw, pretrig_count)
+    assert data.tolist() == VALUES_12
+    assert tags.tolist() == TAGS_12
+    # In place
+    assert numpy.shares_memory(data, raw)
+
+
+@pytest.mark.parametrize('pretrig_count', sorted(RAW_16))
+def test_16_bit(pretrig_count):
+    raw = _array(RAW_16[pretrig_count])
+    data, tags = convert_pretrig_data(raw, pretrig_count, resolution=16)
+    assert data.tolist() == VALUES_16
+    assert tags is None
+
+
+def test_12_bit_without_tags():
+    data, tags = convert_pretrig_data(_array(RAW_12[6]), 6, chan_tags=False)
+    assert data.tolist() == VALUES_12
+    assert tags is None
+
+
+def test_batch_of_captures():
+    raw = _array([RAW_12[6], RAW_12[6][::-1]])
+    data, tags = convert_pretrig_data(raw, 6)
+    # The second capture holds the words of the first in reverse: its
+    # post-trigger samples are 961 and 800, after 641, 480, 321, 160, 1281
+    # and 1120 before the trigger
+    assert data.tolist() == [VALUES_12,
+                             [40, 30, 20, 10, 80, 70, 60, 50]]
+    assert tags.tolist() == [TAGS_12, [1, 0, 1, 0, 1, 0, 1, 0]]
+
+
+def test_total_count_shorter_than_buffer():
+    # Samples past total_count are left alone
+    raw = _array(RAW_12[2] + [0xFFFF, 0xFFFF])
+    data, tags = convert_pretrig_data(raw, 2, 8)
+    assert data.tolist() == VALUES_12
+    assert raw[8:].tolist() == [0xFFFF, 0xFFFF]
+
+
+def test_memhandle():
+    sim.install()
+    memhandle = ul.win_buf_alloc(8)
+    try:
+        (c_ushort * 8).from_address(memhandle)[:] = RAW_12[6]
+        data, tags = convert_pretrig_data(memhandle, 6, 8)
+        assert data.tolist() == VALUES_12
+        assert tags.tolist() == TAGS_12
+        assert list((c_ushort * 8).from_address(memhandle)) == VALUES_12
+    finally:
+        ul.win_buf_free(memhandle)
+
+
+@pytest.mark.parametrize('pretrig_count, total_count', [(-1, 8), (8, 8),
+                                                        (2, 9)])
+def test_bad_counts(pretrig_count, total_count):
+    with pytest.raises(ValueError):
+        convert_pretrig_data(_array(WORDS_12), pretrig_count, total_count)
@@ -0,0 +1,347 @@
+import itertools
+import json
+import time
+import zlib
+
+import numpy
+import pytest
+
+from mcculw import sim
+from mcculw.enums import ULRange
+from mcculw.recorder import Recorder, Recording
+from mcculw.stream import AnalogInputStream
+
+RATE = 1000.0
+BLOCK_POINTS = 100
+
+
+def _samples(points, channels, dtype=numpy.uint16, seed=0):
+    info = numpy.iinfo(dtype)
+    return numpy.random.RandomState(seed).randint(
+        info.min, info.max, (points, channels), dtype=numpy.int64).astype(
+            dtype)
+
+
+def _record(path, data, chunk_points=37, **kwargs):
+    # Writes data in chunks that do not line up with the blocks
+    kwargs.setdefault('block_points', BLOCK_POINTS)
+    kwargs.setdefault('resolution', 16)
+    channels = data.shape[1]
+    with Recorder(path, range(channels), ULRange.BIP10VOLTS, RATE,
+                  data.dtype, **kwargs) as recorder:
+        for start in range(0, len(data), chunk_points):
+            recorder.write(data[start:start + chunk_points])
+    return recorder
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join('recording.bin'))
+
+
+@pytest.mark.parametrize('channels', [1, 3])
+@pytest.mark.parametrize('file_format', ['npy', 'raw', 'indexed'])
+def test_round_trip(path, file_format, channels):
+    data = _samples(1234, channels)
+    recorder = _record(path, data, file_format=file_format)
+    assert recorder.points_written == 1234
+    assert recorder.bytes_written == data.nbytes
+
+    recording = Recording(path)
+    assert recording.points == 1234
+    assert recording.data.shape == (1234, channels)
+    assert recording.channels == list(range(channels))
+    assert recording.rate == RATE
+    assert recording.duration == 1234 / RATE
+    numpy.testing.assert_array_equal(recording.data, data)
+    if file_format == 'indexed':
+        assert recording.index['first_point'].tolist() == list(
+            range(0, 1234, BLOCK_POINTS))
+
+
+@pytest.mark.parametrize('channels', [1, 3])
+def test_npy_loads_with_numpy(path, channels):
+    data = _samples(250, channels)
+    _record(path, data, file_format='npy')
+    loaded = numpy.load(path)
+    assert loaded.dtype == numpy.uint16
+    numpy.testing.assert_array_equal(loaded, data)
+
+
+def test_float_samples(path):
+    data = numpy.random.RandomState(1).normal(0, 5, (300, 2))
+    _record(path, data, file_format='npy', resolution=None)
+    numpy.testing.assert_array_equal(numpy.load(path), data)
+
+
+def test_sidecar(path):
+    _record(path, _samples(150, 2), file_format='indexed',
+            metadata={'operator': 'test'})
+    with open(path + '.json') as f:
+        info = json.load(f)
+    assert info['format'] == 'indexed'
+    assert info['points'] == 150
+    assert info['channels'] == [0, 1]
+    assert info['ranges'] == ['BIP10VOLTS', 'BIP10VOLTS']
+    assert info['resolution'] == 16
+    assert info['dtype'] == numpy.dtype(numpy.uint16).str
+    assert info['index'] == 'recording.bin.idx'
+    assert info['operator'] == 'test'
+    assert info['start_time'] is not None
+
+
+@pytest.mark.parametrize('file_format', ['npy', 'raw', 'indexed'])
+def test_empty_recording(path, file_format):
+    Recorder(path, [0, 1], ULRange.BIP10VOLTS, RATE, numpy.uint16,
+             file_format=file_format).close()
+    recording = Recording(path)
+    assert recording.points == 0
+    assert recording.data.shape == (0, 2)
+    if file_format == 'npy':
+        assert numpy.load(path).shape == (0, 2)
+
+
+def test_close_and_exit(path):
+    data = _samples(150, 2)
+    with Recorder(path, [0, 1], ULRange.BIP10VOLTS, RATE, numpy.uint16,
+                  block_points=BLOCK_POINTS) as recorder:
+        recorder.write(data)
+        # The partial block is still in memory
+        assert recorder.points_written <= BLOCK_POINTS
+    # Leaving the block wrote it and finished the file
+    assert recorder.points_written == 150
+    assert not recorder._writer.is_alive()
+    numpy.testing.assert_array_equal(numpy.load(path), data)
+    with pytest.raises(ValueError):
+        recorder.write(data)
+    # Closing again has no effect
+    recorder.close()
+    numpy.testing.assert_array_equal(numpy.load(path), data)
+
+
+def test_exit_on_exception_keeps_data(path):
+    data = _samples(150, 2)
+    with pytest.raises(RuntimeError):
+        with Recorder(path, [0, 1], ULRange.BIP10VOLTS, RATE,
+                      numpy.uint16) as recorder:
+            recorder.write(data)
+            raise RuntimeError('scan failed')
+    numpy.testing.assert_array_equal(numpy.load(path), data)
+
+
+def test_bad_arguments(path):
+    with pytest.raises(ValueError):
+        Recorder(path, [0], ULRange.BIP10VOLTS, RATE, numpy.uint16,
+                 file_format='csv')
+    with Recorder(path, [0, 1], ULRange.BIP10VOLTS, RATE,
+                  numpy.uint16) as recorder:
+        with pytest.raises(ValueError):
+            recorder.write(_samples(10, 3))
+
+
+def test_for_stream(path):
+    sim.install()
+    with AnalogInputStream(0, 0, 1, 1000, ULRange.BIP10VOLTS,
+                           50) as stream:
+        with Recorder.for_stream(stream, path,
+                                 file_format='indexed') as recorder:
+            chunks = [stream.read() for _ in range(4)]
+            for chunk in chunks:
+                recorder.write(chunk)
+    recording = Recording(path)
+    assert recording.info['resolution'] == 16
+    assert recording.info['board_num'] == 0
+    numpy.testing.assert_array_equal(recording.data,
+                                     numpy.concatenate(chunks))
+
+
+def _wait_for_writer(recorder, points, timeout=5.0):
+    deadline = time.time() + timeout
+    while recorder.points_written < points:
+        assert time.time() < deadline, 'the writer thread did not catch up'
+        time.sleep(0.001)
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib'])
+def test_unclosed_recording(path, compression):
+    data = _samples(350, 2)
+    recorder = Recorder(path, [0, 1], ULRange.BIP10VOLTS, RATE, numpy.uint16,
+                        16, 'indexed', BLOCK_POINTS, compression=compression)
+    try:
+        recorder.write(data)
+        # Three full blocks have been handed to the writer; the rest waits
+        # for the next chunk or close
+        _wait_for_writer(recorder, 300)
+        recording = Recording(path)
+        assert recording.info['points'] is None
+        assert recording.points == recorder.points_written == 300
+        numpy.testing.assert_array_equal(recording.window(0, 1), data[:300])
+    finally:
+        recorder.close()
+    assert Recording(path).points == 350
+
+
+def test_recording_with_torn_last_block(path):
+    # A recording whose writer died partway through writing its last block
+    data = _samples(350, 2)
+    _record(path, data, file_format='indexed')
+    with open(path + '.json') as f:
+        info = json.load(f)
+    info['points'] = None
+    with open(path + '.json', 'w') as f:
+        json.dump(info, f)
+    with open(path, 'r+b') as f:
+        f.truncate(330 * 2 * 2 + 1)
+    recording = Recording(path)
+    assert recording.points == 330
+    numpy.testing.assert_array_equal(recording.data, data[:330])
+
+
+WINDOWS = [(0, 1.234), (0.1, 0.2), (0.0995, 0.2005), (-1, 0.05), (1.2, 5),
+           (0.5, 0.5), (0.3, 0.1)]
+
+
+@pytest.mark.parametrize('file_format', ['npy', 'raw', 'indexed'])
+def test_window_matches_full_read(path, file_format):
+    data = _samples(1234, 3)
+    _record(path, data, file_format=file_format)
+    recording = Recording(path)
+    full = numpy.array(recording.data)
+    for t0, t1 in WINDOWS:
+        first = min(max(int(numpy.ceil(t0 * RATE)), 0), 1234)
+        last = min(max(int(numpy.ceil(t1 * RATE)), first), 1234)
+        window = recording.window(t0, t1)
+        numpy.testing.assert_array_equal(window, full[first:last])
+        numpy.testing.assert_array_equal(window, data[first:last])
+    numpy.testing.assert_array_equal(recording.window(0.1, 0.2, 1),
+                                     full[100:200, 1:2])
+    # Evenly spaced channels stay a view of the file
+    window = recording.window(0.1, 0.2, [0, 2])
+    numpy.testing.assert_array_equal(window, full[100:200, [0, 2]])
+    assert numpy.shares_memory(window, recording.data)
+    numpy.testing.assert_array_equal(recording.window(0.1, 0.2, [2, 0]),
+                                     full[100:200, [2, 0]])
+
+
+def test_host_time_interpolates_index(path, monkeypatch):
+    # Each call of time.time() is 0.1 s after the previous one: the first
+    # gives the start time, the next ones the index entry of each block
+    calls = itertools.count()
+    monkeypatch.setattr(time, 'time', lambda: 1000 + 0.1 * next(calls))
+    _record(path, _samples(350, 2), chunk_points=50, file_format='indexed')
+    monkeypatch.undo()
+
+    recording = Recording(path)
+    numpy.testing.assert_allclose(recording.index['host_time'],
+                                  [1000.1, 1000.2, 1000.3, 1000.4])
+    # The entry of a block is the time its last sample arrived
+    block_ends = [100, 200, 300, 350]
+    for entry_time, end in zip(recording.index['host_time'], block_ends):
+        assert recording.host_time(end - 1) == pytest.approx(
+            entry_time - 1 / RATE)
+    assert recording.host_time(0) == pytest.approx(1000.1 - 0.1)
+    assert recording.host_time(150) == pytest.approx(1000.2 - 0.05)
+    assert recording.host_time(320) == pytest.approx(1000.4 - 0.03)
+
+
+def test_host_time_without_index(path):
+    _record(path, _samples(350, 2), file_format='npy')
+    recording = Recording(path)
+    start = recording.info['start_time']
+    assert recording.host_time(0) == start
+    assert recording.host_time(250) == pytest.approx(start + 0.25)
+
+
+def _ramps(points, channels, dtype):
+    # Slowly varying counts that wrap around the top of the type, so that
+    # some deltas wrap too
+    top = numpy.iinfo(dtype).max
+    t = numpy.arange(points)[:, None]
+    return ((top - 500 + 3 * t + 1000 * numpy.arange(channels))
+            % (top + 1)).astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [numpy.uint16, numpy.uint32])
+@pytest.mark.parametrize('compression', ['zlib', 'lzma'])
+def test_compressed_round_trip(path, compression, dtype):
+    data = _ramps(1234, 3, dtype)
+    recorder = _record(path, data, file_format='indexed',
+                       compression=compression, compression_threads=2)
+    assert recorder.compression_ratio > 2
+
+    recording = Recording(path)
+    assert recording.compression == compression
+    assert recording.info['delta'] is True
+    assert recording.data is None
+    assert recording.points == 1234
+    window = recording.window(0, 2)
+    assert window.dtype == dtype
+    numpy.testing.assert_array_equal(window, data)
+
+
+@pytest.mark.parametrize('compression', ['zlib', 'lzma'])
+def test_compressed_random_samples(path, compression):
+    # Samples that do not compress still round trip
+    data = _samples(450, 2)
+    _record(path, data, file_format='indexed', compression=compression)
+    numpy.testing.assert_array_equal(Recording(path).window(0, 1), data)
+
+
+def test_compressed_window_crosses_blocks(path):
+    data = _ramps(1234, 3, numpy.uint16)
+    _record(path, data, file_format='indexed', compression='zlib')
+    recording = Recording(path)
+    # From inside block 0 to inside block 3, and exactly one block
+    numpy.testing.assert_array_equal(recording.window(0.095, 0.305),
+                                     data[95:305])
+    numpy.testing.assert_array_equal(recording.window(0.2, 0.3),
+                                     data[200:300])
+    numpy.testing.assert_array_equal(recording.window(1.15, 2),
+                                     data[1150:])
+    numpy.testing.assert_array_equal(recording.window(0.1, 0.3, [2, 0]),
+                                     data[100:300, [2, 0]])
+
+
+def test_compressed_blocks_decode_on_their_own(path):
+    data = _ramps(450, 2, numpy.uint16)
+    _record(path, data, file_format='indexed', compression='zlib')
+    recording = Recording(path)
+    offsets = recording.index['offset'].tolist()
+    with open(path, 'rb') as f:
+        stored = f.read()
+    for block, first in enumerate(recording.index['first_point'].tolist()):
+        end = offsets[block + 1] if block + 1 < len(offsets) else None
+        deltas = numpy.frombuffer(zlib.decompress(stored[offsets[block]:end]),
+                                  numpy.uint16).reshape(-1, 2)
+        # The first sample of each block is kept whole, the others are
+        # differences from the previous sample
+        numpy.testing.assert_array_equal(deltas[0], data[first])
+        numpy.testing.assert_array_equal(
+            deltas[1:], (data[first + 1:first + len(deltas)]
+                         - data[first:first + len(deltas) - 1]))
+        numpy.testing.assert_array_equal(recording._read_block(block),
+                                         data[first:first + len(deltas)])
+
+
+def test_uncompressed_indexed_recording(path):
+    data = _ramps(450, 2, numpy.uint16)
+    recorder = _record(path, data, file_format='indexed')
+    assert recorder.compression_ratio == 1.0
+    recording = Recording(path)
+    assert recording.compression is None
+    assert 'compression' not in recording.info
+    # Blocks are stored as they are, back to back
+    assert recording.index['offset'].tolist() == [
+        first * 2 * 2 for first in recording.index['first_point'].tolist()]
+    numpy.testing.assert_array_equal(recording.data, data)
+
+
+@pytest.mark.parametrize('file_format, dtype, compression', [
+    ('indexed', numpy.uint16, 'bz2'),
+    ('npy', numpy.uint16, 'zlib'),
+    ('indexed', numpy.float64, 'zlib'),
+])
+def test_bad_compression(path, file_format, dtype, compression):
+    with pytest.raises(ValueError):
+        Recorder(path, [0], ULRange.BIP10VOLTS, RATE, dtype,
+                 file_format=file_format, compression=compression)
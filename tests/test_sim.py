@@ -0,0 +1,139 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import numpy
+import pytest
+
+from mcculw import sim, ul
+from mcculw.buffer import ScanBuffer
+from mcculw.conversion import volts_to_counts
+from mcculw.enums import ErrorCode, FunctionType, ScanOptions, Status, ULRange
+from mcculw.ul import ULError
+
+AI = FunctionType.AIFUNCTION
+RANGE = ULRange.BIP10VOLTS
+
+
+class _Clock(object):
+    # A clock that only moves when the test advances it
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _signal(chan, t):
+    # A ramp per channel, one volt per second
+    return chan + t
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def board(clock):
+    board = sim.SimulatedBoard(clock=clock, ai_signal=_signal,
+                               ai_signal_period=1.0)
+    sim.install([board])
+    return board
+
+
+def _expected(frames, channels, rate):
+    t = numpy.arange(frames) / rate
+    volts = numpy.add.outer(t, numpy.arange(channels))
+    return volts_to_counts(volts, RANGE, 16)
+
+
+def test_single_point_reads_follow_clock(board, clock):
+    assert ul.v_in(0, 2, RANGE) == pytest.approx(2.0, abs=1e-3)
+    clock.now += 0.5
+    assert ul.v_in(0, 2, RANGE) == pytest.approx(2.5, abs=1e-3)
+    assert ul.a_in(0, 0, RANGE) == volts_to_counts([0.5], RANGE, 16)[0]
+
+
+def test_counter_follows_clock(board, clock):
+    ul.c_load(0, 0, 100)
+    clock.now += 2.5
+    # counter_frequency counts per second
+    assert ul.c_in_32(0, 0) == 100 + 2500
+
+
+def test_finite_scan_follows_clock(board, clock):
+    with ScanBuffer(100, 2, 16) as buffer:
+        ul.a_in_scan(0, 0, 1, buffer.count, 1000, RANGE, buffer.memhandle,
+                     ScanOptions.BACKGROUND)
+        task = board.scans[AI]
+        assert task.start_time == clock.now
+        assert ul.get_status(0, AI) == (Status.RUNNING, 0, -1)
+
+        clock.now += 0.0105
+        # 10 whole frames of 2 samples
+        assert ul.get_status(0, AI) == (Status.RUNNING, 20, 18)
+        numpy.testing.assert_array_equal(buffer.array[:10],
+                                         _expected(10, 2, 1000))
+
+        clock.now += 1.0
+        assert ul.get_status(0, AI) == (Status.IDLE, 200, 198)
+        numpy.testing.assert_array_equal(buffer.array,
+                                         _expected(100, 2, 1000))
+        assert task.duration == pytest.approx(0.1)
+
+
+def test_continuous_scan_wraps(board, clock):
+    options = ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS
+    with ScanBuffer(10, 1, 16) as buffer:
+        ul.a_in_scan(0, 0, 0, buffer.count, 100, RANGE, buffer.memhandle,
+                     options)
+        clock.now += 0.235
+        # 23 frames into a buffer of 10: the last one is at index 2
+        assert ul.get_status(0, AI) == (Status.RUNNING, 23, 2)
+        # Frames 20 to 22 overwrote the start of the buffer
+        expected = _expected(23, 1, 100)[:, 0]
+        assert buffer.array[:, 0].tolist() == (expected[20:].tolist()
+                                               + expected[13:20].tolist())
+        clock.now += 0.1
+        ul.stop_background(0, AI)
+        assert ul.get_status(0, AI) == (Status.IDLE, 33, 2)
+        # Stopped: the clock no longer moves the scan
+        clock.now += 1.0
+        assert ul.get_status(0, AI) == (Status.IDLE, 33, 2)
+
+
+def test_scan_overruns_fifo(clock):
+    board = sim.SimulatedBoard(clock=clock, fifo_size=50)
+    sim.install([board])
+    options = ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS
+    with ScanBuffer(100, 1, 16) as buffer:
+        ul.a_in_scan(0, 0, 0, buffer.count, 1000, RANGE, buffer.memhandle,
+                     options)
+        clock.now += 0.0205
+        assert ul.get_status(0, AI)[:2] == (Status.RUNNING, 20)
+        # More than fifo_size samples between two services
+        clock.now += 0.06
+        with pytest.raises(ULError) as e:
+            ul.get_status(0, AI)
+        assert e.value.errorcode == ErrorCode.OVERRUN
+        assert board.scans[AI].status == Status.IDLE
+
+
+def test_scan_checks(board):
+    with ScanBuffer(10, 2, 16) as buffer:
+        with pytest.raises(ULError) as e:
+            ul.a_in_scan(0, 0, 1, buffer.count, 1000000, RANGE,
+                         buffer.memhandle, ScanOptions.BACKGROUND)
+        assert e.value.errorcode == ErrorCode.BADRATE
+        with pytest.raises(ULError) as e:
+            ul.a_in_scan(0, 0, 1, 19, 1000, RANGE, buffer.memhandle,
+                         ScanOptions.BACKGROUND | ScanOptions.CONTINUOUS)
+        assert e.value.errorcode == ErrorCode.BADCOUNT
+        ul.a_in_scan(0, 0, 1, buffer.count, 1000, RANGE, buffer.memhandle,
+                     ScanOptions.BACKGROUND)
+        with pytest.raises(ULError) as e:
+            ul.a_in_scan(0, 0, 1, buffer.count, 1000, RANGE,
+                         buffer.memhandle, ScanOptions.BACKGROUND)
+        assert e.value.errorcode == ErrorCode.ALREADYACTIVE
+        ul.stop_background(0, AI)
@@ -0,0 +1,81 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import numpy
+import pytest
+
+from mcculw import sim
+from mcculw.buffer import SampleCounter
+from mcculw.enums import FunctionType, ULRange
+from mcculw.sim.board import volts_to_counts
+from mcculw.stream import AnalogInputStream
+
+RATE = 1024
+CHANNELS = 2
+CHUNK_POINTS = 64
+# A ramp of one period, 128 frames long at RATE
+PERIOD_FRAMES = 128
+
+
+def _ramp(chan, t):
+    return 8 * t + chan
+
+
+def _expected(first, count):
+    # The samples at scan positions [first, first + count)
+    positions = numpy.arange(first, first + count)
+    frames = positions // CHANNELS % PERIOD_FRAMES
+    return numpy.array(
+        [volts_to_counts(_ramp(chan, frame / RATE), ULRange.BIP10VOLTS, 16)
+         for chan, frame in zip(positions % CHANNELS, frames)])
+
+
+def test_sample_counter_rolls_over():
+    counter = SampleCounter()
+    assert counter.update(2 ** 31 - 10) == 2 ** 31 - 10
+    # The UL's signed 32-bit count wraps to negative values
+    assert counter.update(-2 ** 31 + 5) == 2 ** 31 + 5
+    assert counter.update(-2 ** 31 + 5) == 2 ** 31 + 5
+    # Past 2**32 it wraps back to the positive counts
+    assert counter.update(-1) == 2 ** 32 - 1
+    assert counter.update(20) == 2 ** 32 + 20
+    counter.reset()
+    assert counter.update(3) == 3
+
+
+def test_sample_counter_ignores_stale_counts():
+    counter = SampleCounter()
+    counter.update(2 ** 31 - 100)
+    counter.update(-2 ** 31 + 100)
+    # An event reporting an older count, before and after the wrap
+    assert counter.update(-2 ** 31 + 50) == 2 ** 31 + 100
+    assert counter.update(2 ** 31 - 50) == 2 ** 31 + 100
+    assert counter.update(-2 ** 31 + 150) == 2 ** 31 + 150
+
+
+@pytest.mark.parametrize('use_events', [False, True],
+                         ids=['polling', 'events'])
+def test_stream_reads_across_count_rollover(use_events):
+    board = sim.SimulatedBoard(ai_signal=_ramp,
+                               ai_signal_period=PERIOD_FRAMES / RATE)
+    sim.install([board])
+    stream = AnalogInputStream(0, 0, CHANNELS - 1, RATE, ULRange.BIP10VOLTS,
+                               CHUNK_POINTS, use_events=use_events)
+    with stream:
+        # Jump the scan forward to 256 samples before get_status's count
+        # rolls over, as if it had been running for 12 days
+        skip = 2 ** 31 - 256
+        with board.lock:
+            task = board.scans[FunctionType.AIFUNCTION]
+            task.position += skip
+            task.start_time -= skip // CHANNELS / RATE
+            # The samples skipped were never written: read on from the jump
+            stream._consumed = task.position
+
+        first = stream.samples_read
+        chunks = [stream.read() for _ in range(8)]
+    assert stream.samples_read == first + 8 * CHUNK_POINTS * CHANNELS
+    assert stream.samples_read > 2 ** 31
+    numpy.testing.assert_array_equal(
+        numpy.concatenate(chunks).reshape(-1),
+        _expected(first, stream.samples_read - first))
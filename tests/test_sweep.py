@@ -0,0 +1,103 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+import numpy
+import pytest
+
+from mcculw import sim, ul
+from mcculw.enums import ErrorCode, FunctionType, Status, ULRange
+from mcculw.sweep import FrequencySweep
+from mcculw.ul import ULError
+
+FREQUENCIES = [1000, 2000, 500, 1000]
+POINTS_PER_CYCLE = 10
+CYCLES = 5
+
+
+@pytest.fixture
+def board():
+    board = sim.SimulatedBoard()
+    sim.install([board])
+    return board
+
+
+def _sweep(frequencies=FREQUENCIES, **kwargs):
+    kwargs.setdefault('cycles', CYCLES)
+    return FrequencySweep(0, frequencies, ULRange.BIP10VOLTS,
+                          ULRange.BIP10VOLTS, ai_high_chan=1,
+                          points_per_cycle=POINTS_PER_CYCLE, **kwargs)
+
+
+def test_next_step_armed_while_caller_holds_data(board):
+    steps = []
+    with _sweep() as sweep:
+        for step in sweep:
+            steps.append(step)
+            ai_scan = board.scans[FunctionType.AIFUNCTION]
+            status, _, _ = ul.get_status(0, FunctionType.AIFUNCTION)
+            if step.index + 1 < len(FREQUENCIES):
+                # The next step's scans run while this one is analyzed
+                assert status == Status.RUNNING
+                assert ai_scan.rate == (FREQUENCIES[step.index + 1]
+                                        * POINTS_PER_CYCLE)
+            else:
+                assert status == Status.IDLE
+    assert [step.index for step in steps] == [0, 1, 2, 3]
+    assert [step.frequency for step in steps] == FREQUENCIES
+    assert [step.rate for step in steps] == [10000, 20000, 5000, 10000]
+    for step in steps:
+        assert step.data.shape == (CYCLES * POINTS_PER_CYCLE, 2)
+    # Two input buffers, used in turn
+    assert numpy.shares_memory(steps[0].data, steps[2].data)
+    assert numpy.shares_memory(steps[1].data, steps[3].data)
+    assert not numpy.shares_memory(steps[0].data, steps[1].data)
+
+
+def test_elapsed(board):
+    with _sweep() as sweep:
+        assert sweep.elapsed is None
+        results = sweep.run()
+    duration = sum(CYCLES / frequency for frequency in FREQUENCIES)
+    assert duration <= sweep.elapsed < duration + 1
+    assert len(results) == len(FREQUENCIES)
+    # Copies, not views of the reused buffers
+    assert not numpy.shares_memory(results[0], results[2])
+
+
+def test_run_with_analyze(board):
+    with _sweep() as sweep:
+        assert sweep.run(lambda step: step.rate) == [10000, 20000, 5000,
+                                                     10000]
+
+
+def test_output_waveform(board):
+    with _sweep(amplitude=2.0) as sweep:
+        sweep.run()
+        waveform = sweep._ao_buffer.array[:, 0].astype(int)
+    cycle = waveform[:POINTS_PER_CYCLE]
+    numpy.testing.assert_array_equal(waveform, numpy.tile(cycle, CYCLES))
+    # 2 V on a +/-10 V, 16-bit range, sampled 10 times per cycle
+    amplitude = (cycle.max() - cycle.min()) / 2
+    assert 0.95 * 6553.6 < amplitude <= 6553.6
+
+
+@pytest.mark.parametrize('frequencies', [[0.05], [1000, 0.01], [0]])
+def test_frequency_too_low(board, frequencies):
+    with pytest.raises(ValueError, match='too low'):
+        _sweep(frequencies)
+
+
+def test_lowest_frequency(board):
+    # A rate of 1 Hz
+    with _sweep([0.1], cycles=1) as sweep:
+        assert sweep.points == POINTS_PER_CYCLE
+
+
+def test_rate_above_board_maximum(board):
+    board.max_rate = 10000
+    with _sweep([1000, 5000]) as sweep:
+        with pytest.raises(ULError) as e:
+            sweep.run()
+    assert e.value.errorcode == ErrorCode.BADRATE
+    # The first step's scans were stopped
+    assert ul.get_status(0, FunctionType.AOFUNCTION)[0] == Status.IDLE
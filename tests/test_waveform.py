@@ -0,0 +1,46 @@
+from __future__ import absolute_import, division, print_function
+from builtins import *  # @UnusedWildImport
+
+from ctypes import c_ushort
+
+import numpy
+import pytest
+
+from mcculw import sim, ul
+from mcculw.enums import ULRange
+from mcculw.waveform import waveform_counts, write_waveform
+
+# shape, points, cycles, amplitude, ul_range, resolution, offset, table
+WAVEFORMS = [
+    ('sine', 40, 4, 2.5, ULRange.BIP10VOLTS, 16, 0.0, None),
+    ('square', 10, 1, 1.0, ULRange.UNI5VOLTS, 12, 2.5, None),
+    ('arbitrary', 12, 3, 5.0, ULRange.BIP5VOLTS, 16, 0.0, [0, 1, -1]),
+]
+
+
+@pytest.mark.parametrize('args', WAVEFORMS, ids=lambda args: args[0])
+def test_write_waveform_takes_waveform_counts_arguments(args):
+    points = args[1]
+    out = numpy.zeros(points, numpy.uint16)
+    result = write_waveform(out, *args)
+    assert result is out
+    numpy.testing.assert_array_equal(out, waveform_counts(*args))
+
+
+def test_write_waveform_to_memhandle():
+    sim.install()
+    args = WAVEFORMS[0]
+    points = args[1]
+    memhandle = ul.win_buf_alloc(points)
+    try:
+        write_waveform(memhandle, *args)
+        numpy.testing.assert_array_equal(
+            list((c_ushort * points).from_address(memhandle)),
+            waveform_counts(*args))
+    finally:
+        ul.win_buf_free(memhandle)
+
+
+def test_write_waveform_checks_size():
+    with pytest.raises(ValueError):
+        write_waveform(numpy.zeros(39, numpy.uint16), *WAVEFORMS[0])